@@ -0,0 +1,227 @@
+"""Бенчмарк точек входа расчета свободного времени на синтетических календарях
+
+Запуск: python -m benchmarks.availability [--masters 50 --days 30 --output results.json]
+Для каждой точки входа (get_available_times, get_available_dates,
+is_time_available) считает задержку p50/p95/p99, число SQL-запросов
+и выделения памяти на вызов. Результат пишется в JSON, чтобы сравнивать
+релизы между собой: --compare old.json печатает изменение p95 и запросов.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+ENTRY_POINTS = ['get_available_times', 'get_available_dates', 'is_time_available']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--masters', type=int, default=50)
+    parser.add_argument('--services', type=int, default=5, help='услуг на мастера')
+    parser.add_argument('--days', type=int, default=30, help='дней расписания вперед')
+    parser.add_argument('--slots-per-day', type=int, default=3)
+    parser.add_argument('--blocked-per-day', type=int, default=2)
+    parser.add_argument('--appointments-per-day', type=int, default=8)
+    parser.add_argument('--history-days', type=int, default=90, help='дней прошедших записей')
+    parser.add_argument('--iterations', type=int, default=300, help='вызовов на точку входа')
+    parser.add_argument('--backend', help='naive/batched/grid/cached, по умолчанию из конфига')
+    parser.add_argument('--warm', action='store_true', help='не сбрасывать кэш свободного времени между вызовами')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='по умолчанию временный файл SQLite; можно PostgreSQL')
+    parser.add_argument('--output', help='куда записать JSON (по умолчанию только вывод в консоль)')
+    parser.add_argument('--compare', help='JSON предыдущего прогона для сравнения')
+    return parser.parse_args()
+
+
+def percentile(values, q):
+    """Перцентиль с линейной интерполяцией между соседними значениями"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(values, digits=3):
+    return {
+        'p50': round(percentile(values, 50), digits),
+        'p95': round(percentile(values, 95), digits),
+        'p99': round(percentile(values, 99), digits),
+        'mean': round(statistics.fmean(values), digits),
+        'max': round(max(values), digits),
+    }
+
+
+def make_calls(master_ids, args):
+    """Одинаковый для всех точек входа набор случайных аргументов"""
+    from benchmarks.seed import DURATIONS
+
+    rng = random.Random(args.seed)
+    today = date.today()
+    calls = []
+    for _ in range(args.iterations):
+        day = today + timedelta(days=rng.randrange(args.days))
+        moment = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randrange(8 * 60, 21 * 60, 30))
+        calls.append((rng.choice(master_ids), day, moment, rng.choice(DURATIONS)))
+    return calls
+
+
+def measure(name, calls, args, query_counter):
+    """Два прохода: задержка и запросы без tracemalloc, затем выделения памяти"""
+    from utils.calendar_utils import get_available_times, get_available_dates, is_time_available
+    from utils.availability_cache import free_slot_cache
+
+    def call(master_id, day, moment, duration):
+        if name == 'get_available_times':
+            return get_available_times(master_id, day, duration)
+        if name == 'get_available_dates':
+            return get_available_dates(master_id, args.days, duration)
+        return is_time_available(master_id, moment, duration)
+
+    free_slot_cache.clear()
+    latencies = []
+    queries = []
+    for arguments in calls:
+        if not args.warm:
+            free_slot_cache.clear()
+        query_counter[0] = 0
+        started = time.perf_counter()
+        call(*arguments)
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(query_counter[0])
+    cache = free_slot_cache.stats()
+
+    free_slot_cache.clear()
+    peaks = []
+    blocks = []
+    tracemalloc.start()
+    for arguments in calls:
+        if not args.warm:
+            free_slot_cache.clear()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        call(*arguments)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        peaks.append((peak - base) / 1024)
+        blocks.append(sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0))
+    tracemalloc.stop()
+
+    return {
+        'calls': len(calls),
+        'latency_ms': summarize(latencies),
+        'queries': {'mean': round(statistics.fmean(queries), 2), 'max': max(queries), 'total': sum(queries)},
+        'allocations': {'peak_kib': summarize(peaks, 1), 'new_blocks': summarize(blocks, 1)},
+        'cache': {'hits': cache['hits'], 'misses': cache['misses'], 'hit_rate': cache['hit_rate']},
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"\nБэкенд: {report['meta']['backend']}, база: {report['meta']['dialect']}, "
+          f"мастеров: {report['meta']['params']['masters']}, дней: {report['meta']['params']['days']}")
+    print(f"{'точка входа':<22}{'p50, мс':>9}{'p95, мс':>9}{'p99, мс':>9}{'запросов':>10}{'пик, КиБ':>10}")
+    for name, result in report['results'].items():
+        latency = result['latency_ms']
+        print(f"{name:<22}{latency['p50']:>9.2f}{latency['p95']:>9.2f}{latency['p99']:>9.2f}"
+              f"{result['queries']['mean']:>10.2f}{result['allocations']['peak_kib']['p50']:>10.1f}")
+
+    if not baseline:
+        return
+    print("\nСравнение с предыдущим прогоном (p95 и запросы на вызов):")
+    for name, result in report['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if not old:
+            continue
+        old_p95, new_p95 = old['latency_ms']['p95'], result['latency_ms']['p95']
+        change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0.0
+        print(f"{name:<22}{old_p95:>9.2f} -> {new_p95:<9.2f}({change:+.1f}%)  "
+              f"запросов {old['queries']['mean']:.2f} -> {result['queries']['mean']:.2f}")
+
+
+def main():
+    args = parse_args()
+    db_file = None
+    if not args.database_url:
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{db_file}'
+
+    import sqlalchemy
+    from sqlalchemy import event
+    from database.models import Base, engine, session
+    from database.migrations import run_migrations
+    from utils import availability
+    from benchmarks.seed import seed_database
+
+    engine.echo = False
+    if args.backend:
+        availability.backend = availability.get_backend(args.backend)
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+
+    started = time.perf_counter()
+    master_ids = seed_database(
+        session, masters=args.masters, services_per_master=args.services, days=args.days,
+        slots_per_day=args.slots_per_day, blocked_per_day=args.blocked_per_day,
+        appointments_per_day=args.appointments_per_day, history_days=args.history_days, seed=args.seed
+    )
+    seed_seconds = time.perf_counter() - started
+
+    query_counter = [0]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_query(*_):
+        query_counter[0] += 1
+
+    calls = make_calls(master_ids, args)
+    results = {name: measure(name, calls, args, query_counter) for name in ENTRY_POINTS}
+    session.close()
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'dialect': engine.dialect.name,
+            'backend': availability.backend.name,
+            'warm_cache': args.warm,
+            'seed_seconds': round(seed_seconds, 2),
+            'params': {
+                'masters': args.masters, 'services': args.services, 'days': args.days,
+                'slots_per_day': args.slots_per_day, 'blocked_per_day': args.blocked_per_day,
+                'appointments_per_day': args.appointments_per_day, 'history_days': args.history_days,
+                'iterations': args.iterations, 'seed': args.seed,
+            },
+        },
+        'results': results,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Результаты записаны в {args.output}")
+
+    if db_file:
+        engine.dispose()
+        os.remove(db_file)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
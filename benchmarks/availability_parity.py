@@ -0,0 +1,109 @@
+"""Сверка и сравнение скорости бэкендов расчета свободного времени
+
+Запуск: python -m benchmarks.availability_parity [--masters 20 --days 14]
+Завершается с ошибкой, если хотя бы один бэкенд разошелся с эталонным naive.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+DURATIONS = [30, 45, 60, 90, 120]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--masters', type=int, default=20)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--seeds', type=int, default=3, help='сколько случайных расписаний проверить')
+    parser.add_argument('--database-url', help='по умолчанию временный файл SQLite')
+    return parser.parse_args()
+
+
+def run_backend(backend, master_ids, days):
+    """Считает день за днем, все длительности дня сразу и горизонт для всех мастеров"""
+    start_day = date.today()
+    per_day = {}
+    horizons = {}
+    started = time.perf_counter()
+    for master_id in master_ids:
+        for duration in DURATIONS:
+            for offset in range(days):
+                day = start_day + timedelta(days=offset)
+                per_day[(master_id, day, duration)] = list(backend.free_minutes(master_id, day, duration))
+            horizon = backend.horizon(master_id, start_day, days, duration)
+            horizons[(master_id, duration)] = {day: list(minutes) for day, minutes in horizon.items()}
+        # Все длительности сразу (время в handlers.client_booking.choose_date)
+        for offset in range(days):
+            day = start_day + timedelta(days=offset)
+            for duration, minutes in backend.free_minutes_multi(master_id, day, DURATIONS).items():
+                per_day[('multi', master_id, day, duration)] = list(minutes)
+    return per_day, horizons, time.perf_counter() - started
+
+
+def main():
+    args = parse_args()
+    db_file = None
+    if not args.database_url:
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{db_file}'
+
+    from database.models import Base, engine, session, WorkingSlot
+    from utils.availability import BACKENDS, CachedBackend, BatchedBackend
+    from utils.availability_cache import FreeSlotCache
+    from benchmarks.seed import seed_database
+
+    engine.echo = False
+    failures = 0
+    timings = {}
+
+    for seed in range(args.seeds):
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        master_ids = seed_database(session, masters=args.masters, days=args.days, seed=seed)
+        # Часть слотов как до миграции: минуты не заполнены, есть только строки времени
+        session.query(WorkingSlot).filter(WorkingSlot.id % 4 == 0).update(
+            {WorkingSlot.start_minute: None, WorkingSlot.end_minute: None}, synchronize_session=False
+        )
+        session.commit()
+
+        cache = FreeSlotCache(max_size=100_000)
+        backends = [cls() for cls in BACKENDS.values()] + [CachedBackend(BatchedBackend(), cache)]
+        reference = None
+
+        for backend in backends:
+            passes = ['cold', 'warm'] if backend.name == 'cached' else ['cold']
+            for label in passes:
+                per_day, horizons, elapsed = run_backend(backend, master_ids, args.days)
+                key = backend.name if label == 'cold' else f'{backend.name} (warm)'
+                timings.setdefault(key, []).append(elapsed)
+
+                if reference is None:
+                    reference = (per_day, horizons)
+                    continue
+
+                mismatches = [k for k in per_day if per_day[k] != reference[0][k]]
+                mismatches += [k for k in horizons if horizons[k] != reference[1][k]]
+                if mismatches:
+                    failures += 1
+                    print(f"❌ seed={seed} {key}: {len(mismatches)} расхождений, например {mismatches[0]}")
+
+        session.close()
+
+    print(f"\nМастеров: {args.masters}, дней: {args.days}, длительностей: {len(DURATIONS)}, прогонов: {args.seeds}")
+    print(f"{'бэкенд':<16}{'среднее, с':>12}")
+    for key, values in timings.items():
+        print(f"{key:<16}{sum(values) / len(values):>12.3f}")
+
+    if db_file:
+        os.remove(db_file)
+
+    if failures:
+        sys.exit(1)
+    print("\n✅ Все бэкенды совпадают с эталоном")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Стресс-тест одновременных подтверждений записи
+
+Запуск: python -m benchmarks.booking_stress [--masters 8 --requests 40 --threads 16 --processes 2]
+Параллельно отправляет подтверждения записи на пересекающееся время
+из нескольких потоков и процессов, затем проверяет, что ни у одного
+мастера нет пересекающихся записей. Завершается с ошибкой при пересечении.
+С --unsafe используется прежняя схема "проверка, затем вставка" для сравнения.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+DURATIONS = [30, 60, 90]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--masters', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=40, help='подтверждений на мастера')
+    parser.add_argument('--threads', type=int, default=16, help='потоков в каждом процессе')
+    parser.add_argument('--processes', type=int, default=2, help='процессов (проверка блокировки в базе)')
+    parser.add_argument('--unsafe', action='store_true', help='проверка и вставка раздельно, как раньше')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', help='по умолчанию временный файл SQLite')
+    return parser.parse_args()
+
+
+def seed(masters):
+    """Мастера с рабочим днем 09:00-18:00 завтра и услугами разной длительности"""
+    from database.models import session, User, Service, Client, WorkingSlot
+
+    day = date.today() + timedelta(days=1)
+    plan = {}
+    for m in range(masters):
+        master = User(telegram_id=20_000_000 + m, full_name=f'Мастер {m}', specialty='beauty', is_master=True)
+        session.add(master)
+        session.flush()
+        services = [Service(user_id=master.id, name=f'{d} мин', duration=d, price=1000) for d in DURATIONS]
+        client = Client(user_id=master.id, name='Клиент', phone='+79000000000')
+        session.add_all(services + [client])
+        session.add(WorkingSlot(user_id=master.id, date=day, start_time='09:00', end_time='18:00', is_blocked=False))
+        session.flush()
+        plan[master.id] = ([service.id for service in services], client.id)
+    session.commit()
+    return day, plan
+
+
+def make_requests(day, plan, per_master, rng):
+    requests = []
+    for master_id, (service_ids, client_id) in plan.items():
+        for _ in range(per_master):
+            start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randrange(9 * 60, 17 * 60, 30))
+            requests.append((master_id, rng.choice(service_ids), start, client_id))
+    rng.shuffle(requests)
+    return requests
+
+
+def confirm(request, unsafe=False):
+    """Одно подтверждение записи; True, если запись создана"""
+    master_id, service_id, start, client_id = request
+    if not unsafe:
+        from utils.booking_utils import book_appointment
+        return book_appointment(master_id, service_id, start, client_id=client_id) is not None
+
+    from database.models import Session, Appointment, Service
+    from utils.availability import load_day_schedule, is_free
+    with Session() as db_session:
+        duration = db_session.query(Service.duration).filter_by(id=service_id).scalar()
+        schedule = load_day_schedule(master_id, start.date(), db_session)
+        if not is_free(schedule, start.hour * 60 + start.minute, duration):
+            return False
+        time.sleep(0.001)  # как между проверкой и вставкой в обработчике
+        db_session.add(Appointment(user_id=master_id, client_id=client_id, service_id=service_id,
+                                   datetime=start, status='booked'))
+        db_session.commit()
+        return True
+
+
+def run_chunk(chunk, threads, unsafe):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(lambda request: confirm(request, unsafe), chunk))
+
+
+def reset_engine():
+    # Соединения, унаследованные от родительского процесса, не используем
+    from database.models import engine
+    engine.dispose(close=False)
+
+
+def find_overlaps():
+    """Пары пересекающихся записей в статусе booked по каждому мастеру"""
+    from database.models import session, Appointment, Service
+
+    rows = session.query(Appointment.user_id, Appointment.datetime, Service.duration).join(
+        Service, Service.id == Appointment.service_id
+    ).filter(Appointment.status == 'booked').order_by(Appointment.user_id, Appointment.datetime).all()
+
+    overlaps = []
+    previous = None
+    for master_id, start, duration in rows:
+        end = start + timedelta(minutes=duration)
+        if previous and previous[0] == master_id and start < previous[2]:
+            overlaps.append((master_id, previous[1], start))
+        if not previous or previous[0] != master_id or end > previous[2]:
+            previous = (master_id, start, end)
+    return overlaps, len(rows)
+
+
+def main():
+    args = parse_args()
+    db_file = None
+    if not args.database_url:
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{db_file}'
+
+    from database.models import Base, engine, session
+    from database.migrations import run_migrations
+
+    engine.echo = False
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+
+    day, plan = seed(args.masters)
+    requests = make_requests(day, plan, args.requests, random.Random(args.seed))
+    session.close()
+    engine.dispose()
+
+    chunks = [requests[i::args.processes] for i in range(args.processes)]
+    started = time.perf_counter()
+    if args.processes > 1:
+        with ProcessPoolExecutor(max_workers=args.processes, initializer=reset_engine) as pool:
+            results = [ok for chunk in pool.map(run_chunk, chunks, [args.threads] * len(chunks),
+                                                [args.unsafe] * len(chunks)) for ok in chunk]
+    else:
+        results = run_chunk(requests, args.threads, args.unsafe)
+    elapsed = time.perf_counter() - started
+
+    overlaps, booked = find_overlaps()
+    session.close()
+
+    mode = 'проверка, затем вставка' if args.unsafe else 'атомарная запись'
+    print(f"Режим: {mode}, база: {engine.dialect.name}")
+    print(f"Мастеров: {args.masters}, подтверждений: {len(requests)}, "
+          f"процессов: {args.processes}, потоков: {args.threads}")
+    print(f"Создано записей: {sum(results)} (в базе {booked}), отклонено: {len(results) - sum(results)}")
+    print(f"Время: {elapsed:.2f} с, {len(requests) / elapsed:.0f} подтверждений/с")
+
+    if db_file:
+        engine.dispose()
+        os.remove(db_file)
+
+    if overlaps:
+        print(f"\n❌ Пересекающихся записей: {len(overlaps)}, например мастер {overlaps[0][0]}: "
+              f"{overlaps[0][1]:%H:%M} и {overlaps[0][2]:%H:%M}")
+        sys.exit(1)
+    print("\n✅ Пересекающихся записей нет")
+
+
+if __name__ == '__main__':
+    main()
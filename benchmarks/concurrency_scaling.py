@@ -0,0 +1,154 @@
+"""Нагрузочный тест параллельной обработки обновлений: пропускная способность по уровням
+
+Запуск: python -m benchmarks.concurrency_scaling [--levels 1 2 4 8 15 --count 600 --api-latency-ms 50]
+Бот собирается как в bot.main с разным числом одновременно обрабатываемых
+обновлений. Bot API заменен LocalBotAPI (benchmarks.webhook_replay) с
+задержкой --api-latency-ms на каждый вызов - как сеть до Telegram.
+Обновления - нажатия кнопок меню от --masters мастеров - кладутся прямо в
+очередь обновлений Application. Для каждого уровня: обновлений в секунду,
+задержка от постановки в очередь до конца обработки и проверка, что
+обновления каждого чата обработаны в порядке поступления. При нарушении
+порядка или ошибках обработчиков - код выхода 1.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 15],
+                        help='сколько обновлений обрабатывать одновременно')
+    parser.add_argument('--count', type=int, default=600, help='обновлений на уровень')
+    parser.add_argument('--masters', type=int, default=50)
+    parser.add_argument('--api-latency-ms', type=float, default=50, help='задержка каждого вызова Bot API')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='своя база бота (не заполняется); по умолчанию временный SQLite')
+    parser.add_argument('--output', help='куда записать JSON (по умолчанию только вывод в консоль)')
+    return parser.parse_args()
+
+
+async def run_level(updates, concurrency, api_latency_ms):
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    import bot
+    from benchmarks.webhook_replay import make_local_bot_api
+
+    api = make_local_bot_api(api_latency_ms)
+    application = bot.build_application('1:concurrency-scaling', request=api, concurrency=concurrency)
+    queued_at = {}
+    latencies = []
+    order = defaultdict(list)
+    errors = Counter()
+
+    async def record_processed(update, context):
+        latencies.append((time.perf_counter() - queued_at[update.update_id]) * 1000)
+        order[update.effective_chat.id].append(update.update_id)
+
+    async def count_error(update, context):
+        errors[type(context.error).__name__] += 1
+
+    # Отдельная группа: выполняется после обработчика бота для каждого обновления
+    application.add_handler(TypeHandler(Update, record_processed), group=1)
+    application.add_error_handler(count_error)
+
+    await application.initialize()
+    await application.start()
+    try:
+        started = time.perf_counter()
+        for data in updates:
+            update = Update.de_json(data, application.bot)
+            queued_at[update.update_id] = time.perf_counter()
+            await application.update_queue.put(update)
+        while len(latencies) < len(updates) and sum(errors.values()) + len(latencies) < len(updates):
+            await asyncio.sleep(0.005)
+        elapsed = time.perf_counter() - started
+    finally:
+        await application.stop()
+        await application.shutdown()
+
+    out_of_order = [chat_id for chat_id, ids in order.items() if ids != sorted(ids)]
+    return {
+        'concurrency': concurrency,
+        'updates_per_second': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'p50': round(statistics.median(latencies), 1),
+            'p95': round(sorted(latencies)[int(len(latencies) * 0.95)], 1),
+        },
+        'processed': len(latencies),
+        'errors': dict(errors),
+        'chats_out_of_order': len(out_of_order),
+    }
+
+
+def main():
+    args = parse_args()
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    logging.getLogger('apscheduler').setLevel(logging.WARNING)
+    logging.getLogger('telegram.ext').setLevel(logging.WARNING)
+
+    db_file = None
+    if not args.database_url:
+        db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{db_file}'
+
+    from benchmarks.webhook_replay import make_updates, prepare_local_database
+    from utils.update_processor import max_concurrent_updates
+
+    prepare_local_database(args.masters, args.seed, seed=not args.database_url)
+    telegram_ids = [10_000_000 + m for m in range(args.masters)]
+    updates = make_updates(args.count, telegram_ids, random.Random(args.seed))
+
+    # Прогрев: кэши пользователей и свободного времени, скомпилированные запросы
+    asyncio.run(run_level(updates[:50], 1, 0))
+
+    results = []
+    for level in args.levels:
+        result = asyncio.run(run_level(updates, max_concurrent_updates(level), args.api_latency_ms))
+        result['requested'] = level
+        results.append(result)
+
+    print(f"Обновлений: {len(updates)}, чатов: {args.masters}, задержка Bot API: {args.api_latency_ms} мс\n")
+    print(f"{'одновременно':<14}{'обновлений/с':>14}{'p50, мс':>10}{'p95, мс':>10}{'ускорение':>12}  порядок")
+    base = results[0]['updates_per_second']
+    for result in results:
+        ordered = '✅' if not result['chats_out_of_order'] else f"❌ {result['chats_out_of_order']} чатов"
+        print(f"{result['concurrency']:<14}{result['updates_per_second']:>14}{result['latency_ms']['p50']:>10}"
+              f"{result['latency_ms']['p95']:>10}{result['updates_per_second'] / base:>11.1f}x  {ordered}")
+        if result['errors']:
+            print(f"   ошибки обработчиков: {result['errors']}")
+
+    if args.output:
+        report = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'updates': len(updates),
+                'masters': args.masters,
+                'api_latency_ms': args.api_latency_ms,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Результаты записаны в {args.output}")
+
+    if db_file:
+        os.remove(db_file)
+
+    failed = any(result['chats_out_of_order'] or result['errors'] for result in results)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Поиск обработчика кнопки меню: цепочка Regex-обработчиков против MenuRouter
+
+Запуск: python -m benchmarks.menu_dispatch [--iterations 20000 --output menu.json]
+Кнопки берутся из клавиатур (keyboards). Для каждой строится
+MessageHandler(filters.Regex('^текст$')), как раньше в bot.py, и та же
+кнопка регистрируется в MenuRouter; кнопки с переменной частью
+('💎 Выдать PRO: ...', '🗑️ ...') - в конце цепочки и через add_pattern.
+Поиск повторяет Application.process_update: check_update по порядку до
+первого совпадения. Тексты: первая и последняя кнопка, кнопка с
+переменной частью и обычный текст, который проходит всю цепочку.
+"""
+import argparse
+import inspect
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+from telegram import Chat, Message, Update
+from telegram.ext import MessageHandler, filters
+import keyboards
+from utils.menu_router import MenuRouter
+
+# Кнопки с переменной частью - как в bot.py
+PREFIX_PATTERNS = ['^🗑️', '^💎 Выдать премиум:', '^❌ Удалить премиум:', '^💎 Выдать PRO:', '^❌ Удалить PRO:']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000, help='поисков на текст в одном замере')
+    parser.add_argument('--repeats', type=int, default=7, help='замеров на текст')
+    parser.add_argument('--output', help='куда записать JSON (по умолчанию только вывод в консоль)')
+    return parser.parse_args()
+
+
+def keyboard_texts():
+    """Тексты кнопок всех клавиатур без параметров, в порядке появления"""
+    texts = []
+    for name, function in inspect.getmembers(keyboards, inspect.isfunction):
+        if not name.startswith('get_') or inspect.signature(function).parameters:
+            continue
+        markup = function()
+        for row in getattr(markup, 'keyboard', ()):
+            for button in row:
+                # Время, даты и прочие ответы внутри диалогов - не кнопки меню
+                if button.text[0].isalnum() or button.text in texts:
+                    continue
+                texts.append(button.text)
+    return texts
+
+
+async def _callback(update, context):
+    pass
+
+
+def build_chain(texts):
+    handlers = [MessageHandler(filters.Regex(f'^{re.escape(text)}$'), _callback) for text in texts]
+    handlers += [MessageHandler(filters.Regex(pattern), _callback) for pattern in PREFIX_PATTERNS]
+    return handlers
+
+
+def build_router(texts):
+    router = MenuRouter()
+    for text in texts:
+        # Тексты с '🗑️' в начале ловит и шаблон, но точное совпадение проверяется раньше
+        router.add(text, _callback)
+    for pattern in PREFIX_PATTERNS:
+        router.add_pattern(pattern, _callback)
+    return router
+
+
+def chain_lookup(handlers, update):
+    for handler in handlers:
+        check = handler.check_update(update)
+        if check is not None and check is not False:
+            return handler
+    return None
+
+
+def router_lookup(router, update):
+    return router.check_update(update) or None
+
+
+def make_update(text):
+    message = Message(1, datetime.now(), chat=Chat(1, Chat.PRIVATE), text=text)
+    return Update(1, message=message)
+
+
+def measure(lookup, target, update, iterations, repeats):
+    """Среднее время одного поиска в наносекундах для каждого замера"""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter_ns()
+        for _ in range(iterations):
+            lookup(target, update)
+        samples.append((time.perf_counter_ns() - started) / iterations)
+    return samples
+
+
+def main():
+    args = parse_args()
+    texts = keyboard_texts()
+    chain = build_chain(texts)
+    router = build_router(texts)
+
+    cases = {
+        'first_button': texts[0],
+        'last_button': texts[-1],
+        'prefix_button': '💎 Выдать PRO: Иван Иванов',
+        'not_a_button': 'Здравствуйте, можно записаться на завтра?',
+    }
+
+    results = {}
+    for case, text in cases.items():
+        update = make_update(text)
+        # Оба способа должны выбирать одинаково: найден обработчик или нет
+        assert (chain_lookup(chain, update) is None) == (router_lookup(router, update) is None), case
+
+        chain_ns = measure(chain_lookup, chain, update, args.iterations, args.repeats)
+        router_ns = measure(router_lookup, router, update, args.iterations, args.repeats)
+        results[case] = {
+            'text': text,
+            'chain_ns': round(statistics.median(chain_ns)),
+            'router_ns': round(statistics.median(router_ns)),
+            'speedup': round(statistics.median(chain_ns) / statistics.median(router_ns), 1),
+        }
+
+    print(f"Кнопок: {len(texts)}, шаблонов: {len(PREFIX_PATTERNS)}, обработчиков в цепочке: {len(chain)}\n")
+    print(f"{'случай':<16}{'цепочка, нс':>14}{'словарь, нс':>14}{'ускорение':>12}")
+    for case, result in results.items():
+        print(f"{case:<16}{result['chain_ns']:>14}{result['router_ns']:>14}{result['speedup']:>11}x")
+
+    if args.output:
+        report = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'buttons': len(texts),
+                'patterns': len(PREFIX_PATTERNS),
+                'iterations': args.iterations,
+                'repeats': args.repeats,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Результаты записаны в {args.output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+DURATIONS = [30, 45, 60, 90, 120]
+SPECIALTIES = ['beauty', 'tutor', 'other']
+
+
+def minutes_to_hhmm(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def seed_database(session, masters=10, services_per_master=5, days=14, slots_per_day=2,
+                  blocked_per_day=1, appointments_per_day=4, history_days=0,
+                  clients_per_master=20, seed=42):
+    """Заполняет базу синтетическими мастерами, расписанием и записями
+
+    Расписание и записи создаются на [сегодня - history_days, сегодня + days).
+    Возвращает список id созданных мастеров.
+    """
+    from database.models import User, Service, Client, WorkingSlot, Appointment
+
+    rng = random.Random(seed)
+    today = date.today()
+    master_ids = []
+
+    for m in range(masters):
+        master = User(
+            telegram_id=10_000_000 + m,
+            username=f'master{m}',
+            full_name=f'Мастер {m}',
+            specialty=rng.choice(SPECIALTIES),
+            phone=f'+7900{m:07d}',
+            is_master=True
+        )
+        session.add(master)
+        session.flush()
+        master_ids.append(master.id)
+
+        services = [
+            Service(user_id=master.id, name=f'Услуга {i}', duration=rng.choice(DURATIONS), price=1000 + i * 100)
+            for i in range(services_per_master)
+        ]
+        clients = [
+            Client(user_id=master.id, name=f'Клиент {m}-{i}', phone=f'+7911{m:04d}{i:03d}')
+            for i in range(clients_per_master)
+        ]
+        session.add_all(services + clients)
+        session.flush()
+
+        slots = []
+        appointments = []
+        for offset in range(-history_days, days):
+            day = today + timedelta(days=offset)
+
+            # Рабочие слоты идут друг за другом с перерывами, иногда пересекаются
+            cursor = rng.choice([8, 9, 10]) * 60
+            for _ in range(slots_per_day):
+                start = cursor + rng.choice([0, 15, 30])
+                end = min(start + rng.choice([120, 180, 240, 300]), 23 * 60 + 30)
+                if start >= end:
+                    break
+                slots.append(WorkingSlot(user_id=master.id, date=day, start_time=minutes_to_hhmm(start),
+                                         end_time=minutes_to_hhmm(end), is_blocked=False))
+                cursor = end + rng.choice([-30, 0, 30, 60])
+
+            for _ in range(blocked_per_day):
+                start = rng.randrange(8 * 60, 20 * 60, 15)
+                slots.append(WorkingSlot(user_id=master.id, date=day, start_time=minutes_to_hhmm(start),
+                                         end_time=minutes_to_hhmm(start + rng.choice([30, 60, 90])), is_blocked=True))
+
+            for _ in range(appointments_per_day):
+                start = rng.randrange(8 * 60, 21 * 60, 15)
+                appointments.append(Appointment(
+                    user_id=master.id,
+                    client_id=rng.choice(clients).id,
+                    service_id=rng.choice(services).id,
+                    datetime=datetime.combine(day, time()) + timedelta(minutes=start),
+                    status='completed' if offset < 0 else rng.choice(['booked', 'booked', 'booked', 'cancelled'])
+                ))
+
+        session.add_all(slots + appointments)
+        session.commit()
+
+    return master_ids
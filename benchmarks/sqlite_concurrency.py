@@ -0,0 +1,135 @@
+"""Пропускная способность SQLite при одновременном чтении и записи: до и после настройки
+
+Запуск: python -m benchmarks.sqlite_concurrency [--readers 8 --writers 4 --seconds 5]
+Для каждого профиля (default - настройки SQLite по умолчанию, tuned - профиль
+из config.py) создается отдельный файл базы. Потоки-читатели загружают
+расписание мастеров, потоки-писатели создают записи, каждый поток работает
+через свое соединение, как бот и webhook_handler.py с одним файлом.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.availability import percentile
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--masters', type=int, default=20)
+    parser.add_argument('--output', help='куда записать JSON с результатами')
+    return parser.parse_args()
+
+
+def run_profile(name, tune_sqlite, args):
+    from sqlalchemy.orm import sessionmaker
+    from database.models import Base, Appointment
+    from database.engine import create_db_engine
+    from utils.availability import load_day_schedule
+    from benchmarks.seed import seed_database
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+    threads_count = args.readers + args.writers
+    engine = create_db_engine(f'sqlite:///{db_file}', tune_sqlite=tune_sqlite, echo=False,
+                              pool_size=threads_count, max_overflow=0)
+    Session = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+
+    with Session() as seed_session:
+        master_ids = seed_database(seed_session, masters=args.masters, days=14)
+
+    stop = threading.Event()
+    results = {'read': [], 'write': [], 'locked': 0}
+    results_lock = threading.Lock()
+
+    def reader(seed):
+        rng = random.Random(seed)
+        latencies = []
+        with Session() as db_session:
+            while not stop.is_set():
+                started = time.perf_counter()
+                load_day_schedule(rng.choice(master_ids), date.today() + timedelta(days=rng.randrange(14)), db_session)
+                db_session.rollback()
+                latencies.append((time.perf_counter() - started) * 1000)
+        with results_lock:
+            results['read'] += latencies
+
+    def writer(seed):
+        rng = random.Random(seed)
+        latencies = []
+        locked = 0
+        with Session() as db_session:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    db_session.add(Appointment(
+                        user_id=rng.choice(master_ids), client_id=1, service_id=1,
+                        datetime=datetime.combine(date.today(), datetime.min.time()) + timedelta(minutes=rng.randrange(0, 14 * 1440, 15)),
+                        status='cancelled'
+                    ))
+                    db_session.commit()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                except OperationalError:
+                    db_session.rollback()
+                    locked += 1
+        with results_lock:
+            results['write'] += latencies
+            results['locked'] += locked
+
+    workers = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    workers += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(args.writers)]
+    for worker in workers:
+        worker.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    with engine.connect() as conn:
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+    engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+
+    return {
+        'profile': name,
+        'journal_mode': journal_mode,
+        'reads_per_sec': round(len(results['read']) / args.seconds, 1),
+        'writes_per_sec': round(len(results['write']) / args.seconds, 1),
+        'read_p95_ms': round(percentile(results['read'], 95), 3) if results['read'] else None,
+        'write_p95_ms': round(percentile(results['write'], 95), 3) if results['write'] else None,
+        'locked_errors': results['locked'],
+    }
+
+
+def main():
+    args = parse_args()
+    # Модели импортируются с базой в памяти: каждый профиль создает свой движок
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+    report = [run_profile('default', False, args), run_profile('tuned', True, args)]
+
+    print(f"\nЧитателей: {args.readers}, писателей: {args.writers}, секунд: {args.seconds}")
+    print(f"{'профиль':<10}{'журнал':>8}{'чтений/с':>11}{'записей/с':>11}{'p95 чт., мс':>13}{'p95 зап., мс':>14}{'locked':>8}")
+    for row in report:
+        print(f"{row['profile']:<10}{row['journal_mode']:>8}{row['reads_per_sec']:>11}{row['writes_per_sec']:>11}"
+              f"{row['read_p95_ms'] or '-':>13}{row['write_p95_ms'] or '-':>14}{row['locked_errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'params': vars(args), 'results': report}, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Результаты записаны в {args.output}")
+
+
+if __name__ == '__main__':
+    main()
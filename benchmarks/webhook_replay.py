@@ -0,0 +1,334 @@
+"""Пропускная способность режима webhook: повтор обновлений через локальную подмену Telegram
+
+Запуск: python -m benchmarks.webhook_replay [--updates updates.jsonl] [--count 2000 --concurrency 20]
+Бот собирается как в bot.main (build_application) и запускается в режиме
+webhook на localhost. Вместо Bot API - LocalBotAPI: отвечает на запросы
+бота (getMe, setWebhook, sendMessage...) без сети и считает их.
+Обновления берутся из файла - по одному JSON в строке или ответ getUpdates
+целиком - или генерируются: кнопки меню от мастеров синтетической базы.
+Они отправляются POST-запросами в --concurrency соединений, как это делает
+Telegram (WEBHOOK_MAX_CONNECTIONS). Измеряются задержка ответа сервера,
+обновлений в секунду до окончания обработки и ошибки обработчиков.
+
+С --url обновления отправляются на уже запущенный бот (задержка ответа
+сервера; обработку этот режим не видит).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import secrets
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+# Кнопки меню, которые отвечают сразу и не начинают диалог
+MENU_TEXTS = [
+    '💼 Услуги', '📋 Мои услуги', '👥 Клиенты', '👥 Мои клиенты', '📅 Мои записи',
+    '📋 Активные записи', '📅 Моё расписание', '📋 Свободные окна', '⚙️ Настройки',
+    '📊 Статистика', '👤 Профиль',
+]
+
+URL_PATH = 'telegram'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', help='файл с обновлениями (JSON в строке или ответ getUpdates)')
+    parser.add_argument('--count', type=int, default=2000, help='сколько обновлений сгенерировать')
+    parser.add_argument('--masters', type=int, default=50, help='мастеров в синтетической базе')
+    parser.add_argument('--concurrency', type=int, default=20, help='одновременных POST-запросов')
+    parser.add_argument('--update-concurrency', type=int, help='обновлений одновременно в боте (по умолчанию UPDATE_CONCURRENCY)')
+    parser.add_argument('--api-latency-ms', type=float, default=0, help='задержка каждого вызова Bot API')
+    parser.add_argument('--save-updates', help='записать сгенерированные обновления в файл')
+    parser.add_argument('--url', help='адрес уже запущенного бота вместо локального')
+    parser.add_argument('--secret-token', help='WEBHOOK_SECRET_TOKEN бота для --url')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='своя база бота (не заполняется); по умолчанию временный SQLite')
+    parser.add_argument('--output', help='куда записать JSON (по умолчанию только вывод в консоль)')
+    args = parser.parse_args()
+    if args.url and not args.updates:
+        parser.error('с --url нужен --updates: файл с обновлениями для этого бота')
+    return args
+
+
+def load_updates(path):
+    """Обновления из файла: ответ getUpdates ({"ok": true, "result": [...]}) или JSON в строке"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith('{"ok"') or stripped.startswith('['):
+        data = json.loads(text)
+        return data['result'] if isinstance(data, dict) else data
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def make_updates(count, telegram_ids, rng):
+    """Сообщения с кнопками меню от случайных мастеров"""
+    updates = []
+    now = int(time.time())
+    for update_id in range(1, count + 1):
+        telegram_id = rng.choice(telegram_ids)
+        user = {'id': telegram_id, 'is_bot': False, 'first_name': f'Мастер {telegram_id}'}
+        updates.append({
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': now,
+                'chat': {'id': telegram_id, 'type': 'private', 'first_name': user['first_name']},
+                'from': user,
+                'text': rng.choice(MENU_TEXTS),
+            },
+        })
+    return updates
+
+
+def make_local_bot_api(latency_ms=0):
+    """LocalBotAPI; latency_ms - задержка каждого вызова, как у сети до Telegram"""
+    from telegram.request import BaseRequest
+
+    class LocalBotAPI(BaseRequest):
+        """Подмена Bot API: успешные ответы без сети, счетчик вызванных методов"""
+
+        def __init__(self):
+            self.calls = Counter()
+            self._message_id = 0
+
+        @property
+        def read_timeout(self):
+            return None
+
+        async def initialize(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+        async def do_request(self, url, method, request_data=None, read_timeout=None,
+                             write_timeout=None, connect_timeout=None, pool_timeout=None):
+            name = url.rsplit('/', 1)[-1]
+            self.calls[name] += 1
+            if latency_ms:
+                await asyncio.sleep(latency_ms / 1000)
+            parameters = request_data.parameters if request_data else {}
+
+            if name == 'getMe':
+                result = {'id': 1, 'is_bot': True, 'first_name': 'Бот записи', 'username': 'booking_bot'}
+            elif name.startswith('send'):
+                self._message_id += 1
+                result = {
+                    'message_id': self._message_id,
+                    'date': int(time.time()),
+                    'chat': {'id': int(parameters.get('chat_id', 0)), 'type': 'private'},
+                    'text': parameters.get('text', ''),
+                }
+            else:
+                result = True
+            return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+    return LocalBotAPI()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def post_updates(url, updates, concurrency, secret_token):
+    """Отправляет обновления; возвращает задержки ответов (мс) и коды ответов"""
+    import httpx
+
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret_token} if secret_token else {}
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(json.dumps(update))
+    latencies = []
+    statuses = Counter()
+
+    async def worker(client):
+        while not queue.empty():
+            body = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.post(url, content=body, headers={**headers, 'Content-Type': 'application/json'})
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+    return latencies, statuses
+
+
+async def replay_local(updates, concurrency, update_concurrency=None, api_latency_ms=0):
+    """Бот на localhost с подменой Bot API; возвращает метрики прогона"""
+    import httpx
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    import bot
+
+    api = make_local_bot_api(api_latency_ms)
+    application = bot.build_application('1:local-webhook-replay', request=api, concurrency=update_concurrency)
+    processed = [0]
+    errors = Counter()
+
+    async def count_processed(update, context):
+        processed[0] += 1
+
+    async def count_error(update, context):
+        errors[type(context.error).__name__] += 1
+
+    # Отдельная группа: выполняется после обработчика бота для каждого обновления
+    application.add_handler(TypeHandler(Update, count_processed), group=1)
+    application.add_error_handler(count_error)
+
+    port = free_port()
+    secret_token = secrets.token_urlsafe(32)
+    url = f'http://127.0.0.1:{port}/{URL_PATH}'
+
+    await application.initialize()
+    await application.updater.start_webhook(
+        listen='127.0.0.1', port=port, url_path=URL_PATH,
+        webhook_url=f'https://bot.example.com/{URL_PATH}', secret_token=secret_token
+    )
+    await application.start()
+    try:
+        async with httpx.AsyncClient() as client:
+            rejected = (await client.post(url, json=updates[0])).status_code
+
+        started = time.perf_counter()
+        latencies, statuses = await post_updates(url, updates, concurrency, secret_token)
+        posted_seconds = time.perf_counter() - started
+        while processed[0] < statuses[200]:
+            await asyncio.sleep(0.005)
+        processed_seconds = time.perf_counter() - started
+    finally:
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+
+    return {
+        'latencies': latencies,
+        'statuses': statuses,
+        'posted_seconds': posted_seconds,
+        'processed': processed[0],
+        'processed_seconds': processed_seconds,
+        'errors': dict(errors),
+        'bot_api_calls': dict(api.calls),
+        'rejected_without_secret': rejected,
+    }
+
+
+def prepare_local_database(masters, seed_value, seed=True):
+    """Схема базы бота и (для временной базы) синтетические мастера
+
+    Своя база (--database-url, например копия рабочей для записанных
+    обновлений) не пересоздается и не заполняется.
+    """
+    from database.models import session
+    from database.migrations import prepare_database
+    from benchmarks.seed import seed_database
+
+    prepare_database()
+    if seed:
+        seed_database(session, masters=masters, days=7, seed=seed_value)
+        session.commit()
+        session.remove()
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def main():
+    args = parse_args()
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    rng = random.Random(args.seed)
+
+    db_file = None
+    if not args.url:
+        if not args.database_url:
+            db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False).name
+        os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{db_file}'
+
+    if not args.url:
+        prepare_local_database(args.masters, args.seed, seed=not args.database_url)
+
+    if args.updates:
+        updates = load_updates(args.updates)
+    else:
+        telegram_ids = [10_000_000 + m for m in range(args.masters)]
+        updates = make_updates(args.count, telegram_ids, rng)
+
+    if args.save_updates:
+        with open(args.save_updates, 'w', encoding='utf-8') as f:
+            for update in updates:
+                f.write(json.dumps(update, ensure_ascii=False) + '\n')
+
+    if args.url:
+        started = time.perf_counter()
+        latencies, statuses = asyncio.run(post_updates(args.url, updates, args.concurrency, args.secret_token))
+        result = {'latencies': latencies, 'statuses': statuses, 'posted_seconds': time.perf_counter() - started}
+    else:
+        result = asyncio.run(replay_local(updates, args.concurrency, args.update_concurrency, args.api_latency_ms))
+
+    latencies = result['latencies']
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'target': args.url or 'local',
+            'updates': len(updates),
+            'concurrency': args.concurrency,
+        },
+        'http': {
+            'statuses': {str(status): count for status, count in result['statuses'].items()},
+            'updates_per_second': round(len(updates) / result['posted_seconds'], 1),
+            'latency_ms': {
+                'p50': round(statistics.median(latencies), 2),
+                'p95': round(percentile(latencies, 95), 2),
+                'p99': round(percentile(latencies, 99), 2),
+            },
+        },
+    }
+    if 'processed' in result:
+        report['processing'] = {
+            'processed': result['processed'],
+            'updates_per_second': round(result['processed'] / result['processed_seconds'], 1),
+            'seconds': round(result['processed_seconds'], 2),
+            'errors': result['errors'],
+            'bot_api_calls': result['bot_api_calls'],
+            'rejected_without_secret': result['rejected_without_secret'],
+        }
+
+    http = report['http']
+    print(f"Обновлений: {len(updates)}, соединений: {args.concurrency}, бот: {report['meta']['target']}")
+    print(f"HTTP: ответы {http['statuses']}, {http['updates_per_second']} обновлений/с, "
+          f"задержка p50 {http['latency_ms']['p50']} мс, p95 {http['latency_ms']['p95']} мс, "
+          f"p99 {http['latency_ms']['p99']} мс")
+    if 'processing' in report:
+        processing = report['processing']
+        print(f"Обработка: {processing['processed']} обновлений за {processing['seconds']} с "
+              f"({processing['updates_per_second']}/с), ошибки: {processing['errors'] or 'нет'}")
+        print(f"Вызовы Bot API: {processing['bot_api_calls']}")
+        print(f"Запрос без секретного токена: HTTP {processing['rejected_without_secret']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Результаты записаны в {args.output}")
+
+    if db_file:
+        os.remove(db_file)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,13 @@
 import logging
+import re
+from datetime import timedelta
+from urllib.parse import urlparse
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ConversationHandler
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKEN, DB_INSTRUMENTATION, ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL_HOURS,
+    BOT_MODE, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET_TOKEN,
+    WEBHOOK_CERT, WEBHOOK_KEY, WEBHOOK_MAX_CONNECTIONS, PERSISTENCE_INTERVAL
+)
 from handlers.start import start, set_specialty, set_phone, SPECIALTY, PHONE
 from handlers.services import (
     services_menu, show_my_services, add_service_start, add_service_name, 
@@ -13,11 +20,18 @@ from handlers.services import (
 )
 from handlers.client_booking import start_client_booking, choose_service, choose_date, choose_time, get_client_name, get_client_phone, confirm_booking, cancel_booking, CHOOSE_SERVICE, CHOOSE_DATE, CHOOSE_TIME, CONFIRM_BOOKING, CLIENT_NAME, CLIENT_PHONE
 from handlers.master_tools import get_booking_link, show_client_appointments
-from database.models import Base, engine
+from database.models import engine, read_engine
+from database.migrations import prepare_database
+from database.archive import run_archive_job
+from database.persistence import DatabasePersistence
+from utils.menu_router import MenuRouter, lazy_callback
+from utils.update_processor import ChatOrderedUpdateProcessor, max_concurrent_updates
+from database.session import begin_scope, end_scope
+from database.instrumentation import instrument_engine, instrument_handlers, log_summary
 from keyboards import get_main_keyboard, get_main_keyboard_with_admin
 from handlers.clients_handlers import (
-    clients_menu, show_my_clients, show_client_appointments, show_all_appointments,
-    show_my_appointments_handler
+    clients_menu, show_my_clients, show_next_clients, show_prev_clients, show_client_appointments,
+    show_all_appointments, show_my_appointments_handler
 )
 from handlers.settings_handler import (
     settings_menu, premium_features, process_premium_purchase,
@@ -26,6 +40,10 @@ from handlers.settings_handler import (
 )
 from handlers.booking import start_booking, select_client, select_service, select_date, select_time, confirm_booking, show_active_appointments, SELECT_CLIENT, SELECT_SERVICE, SELECT_DATE, SELECT_TIME, CONFIRM_BOOKING
 from handlers.appointment_handlers import delete_appointment_menu, delete_appointment
+from handlers.client_transfer import (
+    import_clients_start, import_clients_file, import_clients_wrong_input, cancel_import_clients,
+    export_clients, IMPORT_FILE
+)
 from handlers.clients import add_client_start, add_client_name, add_client_phone, cancel_client_creation, CLIENT_NAME, CLIENT_PHONE
 from handlers.calendar_schedule import (
     calendar_schedule_menu, show_my_schedule, setup_schedule_start, 
@@ -37,11 +55,9 @@ from handlers.calendar_schedule import (
 )
 from handlers.client_mode import (
     switch_to_client_mode, client_select_master, show_available_masters,
-    switch_back_to_master_mode, cancel_client_mode, CLIENT_SELECT_MASTER
-)
-from handlers.admin_handlers import (
-    admin_panel, manage_premium, give_premium_to_user, 
-    remove_premium, remove_all_premiums, view_system_stats, view_all_users
+    switch_back_to_master_mode, cancel_client_mode, search_select_specialty,
+    search_select_date, search_select_duration, search_select_time, CLIENT_SELECT_MASTER,
+    CLIENT_SEARCH_SPECIALTY, CLIENT_SEARCH_DATE, CLIENT_SEARCH_DURATION, CLIENT_SEARCH_TIME
 )
 from handlers.client_commands import client_profile
 from handlers.payment_handlers import setup_payment_handlers
@@ -52,15 +68,50 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-def main():
-    # Создаем таблицы в базе данных
-    Base.metadata.create_all(engine)
-    print("✅ База данных создана!")
-    
-    application = Application.builder().token(BOT_TOKEN).build()
-    print("✅ Бот инициализирован!")
-    
-    print("✅ Бот запущен!")
+class BotApplication(Application):
+    """Application, в котором каждое обновление работает со своей сессией базы данных"""
+
+    async def process_update(self, update):
+        token = begin_scope()
+        try:
+            await super().process_update(update)
+        finally:
+            end_scope(token)
+
+    async def update_persistence(self):
+        await super().update_persistence()
+        # Изменения за интервал записываются в базу одной транзакцией
+        if isinstance(self.persistence, DatabasePersistence):
+            try:
+                await self.persistence.write_pending()
+            except Exception:
+                logging.getLogger(__name__).exception("Не удалось сохранить состояние диалогов")
+
+async def log_query_stats(application):
+    """Итоги статистики SQL-запросов при остановке бота"""
+    log_summary()
+
+def build_application(token=None, request=None, concurrency=None, persistence=None):
+    """Application со всеми обработчиками и фоновыми задачами
+
+    request - свой объект запросов к Bot API (бенчмарки подставляют локальную подмену).
+    concurrency - сколько обновлений обрабатывать одновременно (по умолчанию UPDATE_CONCURRENCY).
+    persistence - хранилище состояния (по умолчанию DatabasePersistence, если PERSISTENCE_INTERVAL > 0).
+    """
+    builder = Application.builder().token(token or BOT_TOKEN).application_class(BotApplication)
+    if request is not None:
+        builder = builder.request(request)
+    if persistence is None and PERSISTENCE_INTERVAL > 0:
+        persistence = DatabasePersistence()
+    if persistence is not None:
+        # Состояние диалогов и user_data переживает перезапуск бота
+        builder = builder.persistence(persistence)
+    persistent = persistence is not None
+    concurrency = max_concurrent_updates() if concurrency is None else concurrency
+    if concurrency > 1:
+        # Разные пользователи - параллельно, шаги одного чата - по порядку
+        builder = builder.concurrent_updates(ChatOrderedUpdateProcessor(concurrency))
+    application = builder.build()
     
     # ОСНОВНОЙ обработчик команды /start (и для мастеров, и для клиентов)
     start_conv = ConversationHandler(
@@ -69,7 +120,9 @@ def main():
             SPECIALTY: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_specialty)],
             PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, set_phone)],
         },
-        fallbacks=[]
+        fallbacks=[],
+        name='start',
+        persistent=persistent
     )
     
     # Обработчик записи клиентов (через ссылку)
@@ -83,7 +136,9 @@ def main():
             CLIENT_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_client_phone)],
             CONFIRM_BOOKING: [MessageHandler(filters.TEXT & ~filters.COMMAND, confirm_booking)],
         },
-        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$|^❌ Отменить$'), cancel_booking)]
+        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$|^❌ Отменить$'), cancel_booking)],
+        name='client_booking',
+        persistent=persistent
     )
     
     # Обработчик создания услуг
@@ -94,7 +149,9 @@ def main():
             SERVICE_DURATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, add_service_duration)],
             SERVICE_PRICE: [MessageHandler(filters.TEXT & ~filters.COMMAND, add_service_price)],
         },
-        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), cancel_service_creation)]
+        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), cancel_service_creation)],
+        name='service',
+        persistent=persistent
     )
     
     # Обработчик редактирования услуг
@@ -106,7 +163,9 @@ def main():
             EDIT_SERVICE_DURATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_service_duration)],
             EDIT_SERVICE_PRICE: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_service_price)],
         },
-        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), services_menu)]
+        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), services_menu)],
+        name='edit_service',
+        persistent=persistent
     )
     
     # Обработчик удаления услуг
@@ -115,7 +174,9 @@ def main():
         states={
             DELETE_SELECT_SERVICE: [MessageHandler(filters.TEXT & ~filters.COMMAND, delete_select_service)],
         },
-        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), services_menu)]
+        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), services_menu)],
+        name='delete_service',
+        persistent=persistent
     )
     
     # Обработчик записи клиентов мастером
@@ -128,7 +189,9 @@ def main():
             SELECT_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, select_time)],
             CONFIRM_BOOKING: [MessageHandler(filters.TEXT & ~filters.COMMAND, confirm_booking)],
         },
-        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), show_active_appointments)]
+        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), show_active_appointments)],
+        name='master_booking',
+        persistent=persistent
     )
     
     # Обработчик добавления клиентов
@@ -138,7 +201,23 @@ def main():
             CLIENT_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, add_client_name)],
             CLIENT_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, add_client_phone)],
         },
-        fallbacks=[MessageHandler(filters.Regex('^❌ Отмена$'), cancel_client_creation)]
+        fallbacks=[MessageHandler(filters.Regex('^❌ Отмена$'), cancel_client_creation)],
+        name='add_client',
+        persistent=persistent
+    )
+    
+    # Импорт клиентов из CSV/XLSX
+    import_clients_conv = ConversationHandler(
+        entry_points=[MessageHandler(filters.Regex('^📥 Импорт клиентов$'), import_clients_start)],
+        states={
+            IMPORT_FILE: [
+                MessageHandler(filters.Document.ALL, import_clients_file),
+                MessageHandler(filters.TEXT & ~filters.COMMAND & ~filters.Regex('^❌ Отмена$'), import_clients_wrong_input),
+            ],
+        },
+        fallbacks=[MessageHandler(filters.Regex('^❌ Отмена$'), cancel_import_clients)],
+        name='import_clients',
+        persistent=persistent
     )
     
     # Обработчик календарного расписания
@@ -149,7 +228,9 @@ def main():
             CALENDAR_SET_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, calendar_set_time)],
             CALENDAR_ADD_ANOTHER: [MessageHandler(filters.TEXT & ~filters.COMMAND, calendar_add_another)],
         },
-        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), cancel_calendar_setup)]
+        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), cancel_calendar_setup)],
+        name='calendar_schedule',
+        persistent=persistent
     )
 
     # Обработчик режима клиента
@@ -157,11 +238,17 @@ def main():
         entry_points=[MessageHandler(filters.Regex('^👤 Режим клиента$'), switch_to_client_mode)],
         states={
             CLIENT_SELECT_MASTER: [MessageHandler(filters.TEXT & ~filters.COMMAND, client_select_master)],
+            CLIENT_SEARCH_SPECIALTY: [MessageHandler(filters.TEXT & ~filters.COMMAND, search_select_specialty)],
+            CLIENT_SEARCH_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, search_select_date)],
+            CLIENT_SEARCH_DURATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, search_select_duration)],
+            CLIENT_SEARCH_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, search_select_time)],
         },
         fallbacks=[
             MessageHandler(filters.Regex('^🔙 Назад к мастеру$'), switch_back_to_master_mode),
             MessageHandler(filters.Regex('^🔙 Назад$'), cancel_client_mode)
-        ]
+        ],
+        name='client_mode',
+        persistent=persistent
     )
 
     # ConversationHandler для настройки графика
@@ -172,7 +259,9 @@ def main():
             CALENDAR_SET_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, calendar_set_time)],
             CALENDAR_ADD_ANOTHER: [MessageHandler(filters.TEXT & ~filters.COMMAND, calendar_add_another)],
         },
-        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), cancel_calendar_setup)]
+        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), cancel_calendar_setup)],
+        name='setup_schedule',
+        persistent=persistent
     )
 
     # ConversationHandler для блокировки времени
@@ -182,7 +271,9 @@ def main():
             BLOCK_SELECT_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, block_time_select_date)],
             BLOCK_SET_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, block_set_time)],
         },
-        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), cancel_block_time)]
+        fallbacks=[MessageHandler(filters.Regex('^🔙 Назад$'), cancel_block_time)],
+        name='block_time',
+        persistent=persistent
     )
 
     # Добавляем ВСЕ обработчики ConversationHandler
@@ -193,79 +284,143 @@ def main():
     application.add_handler(delete_service_conv)
     application.add_handler(master_booking_conv)
     application.add_handler(add_client_conv)
+    application.add_handler(import_clients_conv)
     application.add_handler(calendar_schedule_conv)
     application.add_handler(client_mode_conv)
     application.add_handler(setup_schedule_conv)
     application.add_handler(block_time_conv)
     
+    # Кнопки меню: один обработчик, текст кнопки ищется в словаре.
+    # Диалоги выше получают сообщения первыми, как и раньше
+    menu = MenuRouter()
+    
     # Обработчики меню для мастеров
-    application.add_handler(MessageHandler(filters.Regex('^💼 Услуги$'), services_menu))
-    application.add_handler(MessageHandler(filters.Regex('^📋 Мои услуги$'), show_my_services))
-    application.add_handler(MessageHandler(filters.Regex('^🔗 Получить ссылку$'), get_booking_link))
-    application.add_handler(MessageHandler(filters.Regex('^📅 Мои записи$'), show_my_appointments_handler))
+    menu.add('💼 Услуги', services_menu)
+    menu.add('📋 Мои услуги', show_my_services)
+    menu.add('🔗 Получить ссылку', get_booking_link)
+    menu.add('📅 Мои записи', show_my_appointments_handler)
     
     # Обработчики для клиентов
-    application.add_handler(MessageHandler(filters.Regex('^📅 Записаться на прием$'), start_client_booking))
-    application.add_handler(MessageHandler(filters.Regex('^📋 Мои записи$'), show_client_appointments))
-    application.add_handler(MessageHandler(filters.Regex('^👤 Мой профиль$'), client_profile))
-    application.add_handler(MessageHandler(filters.Regex('^📞 Связаться с мастером$'), lambda u, c: u.message.reply_text("📞 Телефон мастера: +7 XXX XXX-XX-XX")))
+    menu.add('📅 Записаться на прием', start_client_booking)
+    menu.add('📋 Мои записи', show_client_appointments)
+    menu.add('👤 Мой профиль', client_profile)
+    menu.add('📞 Связаться с мастером', lambda u, c: u.message.reply_text("📞 Телефон мастера: +7 XXX XXX-XX-XX"))
     
     # Обработчики расписания
-    application.add_handler(MessageHandler(filters.Regex('^📅 Управление расписанием$'), calendar_schedule_menu))
-    application.add_handler(MessageHandler(filters.Regex('^📅 Моё расписание$'), show_my_schedule))
-    application.add_handler(MessageHandler(filters.Regex('^📋 Свободные окна$'), show_free_slots_handler))
+    menu.add('📅 Управление расписанием', calendar_schedule_menu)
+    menu.add('📅 Моё расписание', show_my_schedule)
+    menu.add('📋 Свободные окна', show_free_slots_handler)
     
     # Обработчики для клиентов
-    application.add_handler(MessageHandler(filters.Regex('^👥 Клиенты$'), clients_menu))
-    application.add_handler(MessageHandler(filters.Regex('^👥 Мои клиенты$'), show_my_clients))
-    application.add_handler(MessageHandler(filters.Regex('^📅 Записи клиентов$'), show_client_appointments))
-    application.add_handler(MessageHandler(filters.Regex('^📋 Все записи$'), show_all_appointments))
-    application.add_handler(MessageHandler(filters.Regex('^📋 Активные записи$'), show_active_appointments))
-    application.add_handler(MessageHandler(filters.Regex('^🗑️ Удалить запись$'), delete_appointment_menu))
-    application.add_handler(MessageHandler(filters.Regex('^🗑️'), delete_appointment))
+    menu.add('👥 Клиенты', clients_menu)
+    menu.add('👥 Мои клиенты', show_my_clients)
+    menu.add('➡️ Следующие клиенты', show_next_clients)
+    menu.add('⬅️ Предыдущие клиенты', show_prev_clients)
+    menu.add('📤 Экспорт клиентов', export_clients)
+    menu.add('📅 Записи клиентов', show_client_appointments)
+    menu.add('📋 Все записи', show_all_appointments)
+    menu.add('📋 Активные записи', show_active_appointments)
+    menu.add('🗑️ Удалить запись', delete_appointment_menu)
+    menu.add_pattern('^🗑️', delete_appointment)
     
     # Обработчики для настроек
-    application.add_handler(MessageHandler(filters.Regex('^⚙️ Настройки$'), settings_menu))
-    application.add_handler(MessageHandler(filters.Regex('^💎 Премиум функции$'), premium_features))
-    application.add_handler(MessageHandler(filters.Regex('^👤 Профиль$'), user_profile))
-    application.add_handler(MessageHandler(filters.Regex('^📊 Статистика$'), lambda update, context: show_statistics(update, context)))
+    menu.add('⚙️ Настройки', settings_menu)
+    menu.add('💎 Премиум функции', premium_features)
+    menu.add('👤 Профиль', user_profile)
+    menu.add('📊 Статистика', show_statistics)
     
     # Обработчики премиума
-    application.add_handler(MessageHandler(filters.Regex('^💰 Купить премиум$'), premium_features))
-    application.add_handler(MessageHandler(filters.Regex('^💼 PRO - 299₽/мес$|^📅 PRO ГОД - 2990₽/год$'), process_premium_purchase))
-    application.add_handler(MessageHandler(filters.Regex('^🆓 Попробовать бесплатно$'), try_free_trial))
+    menu.add('💰 Купить премиум', premium_features)
+    menu.add(['💼 PRO - 299₽/мес', '📅 PRO ГОД - 2990₽/год'], process_premium_purchase)
+    menu.add('🆓 Попробовать бесплатно', try_free_trial)
     
     # 🔽 ДОБАВЛЕНО: Обработчики процесса оплаты
-    application.add_handler(MessageHandler(filters.Regex('^✅ Перейти к оплате$'), start_payment_from_settings))
-    application.add_handler(MessageHandler(filters.Regex('^✅ Я оплатил$'), check_payment_status_from_settings))
-    application.add_handler(MessageHandler(filters.Regex('^❌ Отменить$'), cancel_payment_from_settings))
-    
-    # Обработчики для админ-панели
-    application.add_handler(MessageHandler(filters.Regex('^👑 Админка$'), admin_panel))
-    application.add_handler(MessageHandler(filters.Regex('^💎 Управление премиумом$'), manage_premium))
-    application.add_handler(MessageHandler(filters.Regex('^💎 Выдать премиум:'), give_premium_to_user))
-    application.add_handler(MessageHandler(filters.Regex('^❌ Удалить премиум:'), remove_premium))
-    application.add_handler(MessageHandler(filters.Regex('^⚠️ Удалить ВСЕ премиумы$'), remove_all_premiums))
-    application.add_handler(MessageHandler(filters.Regex('^📊 Статистика системы$'), view_system_stats))
-    application.add_handler(MessageHandler(filters.Regex('^👥 Все пользователи$'), view_all_users))
-    application.add_handler(MessageHandler(filters.Regex('^🔙 Назад в админку$'), admin_panel))
-    application.add_handler(MessageHandler(filters.Regex('^💎 Выдать PRO:'), give_premium_to_user))
-    application.add_handler(MessageHandler(filters.Regex('^❌ Удалить PRO:'), remove_premium))
+    menu.add('✅ Перейти к оплате', start_payment_from_settings)
+    menu.add('✅ Я оплатил', check_payment_status_from_settings)
+    menu.add('❌ Отменить', cancel_payment_from_settings)
     
-    # Добавляем обработчики платежей
-    setup_payment_handlers(application)
+    # Обработчики для админ-панели (модуль загружается при первом нажатии)
+    admin_panel = lazy_callback('handlers.admin_handlers', 'admin_panel')
+    give_premium_to_user = lazy_callback('handlers.admin_handlers', 'give_premium_to_user')
+    remove_premium = lazy_callback('handlers.admin_handlers', 'remove_premium')
+    menu.add('👑 Админка', admin_panel)
+    menu.add('💎 Управление премиумом', lazy_callback('handlers.admin_handlers', 'manage_premium'))
+    menu.add_pattern('^💎 Выдать премиум:', give_premium_to_user)
+    menu.add_pattern('^❌ Удалить премиум:', remove_premium)
+    menu.add('⚠️ Удалить ВСЕ премиумы', lazy_callback('handlers.admin_handlers', 'remove_all_premiums'))
+    menu.add('📊 Статистика системы', lazy_callback('handlers.admin_handlers', 'view_system_stats'))
+    menu.add('👥 Все пользователи', lazy_callback('handlers.admin_handlers', 'view_all_users'))
+    menu.add('🔙 Назад в админку', admin_panel)
+    menu.add_pattern('^💎 Выдать PRO:', give_premium_to_user)
+    menu.add_pattern('^❌ Удалить PRO:', remove_premium)
     
     # Обработчики навигации в настройках
-    application.add_handler(MessageHandler(filters.Regex('^🔙 Назад в настройки$'), settings_menu))
+    menu.add('🔙 Назад в настройки', settings_menu)
     
     # Общие обработчики
-    application.add_handler(MessageHandler(filters.Regex('^🔙 Главное меню$'), lambda u, c: u.message.reply_text("Главное меню", reply_markup=get_main_keyboard_with_admin())))
-    application.add_handler(MessageHandler(filters.Regex('^🔙 Назад$'), lambda u, c: u.message.reply_text("Возврат", reply_markup=get_main_keyboard_with_admin())))
+    menu.add('🔙 Главное меню', lambda u, c: u.message.reply_text("Главное меню", reply_markup=get_main_keyboard_with_admin()))
+    menu.add('🔙 Назад', lambda u, c: u.message.reply_text("Возврат", reply_markup=get_main_keyboard_with_admin()))
+    
+    application.add_handler(menu)
+    
+    # Добавляем обработчики платежей (кнопки оплаты выше перехватываются меню, как и раньше)
+    setup_payment_handlers(application)
+
+    if DB_INSTRUMENTATION:
+        instrument_handlers(application)
+        application.post_shutdown = log_query_stats
+    
+    # Перенос прошедших записей в архив (первый запуск через минуту после старта)
+    if ARCHIVE_AFTER_DAYS > 0 and application.job_queue:
+        application.job_queue.run_repeating(run_archive_job, interval=timedelta(hours=ARCHIVE_INTERVAL_HOURS), first=60)
+    
+    return application
+
+def webhook_options():
+    """Параметры run_webhook из config.py; ошибки настройки - до запуска бота"""
+    if not WEBHOOK_URL.startswith('https://'):
+        raise ValueError("BOT_MODE=webhook: WEBHOOK_URL должен быть https-адресом бота")
+    if WEBHOOK_SECRET_TOKEN and not re.fullmatch(r'[A-Za-z0-9_-]{1,256}', WEBHOOK_SECRET_TOKEN):
+        raise ValueError("WEBHOOK_SECRET_TOKEN: до 256 символов A-Z, a-z, 0-9, _ и -")
+    if bool(WEBHOOK_CERT) != bool(WEBHOOK_KEY):
+        raise ValueError("Для TLS нужны и WEBHOOK_CERT, и WEBHOOK_KEY")
 
+    return {
+        'listen': WEBHOOK_LISTEN,
+        'port': WEBHOOK_PORT,
+        'url_path': WEBHOOK_PATH or urlparse(WEBHOOK_URL).path.strip('/'),
+        'webhook_url': WEBHOOK_URL,
+        'secret_token': WEBHOOK_SECRET_TOKEN or None,
+        'cert': WEBHOOK_CERT or None,
+        'key': WEBHOOK_KEY or None,
+        'max_connections': WEBHOOK_MAX_CONNECTIONS,
+    }
+
+def main():
+    if BOT_MODE not in ('polling', 'webhook'):
+        raise ValueError(f"BOT_MODE: polling или webhook, а не {BOT_MODE!r}")
+    options = webhook_options() if BOT_MODE == 'webhook' else None
+    
+    # Создаем таблицы и применяем миграции (при актуальной схеме - только проверка версии)
+    prepare_database(engine)
+    print("✅ База данных готова!")
+    
+    if DB_INSTRUMENTATION:
+        instrument_engine(engine)
+        # Отчеты, статистика и выгрузки идут через отдельный движок только для чтения
+        if read_engine is not engine:
+            instrument_engine(read_engine)
+    
+    application = build_application()
+    print("✅ Бот инициализирован!")
     print("✅ Обработчики добавлены!")
-    print("🚀 Запускаю бота...")
     
-    application.run_polling()
+    if options:
+        print(f"🚀 Запускаю бота (webhook на {options['listen']}:{options['port']}/{options['url_path']})...")
+        application.run_webhook(**options)
+    else:
+        print("🚀 Запускаю бота...")
+        application.run_polling()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
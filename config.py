@@ -4,5 +4,87 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///bot.db')
+# База для отчетов и статистики (реплика). Пусто: для файла SQLite - отдельное
+# read-only соединение к тому же файлу, для остальных СУБД - отдельный пул к DATABASE_URL
+DATABASE_READ_URL = os.getenv('DATABASE_READ_URL', '')
 YOOKASSA_SHOP_ID = os.getenv('YOOKASSA_SHOP_ID')
-YOOKASSA_SECRET_KEY = os.getenv('YOOKASSA_SECRET_KEY')
\ No newline at end of file
+YOOKASSA_SECRET_KEY = os.getenv('YOOKASSA_SECRET_KEY')
+
+# Горизонт записи для клиентов (дней)
+BOOKING_HORIZON_DAYS = int(os.getenv('BOOKING_HORIZON_DAYS', '14'))
+# Размер кэша свободного времени (записей мастер/дата/длительность)
+AVAILABILITY_CACHE_SIZE = int(os.getenv('AVAILABILITY_CACHE_SIZE', '5000'))
+# Время жизни свободного времени в кэше (секунд). Изменения расписания сбрасывают кэш только
+# в своем процессе: при нескольких экземплярах бота (webhook, PostgreSQL) другие увидят их
+# не позже чем через столько секунд. 0 - без срока, только для одного экземпляра
+AVAILABILITY_CACHE_TTL = int(os.getenv('AVAILABILITY_CACHE_TTL', '30'))
+# Кэш пользователей по telegram_id: размер и время жизни записи (секунд, 0 - только в пределах обновления)
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '60'))
+# Бэкенд расчета свободного времени: naive, batched, grid или cached (batched + LRU-кэш)
+AVAILABILITY_BACKEND = os.getenv('AVAILABILITY_BACKEND', 'cached')
+
+# Вывод всех SQL-запросов в stdout (только для отладки)
+SQL_ECHO = os.getenv('SQL_ECHO', 'false').lower() in ('1', 'true', 'yes')
+# Сбор статистики SQL-запросов: задержки, запросы на обработчик, медленные запросы
+DB_INSTRUMENTATION = os.getenv('DB_INSTRUMENTATION', 'false').lower() in ('1', 'true', 'yes')
+# Сколько самых медленных запросов хранить
+DB_SLOW_QUERIES = int(os.getenv('DB_SLOW_QUERIES', '10'))
+# Писать итоги статистики в лог каждые N вызовов обработчиков (0 - только при остановке)
+DB_STATS_LOG_EVERY = int(os.getenv('DB_STATS_LOG_EVERY', '1000'))
+
+# Профиль SQLite, применяется к каждому соединению (SQLITE_TUNING=false - настройки по умолчанию)
+SQLITE_TUNING = os.getenv('SQLITE_TUNING', 'true').lower() in ('1', 'true', 'yes')
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+# Сколько ждать освобождения блокировки записи, прежде чем вернуть "database is locked" (мс)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+# Отрицательное значение - размер в КиБ
+SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', '-20000'))
+SQLITE_TEMP_STORE = os.getenv('SQLITE_TEMP_STORE', 'MEMORY')
+
+# Пул соединений с базой
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+# Проверка соединения перед выдачей из пула (переживает рестарт PostgreSQL)
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+# Размер кэша скомпилированных SQL-выражений SQLAlchemy
+DB_QUERY_CACHE_SIZE = int(os.getenv('DB_QUERY_CACHE_SIZE', '500'))
+
+# Архив записей: прошедшие записи старше N дней переносятся в appointments_archive (0 - не переносить)
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '180'))
+# Записей в одной транзакции переноса и пауза между пачками (мс), чтобы не держать блокировку
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+ARCHIVE_BATCH_PAUSE_MS = int(os.getenv('ARCHIVE_BATCH_PAUSE_MS', '50'))
+# Как часто бот запускает перенос (часов)
+ARCHIVE_INTERVAL_HOURS = int(os.getenv('ARCHIVE_INTERVAL_HOURS', '24'))
+
+# Получение обновлений: polling (по умолчанию, для разработки) или webhook
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+# Публичный https-адрес, на который Telegram отправляет обновления (https://bot.example.com/telegram)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+# Адрес и порт встроенного веб-сервера бота (за обратным прокси - локальный адрес)
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+# Путь, который слушает сервер; пусто - путь из WEBHOOK_URL
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '')
+# Секрет в заголовке X-Telegram-Bot-Api-Secret-Token: запросы без него отклоняются (A-Z, a-z, 0-9, _ и -)
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN', '')
+# TLS без обратного прокси: сертификат и ключ (самоподписанный сертификат отправляется в Telegram)
+WEBHOOK_CERT = os.getenv('WEBHOOK_CERT', '')
+WEBHOOK_KEY = os.getenv('WEBHOOK_KEY', '')
+# Сколько соединений одновременно Telegram открывает к боту (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+
+# Сколько обновлений обрабатывается одновременно (1 - по одному). Обновления одного чата
+# всегда идут по порядку; больше DB_POOL_SIZE + DB_MAX_OVERFLOW - DB_THREADS не бывает
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '8'))
+# Потоки для блокирующей работы с базой (run_db); у каждого свое соединение из пула
+DB_THREADS = int(os.getenv('DB_THREADS', '4'))
+
+# Состояние диалогов и user_data сохраняется в базе раз в N секунд одной транзакцией
+# и при остановке бота (0 - только в памяти, перезапуск прерывает начатые записи)
+PERSISTENCE_INTERVAL = int(os.getenv('PERSISTENCE_INTERVAL', '30'))
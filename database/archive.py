@@ -0,0 +1,120 @@
+"""Перенос прошедших записей в архив: горячая и холодная части appointments
+
+В appointments остаются будущие и недавние записи - по ним работают
+расписание, свободное время и активные записи. Записи старше
+ARCHIVE_AFTER_DAYS переносятся в appointments_archive пачками по
+ARCHIVE_BATCH_SIZE: каждая пачка - отдельная короткая транзакция
+(INSERT ... SELECT и DELETE по списку id), между пачками пауза, поэтому
+запись клиентов ждет блокировку не дольше одной пачки. Перенос можно
+прервать и запустить снова - продолжится с оставшихся записей.
+
+Статистика по всей истории читает обе таблицы через appointment_history().
+
+Запуск вручную: python -m database.archive [--older-than-days 180] [--dry-run]
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, delete, func, insert, literal, select, union_all
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, ARCHIVE_BATCH_PAUSE_MS
+from database.models import engine, Appointment, AppointmentArchive
+from database.session import run_db
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('id', 'user_id', 'client_id', 'service_id', 'datetime', 'status')
+
+
+def archive_cutoff(older_than_days=ARCHIVE_AFTER_DAYS, now=None):
+    """Записи раньше этого момента переносятся в архив"""
+    return (now or datetime.now()) - timedelta(days=older_than_days)
+
+
+def count_archivable(older_than_days=ARCHIVE_AFTER_DAYS, engine=engine):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(Appointment).where(Appointment.datetime < archive_cutoff(older_than_days))
+        ).scalar()
+
+
+def archive_batch(cutoff, after_id, batch_size, engine=engine):
+    """Переносит одну пачку записей с id больше after_id; возвращает их id"""
+    with engine.connect() as conn:
+        ids = conn.execute(
+            select(Appointment.id).where(
+                Appointment.id > after_id,
+                Appointment.datetime < cutoff
+            ).order_by(Appointment.id).limit(batch_size)
+        ).scalars().all()
+    if not ids:
+        return ids
+
+    # Транзакция начинается сразу с записи и держит блокировку только на эту пачку
+    source = Appointment.__table__
+    with engine.begin() as conn:
+        conn.execute(insert(AppointmentArchive).from_select(
+            COLUMNS + ('archived_at',),
+            select(*[source.c[column] for column in COLUMNS], literal(datetime.now(), DateTime)).where(
+                source.c.id.in_(ids), source.c.datetime < cutoff
+            )
+        ))
+        conn.execute(delete(source).where(source.c.id.in_(ids), source.c.datetime < cutoff))
+    return ids
+
+
+def archive_appointments(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE,
+                         pause_ms=ARCHIVE_BATCH_PAUSE_MS, engine=engine):
+    """Переносит записи старше older_than_days дней в архив; возвращает их число"""
+    if older_than_days <= 0:
+        return 0
+
+    cutoff = archive_cutoff(older_than_days)
+    moved = 0
+    last_id = 0
+    while True:
+        ids = archive_batch(cutoff, last_id, batch_size, engine)
+        moved += len(ids)
+        if len(ids) < batch_size:
+            return moved
+        last_id = ids[-1]
+        time.sleep(pause_ms / 1000)
+
+
+async def run_archive_job(context):
+    """Задача JobQueue: перенос в архив в пуле потоков, не блокируя бота"""
+    moved = await run_db(archive_appointments)
+    if moved:
+        logger.info("В архив перенесено записей: %s", moved)
+
+
+def appointment_history(user_id=None):
+    """Текущие и архивные записи одной таблицей (UNION ALL) - для статистики
+
+    Фильтр по мастеру ставится в обе ветки, чтобы каждая шла по своему индексу.
+    """
+    queries = []
+    for model in (Appointment, AppointmentArchive):
+        query = select(*[getattr(model, column) for column in COLUMNS])
+        if user_id is not None:
+            query = query.where(model.user_id == user_id)
+        queries.append(query)
+    return union_all(*queries).subquery('appointment_history')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Перенос прошедших записей в архив')
+    parser.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help='только посчитать записи для переноса')
+    args = parser.parse_args()
+
+    if args.older_than_days <= 0:
+        parser.error('--older-than-days должен быть больше 0')
+
+    if args.dry_run:
+        print(f"📦 Записей для переноса: {count_archivable(args.older_than_days)}")
+    else:
+        started = time.perf_counter()
+        moved = archive_appointments(args.older_than_days, args.batch_size)
+        print(f"✅ В архив перенесено записей: {moved} за {time.perf_counter() - started:.1f} с")
@@ -0,0 +1,100 @@
+"""Создание движка SQLAlchemy с настройками из config.py
+
+Для SQLite на каждом новом соединении применяется профиль PRAGMA:
+WAL-журнал (читатели не блокируют писателя), synchronous=NORMAL,
+busy_timeout вместо мгновенной ошибки "database is locked", mmap,
+размер кэша страниц и temp_store. Для файловых баз и серверных СУБД
+(PostgreSQL) задаются параметры пула соединений.
+
+Отчеты и статистика читают через отдельный движок (create_read_engine),
+чтобы не занимать соединения, через которые идут записи клиентов.
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from config import (
+    DATABASE_URL, DATABASE_READ_URL, SQL_ECHO, SQLITE_TUNING, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE, SQLITE_TEMP_STORE,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_QUERY_CACHE_SIZE
+)
+
+
+def sqlite_pragmas():
+    """Профиль PRAGMA из конфига (порядок важен: busy_timeout - первым)"""
+    return [
+        ('busy_timeout', SQLITE_BUSY_TIMEOUT_MS),
+        ('journal_mode', SQLITE_JOURNAL_MODE),
+        ('synchronous', SQLITE_SYNCHRONOUS),
+        ('mmap_size', SQLITE_MMAP_SIZE),
+        ('cache_size', SQLITE_CACHE_SIZE),
+        ('temp_store', SQLITE_TEMP_STORE),
+    ]
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas=None):
+    """Применяет PRAGMA к соединению sqlite3 (в том числе открытому без SQLAlchemy)"""
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas if pragmas is not None else sqlite_pragmas():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def is_memory_sqlite(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(url=DATABASE_URL):
+    """Параметры create_engine: пул для файловых баз и серверных СУБД"""
+    options = {'echo': SQL_ECHO, 'query_cache_size': DB_QUERY_CACHE_SIZE}
+    if not is_memory_sqlite(url):
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    return options
+
+
+def create_db_engine(url=DATABASE_URL, tune_sqlite=SQLITE_TUNING, pragmas=None, **overrides):
+    """Создает движок; для SQLite подключает профиль PRAGMA на каждое соединение"""
+    engine = create_engine(url, **{**engine_options(url), **overrides})
+
+    if engine.dialect.name == 'sqlite' and tune_sqlite:
+        if is_memory_sqlite(url):
+            # WAL и mmap к базе в памяти неприменимы
+            pragmas = [p for p in pragmas or sqlite_pragmas() if p[0] not in ('journal_mode', 'mmap_size')]
+
+        @event.listens_for(engine, 'connect')
+        def on_connect(dbapi_connection, connection_record):
+            apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    return engine
+
+
+def read_database_url(url=DATABASE_URL):
+    """Адрес базы для отчетов: DATABASE_READ_URL или read-only доступ к основной"""
+    if DATABASE_READ_URL:
+        return DATABASE_READ_URL
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite' and not is_memory_sqlite(url):
+        return f"sqlite:///file:{parsed.database}?mode=ro&uri=true"
+    return url
+
+
+def create_read_engine(primary_engine, url=DATABASE_URL):
+    """Движок для read-only запросов отчетов
+
+    База SQLite в памяти существует только внутри своего соединения,
+    поэтому для нее используется основной движок.
+    """
+    if is_memory_sqlite(url) and not DATABASE_READ_URL:
+        return primary_engine
+
+    read_url = read_database_url(url)
+    pragmas = None
+    if make_url(read_url).get_backend_name() == 'sqlite':
+        # Режим журнала задает основное соединение, read-only соединение его не меняет
+        pragmas = [p for p in sqlite_pragmas() if p[0] != 'journal_mode']
+    return create_db_engine(read_url, pragmas=pragmas)
@@ -0,0 +1,221 @@
+"""Инструментирование SQL-запросов через события движка SQLAlchemy
+
+Включается переменной DB_INSTRUMENTATION. Собирает:
+- гистограмму задержек по каждому тексту запроса;
+- число запросов на вызов обработчика (видно N+1 в обработчиках);
+- N самых медленных запросов, значения параметров скрыты (только типы).
+Данные доступны через query_stats.summary(), итоги пишутся в лог.
+"""
+import functools
+import heapq
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from config import DB_SLOW_QUERIES, DB_STATS_LOG_EVERY
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы задержек (мс), последняя - все остальное
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, float('inf'))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+# Счетчик запросов текущего вызова обработчика
+_handler_queries = ContextVar('handler_queries', default=None)
+
+
+def normalize_statement(statement):
+    """Текст запроса без лишних пробелов и литералов - ключ статистики"""
+    return _LITERALS.sub('?', ' '.join(statement.split()))
+
+
+def redact_parameters(parameters):
+    """Вместо значений параметров - только их типы"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return f"<{len(parameters)} наборов параметров>"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class QueryStats:
+    """Накопленная статистика запросов и обработчиков (потокобезопасно)"""
+
+    def __init__(self, slow_count=DB_SLOW_QUERIES):
+        self.slow_count = slow_count
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+            self.handlers = {}
+            self.slowest = []  # куча (мс, запрос, параметры)
+            self.total_queries = 0
+            self.handler_calls = 0
+
+    def record_query(self, statement, parameters, elapsed_ms):
+        key = normalize_statement(statement)
+        bucket = next(i for i, bound in enumerate(BUCKETS_MS) if elapsed_ms <= bound)
+
+        with self._lock:
+            self.total_queries += 1
+            stat = self.statements.get(key)
+            if stat is None:
+                stat = self.statements[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                               'buckets': [0] * len(BUCKETS_MS)}
+            stat['count'] += 1
+            stat['total_ms'] += elapsed_ms
+            stat['max_ms'] = max(stat['max_ms'], elapsed_ms)
+            stat['buckets'][bucket] += 1
+
+            if self.slow_count > 0:
+                item = (elapsed_ms, key, str(redact_parameters(parameters)))
+                if len(self.slowest) < self.slow_count:
+                    heapq.heappush(self.slowest, item)
+                elif elapsed_ms > self.slowest[0][0]:
+                    heapq.heapreplace(self.slowest, item)
+
+    def record_handler(self, name, queries, elapsed_ms):
+        with self._lock:
+            self.handler_calls += 1
+            stat = self.handlers.get(name)
+            if stat is None:
+                stat = self.handlers[name] = {'calls': 0, 'queries': 0, 'max_queries': 0, 'total_ms': 0.0}
+            stat['calls'] += 1
+            stat['queries'] += queries
+            stat['max_queries'] = max(stat['max_queries'], queries)
+            stat['total_ms'] += elapsed_ms
+            calls = self.handler_calls
+
+        if DB_STATS_LOG_EVERY and calls % DB_STATS_LOG_EVERY == 0:
+            log_summary()
+
+    def summary(self, top=10):
+        """Снимок статистики: самые нагруженные запросы, обработчики и медленные запросы"""
+        with self._lock:
+            statements = [
+                {
+                    'statement': key,
+                    'count': stat['count'],
+                    'mean_ms': round(stat['total_ms'] / stat['count'], 3),
+                    'max_ms': round(stat['max_ms'], 3),
+                    'histogram': {
+                        ('inf' if bound == float('inf') else f'<={bound}ms'): count
+                        for bound, count in zip(BUCKETS_MS, stat['buckets']) if count
+                    },
+                }
+                for key, stat in self.statements.items()
+            ]
+            handlers = [
+                {
+                    'handler': name,
+                    'calls': stat['calls'],
+                    'mean_queries': round(stat['queries'] / stat['calls'], 2),
+                    'max_queries': stat['max_queries'],
+                    'mean_ms': round(stat['total_ms'] / stat['calls'], 2),
+                }
+                for name, stat in self.handlers.items()
+            ]
+            slowest = [
+                {'ms': round(ms, 3), 'statement': statement, 'parameters': parameters}
+                for ms, statement, parameters in sorted(self.slowest, reverse=True)
+            ]
+            total_queries = self.total_queries
+
+        return {
+            'total_queries': total_queries,
+            'statements': sorted(statements, key=lambda s: s['count'] * s['mean_ms'], reverse=True)[:top],
+            'handlers': sorted(handlers, key=lambda h: h['mean_queries'], reverse=True)[:top],
+            'slowest': slowest,
+        }
+
+
+query_stats = QueryStats()
+
+
+def instrument_engine(engine, stats=query_stats):
+    """Подключает сбор статистики к движку
+
+    Время начала хранится в контексте выполнения запроса, а не в стеке на
+    соединении: after_cursor_execute не вызывается, если запрос упал
+    (IntegrityError, таймаут блокировки), и стек рос бы, а следующие
+    запросы брали бы чужое время начала.
+    """
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context._query_started) * 1000
+        stats.record_query(statement, parameters, elapsed_ms)
+
+        counter = _handler_queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+def _wrap_callback(callback, stats):
+    name = getattr(callback, '__qualname__', repr(callback))
+    module = getattr(callback, '__module__', None)
+    if module:
+        name = f"{module.rsplit('.', 1)[-1]}.{name}"
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        counter = [0]
+        token = _handler_queries.set(counter)
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        finally:
+            _handler_queries.reset(token)
+            stats.record_handler(name, counter[0], (time.perf_counter() - started) * 1000)
+
+    return wrapper
+
+
+def _iter_handlers(handlers):
+    for handler in handlers:
+        if hasattr(handler, 'entry_points'):
+            # ConversationHandler: оборачиваем вложенные обработчики
+            nested = list(handler.entry_points) + list(handler.fallbacks)
+            for state_handlers in handler.states.values():
+                nested += list(state_handlers)
+            yield from _iter_handlers(nested)
+        elif handler.callback is not None:
+            yield handler
+
+
+def instrument_handlers(application, stats=query_stats):
+    """Оборачивает колбэки всех зарегистрированных обработчиков (включая диалоги)
+
+    Вызывается после регистрации обработчиков.
+    """
+    for group in application.handlers.values():
+        for handler in _iter_handlers(group):
+            if hasattr(handler, 'wrap_callbacks'):
+                # Маршрутизатор меню: статистика по каждой кнопке, а не по маршрутизатору
+                handler.wrap_callbacks(lambda callback: _wrap_callback(callback, stats))
+            else:
+                handler.callback = _wrap_callback(handler.callback, stats)
+
+
+def log_summary(stats=query_stats, top=5):
+    """Пишет в лог краткие итоги статистики"""
+    summary = stats.summary(top)
+    logger.info("SQL: всего запросов %s", summary['total_queries'])
+    for item in summary['handlers']:
+        logger.info("Обработчик %s: вызовов %s, запросов в среднем %s (макс. %s), %s мс",
+                    item['handler'], item['calls'], item['mean_queries'], item['max_queries'], item['mean_ms'])
+    for item in summary['statements']:
+        logger.info("Запрос x%s, %s мс в среднем, макс. %s мс: %s",
+                    item['count'], item['mean_ms'], item['max_ms'], item['statement'][:200])
+    for item in summary['slowest']:
+        logger.info("Медленный запрос %s мс %s: %s", item['ms'], item['parameters'], item['statement'][:200])
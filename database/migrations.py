@@ -0,0 +1,260 @@
+"""Версионированные миграции схемы
+
+Каждая миграция - функция с номером в MIGRATIONS. Примененные версии
+хранятся в таблице schema_version, поэтому run_migrations применяет
+только новые. Миграции не удаляют данные и безопасны для повторного запуска.
+
+Запуск: python -m database.migrations [--status] [--explain]
+--explain проверяет планы горячих запросов: каждый должен идти по индексу.
+"""
+import argparse
+import sys
+from datetime import datetime
+from sqlalchemy import inspect, text
+from database.models import Base, engine
+
+# Минуты от начала суток из строки 'ЧЧ:ММ' средствами SQL (работает в SQLite и PostgreSQL)
+MINUTES_SQL = "CAST(substr({column}, 1, 2) AS INTEGER) * 60 + CAST(substr({column}, 4, 2) AS INTEGER)"
+
+
+def create_index(engine, name, table, columns, unique=False):
+    """Создает индекс, если его еще нет, не блокируя запись в таблицу
+
+    В PostgreSQL индекс строится CONCURRENTLY (вне транзакции),
+    в SQLite - обычным CREATE INDEX IF NOT EXISTS.
+    """
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def migrate_working_slot_minutes(engine=engine):
+    """Добавляет в working_slots колонки минут и заполняет их на месте, без пересоздания таблицы"""
+    inspector = inspect(engine)
+    if 'working_slots' not in inspector.get_table_names():
+        return
+
+    columns = {column['name'] for column in inspector.get_columns('working_slots')}
+
+    with engine.begin() as conn:
+        for column in ('start_minute', 'end_minute'):
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE working_slots ADD COLUMN {column} INTEGER"))
+
+        conn.execute(text(
+            "UPDATE working_slots SET "
+            f"start_minute = {MINUTES_SQL.format(column='start_time')}, "
+            f"end_minute = {MINUTES_SQL.format(column='end_time')} "
+            "WHERE start_minute IS NULL OR end_minute IS NULL"
+        ))
+
+
+def create_search_indexes(engine=engine):
+    """Индексы для поиска мастеров по специальности и слотов по дате"""
+    create_index(engine, 'ix_users_specialty_master', 'users', ['specialty', 'is_master'])
+    create_index(engine, 'ix_working_slots_date_user', 'working_slots', ['date', 'user_id'])
+
+
+def create_hot_path_indexes(engine=engine):
+    """Составные индексы под фильтры горячих запросов"""
+    create_index(engine, 'ix_appointments_user_datetime_status', 'appointments', ['user_id', 'datetime', 'status'])
+    create_index(engine, 'ix_working_slots_user_date_blocked', 'working_slots', ['user_id', 'date', 'is_blocked'])
+    create_index(engine, 'ix_clients_user', 'clients', ['user_id'])
+    create_index(engine, 'ix_clients_telegram', 'clients', ['telegram_id'])
+    create_index(engine, 'ix_premium_subscriptions_user_active', 'premium_subscriptions', ['user_id', 'is_active'])
+
+
+def migrate_postgresql_compat(engine=engine):
+    """payment_id в подписках и 64-битные Telegram ID
+
+    Колонку payment_id раньше использовал только webhook_handler.py,
+    в модели ее не было. В PostgreSQL INTEGER 32-битный, а Telegram ID
+    давно больше, поэтому колонки переводятся в BIGINT (в SQLite INTEGER
+    и так 64-битный).
+    """
+    inspector = inspect(engine)
+    tables = inspector.get_table_names()
+
+    if 'premium_subscriptions' in tables:
+        columns = {column['name'] for column in inspector.get_columns('premium_subscriptions')}
+        if 'payment_id' not in columns:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE premium_subscriptions ADD COLUMN payment_id VARCHAR(100)"))
+        create_index(engine, 'ux_premium_subscriptions_payment_id', 'premium_subscriptions', ['payment_id'], unique=True)
+
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conn:
+            for table in ('users', 'clients'):
+                if table in tables:
+                    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN telegram_id TYPE BIGINT"))
+
+
+def create_client_summary_index(engine=engine):
+    """Покрывающий индекс для сводки по клиентам (GROUP BY client_id без чтения таблицы)"""
+    create_index(engine, 'ix_appointments_user_client', 'appointments', ['user_id', 'client_id', 'datetime'])
+
+
+def create_appointments_archive(engine=engine):
+    """Таблица архива прошедших записей (перенос - database/archive.py)"""
+    from database.models import AppointmentArchive
+
+    AppointmentArchive.__table__.create(engine, checkfirst=True)
+    create_index(engine, 'ix_appointments_archive_user_client', 'appointments_archive', ['user_id', 'client_id', 'datetime'])
+
+
+def create_client_phone_index(engine=engine):
+    """Индекс для проверки дублей по телефону при импорте клиентов"""
+    create_index(engine, 'ix_clients_user_phone', 'clients', ['user_id', 'phone'])
+
+
+def create_bot_state(engine=engine):
+    """Таблица состояния диалогов и user_data (database/persistence.py)"""
+    from database.models import BotState
+
+    BotState.__table__.create(engine, checkfirst=True)
+
+
+# (версия, описание, функция) - новые миграции добавляются в конец
+MIGRATIONS = [
+    (1, 'Колонки минут в working_slots', migrate_working_slot_minutes),
+    (2, 'Индексы поиска мастеров по специальности', create_search_indexes),
+    (3, 'Составные индексы горячих запросов', create_hot_path_indexes),
+    (4, 'payment_id в подписках и BIGINT для Telegram ID', migrate_postgresql_compat),
+    (5, 'Индекс сводки по клиентам мастера', create_client_summary_index),
+    (6, 'Архив прошедших записей', create_appointments_archive),
+    (7, 'Индекс клиентов мастера по телефону', create_client_phone_index),
+    (8, 'Состояние диалогов бота', create_bot_state),
+]
+
+
+def ensure_version_table(engine=engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at TIMESTAMP)"
+        ))
+
+
+def applied_versions(engine=engine):
+    ensure_version_table(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_version"))}
+
+
+def pending_migrations(engine=engine):
+    """Миграции, которые еще не применены к базе"""
+    applied = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def run_migrations(engine=engine):
+    """Применяет к существующей базе все еще не примененные миграции по порядку"""
+    applied = []
+    for version, description, migrate in pending_migrations(engine):
+        migrate(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {'v': version, 'd': description, 't': datetime.now()}
+            )
+        applied.append(version)
+    return applied
+
+
+def schema_is_current(engine=engine):
+    """Все миграции применены и все таблицы моделей существуют"""
+    if pending_migrations(engine):
+        return False
+    return set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+
+
+def prepare_database(engine=engine):
+    """Подготовка базы при старте бота; возвращает примененные миграции
+
+    При обычном перезапуске схема уже актуальна: create_all (проверка
+    каждой таблицы по отдельности) пропускается.
+    """
+    if schema_is_current(engine):
+        return []
+    Base.metadata.create_all(engine)
+    return run_migrations(engine)
+
+
+# Горячие запросы и индекс, по которому каждый из них должен выполняться
+PLAN_CHECKS = [
+    ("Записи мастера за день",
+     "SELECT id FROM appointments WHERE user_id = 1 AND datetime >= '2024-01-01' "
+     "AND datetime < '2024-01-02' AND status = 'booked'",
+     'ix_appointments_user_datetime_status'),
+    ("Рабочие слоты мастера на дату",
+     "SELECT id FROM working_slots WHERE user_id = 1 AND date = '2024-01-01' AND is_blocked = false",
+     'ix_working_slots_user_date_blocked'),
+    ("Слоты всех мастеров на дату",
+     "SELECT user_id FROM working_slots WHERE date = '2024-01-01'",
+     'ix_working_slots_date_user'),
+    ("Клиенты мастера",
+     "SELECT id FROM clients WHERE user_id = 1",
+     'ix_clients_user'),
+    ("Сводка по клиентам мастера",
+     "SELECT client_id, count(*), max(datetime) FROM appointments WHERE user_id = 1 GROUP BY client_id",
+     'ix_appointments_user_client'),
+    ("Архивные записи мастера",
+     "SELECT client_id, count(*), max(datetime) FROM appointments_archive WHERE user_id = 1 GROUP BY client_id",
+     'ix_appointments_archive_user_client'),
+    ("Клиенты мастера по телефону",
+     "SELECT phone FROM clients WHERE user_id = 1 AND phone IN ('+79990000000', '+79990000001')",
+     'ix_clients_user_phone'),
+    ("Клиент по Telegram ID",
+     "SELECT id FROM clients WHERE telegram_id = 1",
+     'ix_clients_telegram'),
+    ("Активная подписка пользователя",
+     "SELECT id FROM premium_subscriptions WHERE user_id = 1 AND is_active = true",
+     'ix_premium_subscriptions_user_active'),
+    ("Мастера по специальности",
+     "SELECT id FROM users WHERE specialty = 'beauty' AND is_master = true",
+     'ix_users_specialty_master'),
+]
+
+
+def explain(conn, sql):
+    """План запроса одной строкой"""
+    if conn.dialect.name == 'postgresql':
+        # На маленьких таблицах планировщик предпочтет seq scan - проверяем, что индекс пригоден
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        return ' '.join(row[0] for row in conn.execute(text(f"EXPLAIN {sql}")))
+    return ' '.join(str(row[-1]) for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+def check_query_plans(engine=engine):
+    """Проверяет, что горячие запросы используют свои индексы; возвращает список ошибок"""
+    failures = []
+    with engine.begin() as conn:
+        for title, sql, index in PLAN_CHECKS:
+            plan = explain(conn, sql)
+            status = '✅' if index in plan else '❌'
+            print(f"{status} {title}: {plan}")
+            if index not in plan:
+                failures.append((title, index, plan))
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Миграции схемы базы данных')
+    parser.add_argument('--status', action='store_true', help='показать версии, не применяя миграции')
+    parser.add_argument('--explain', action='store_true', help='проверить планы горячих запросов')
+    args = parser.parse_args()
+
+    if args.status:
+        applied = applied_versions()
+        for version, description, _ in MIGRATIONS:
+            print(f"{'✅' if version in applied else '⏳'} {version}: {description}")
+    else:
+        versions = run_migrations()
+        print(f"✅ Миграции применены: {versions}" if versions else "✅ Схема уже актуальна")
+
+    if args.explain and check_query_plans():
+        sys.exit(1)
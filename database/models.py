@@ -1,19 +1,27 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Date
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, ForeignKey, Boolean, Date, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship, validates
 from datetime import datetime, date
-from config import DATABASE_URL
+from database.engine import create_db_engine, create_read_engine
+from database.session import current_scope
 
 Base = declarative_base()
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_db_engine()
 Session = sessionmaker(bind=engine)
-session = Session()
+# Своя сессия на каждое обновление Telegram (см. database/session.py)
+session = scoped_session(Session, scopefunc=current_scope)
+
+# Только чтение: статистика и отчеты (реплика или read-only соединение)
+read_engine = create_read_engine(engine)
+ReadSession = sessionmaker(bind=read_engine)
+read_session = scoped_session(ReadSession, scopefunc=current_scope)
 
 class User(Base):
     __tablename__ = 'users'
     
     id = Column(Integer, primary_key=True)
-    telegram_id = Column(Integer, unique=True)
+    # Telegram ID не помещаются в 32 бита (важно для PostgreSQL)
+    telegram_id = Column(BigInteger, unique=True)
     username = Column(String(100))
     full_name = Column(String(200))
     specialty = Column(String(100))
@@ -21,6 +29,11 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.now)
     is_master = Column(Boolean, default=True)
     
+    __table_args__ = (
+        # Поиск мастеров по специальности
+        Index('ix_users_specialty_master', 'specialty', 'is_master'),
+    )
+    
     # Связи
     services = relationship("Service", back_populates="user", cascade="all, delete-orphan")
     clients = relationship("Client", back_populates="user", cascade="all, delete-orphan")
@@ -47,11 +60,18 @@ class Client(Base):
     name = Column(String(100))
     phone = Column(String(20))
     notes = Column(Text, nullable=True)
-    telegram_id = Column(Integer, nullable=True)
+    telegram_id = Column(BigInteger, nullable=True)
     telegram_username = Column(String(100), nullable=True)
     
     user = relationship("User", back_populates="clients")
     appointments = relationship("Appointment", back_populates="client")
+    
+    __table_args__ = (
+        Index('ix_clients_user', 'user_id'),
+        Index('ix_clients_telegram', 'telegram_id'),
+        # Поиск дублей по телефону при импорте
+        Index('ix_clients_user_phone', 'user_id', 'phone'),
+    )
 
 class Appointment(Base):
     __tablename__ = 'appointments'
@@ -66,6 +86,31 @@ class Appointment(Base):
     user = relationship("User", back_populates="appointments")
     client = relationship("Client", back_populates="appointments")
     service = relationship("Service")
+    
+    __table_args__ = (
+        # Записи мастера за период с фильтром по статусу
+        Index('ix_appointments_user_datetime_status', 'user_id', 'datetime', 'status'),
+        # Сводка по клиентам мастера: число записей и последний визит
+        Index('ix_appointments_user_client', 'user_id', 'client_id', 'datetime'),
+    )
+
+class AppointmentArchive(Base):
+    """Прошедшие записи, перенесенные из appointments (см. database/archive.py)"""
+    __tablename__ = 'appointments_archive'
+    
+    # id сохраняется из appointments
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    # Объявлена до колонки datetime, которая скрывает модуль datetime в теле класса
+    archived_at = Column(DateTime, default=datetime.now)
+    user_id = Column(Integer, ForeignKey('users.id'))
+    client_id = Column(Integer, ForeignKey('clients.id'))
+    service_id = Column(Integer, ForeignKey('services.id'))
+    datetime = Column(DateTime)
+    status = Column(String(20))
+    
+    __table_args__ = (
+        Index('ix_appointments_archive_user_client', 'user_id', 'client_id', 'datetime'),
+    )
 
 class MasterLink(Base):
     __tablename__ = 'master_links'
@@ -86,10 +131,30 @@ class WorkingSlot(Base):
     date = Column(Date)
     start_time = Column(String(5))
     end_time = Column(String(5))
+    # Те же границы в минутах от начала суток - для расчетов и сортировки без разбора строк
+    start_minute = Column(Integer)
+    end_minute = Column(Integer)
     is_blocked = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.now)
     
     user = relationship("User", back_populates="working_slots")
+    
+    __table_args__ = (
+        # Слоты всех мастеров на дату - для поиска по нескольким мастерам
+        Index('ix_working_slots_date_user', 'date', 'user_id'),
+        # Слоты мастера на дату или диапазон дат
+        Index('ix_working_slots_user_date_blocked', 'user_id', 'date', 'is_blocked'),
+    )
+    
+    @validates('start_time', 'end_time')
+    def _sync_minutes(self, key, value):
+        """Заполняет колонку минут при записи строкового времени"""
+        minutes = None
+        if value:
+            hours, mins = value.split(':')
+            minutes = int(hours) * 60 + int(mins)
+        setattr(self, 'start_minute' if key == 'start_time' else 'end_minute', minutes)
+        return value
 
 class PremiumSubscription(Base):
     __tablename__ = 'premium_subscriptions'
@@ -100,8 +165,27 @@ class PremiumSubscription(Base):
     is_active = Column(Boolean, default=False)
     expires_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.now)
+    # ID платежа ЮKassa, по нему отсекаются повторные вебхуки
+    payment_id = Column(String(100))
     
     user = relationship("User", back_populates="premium_subscription")
+    
+    __table_args__ = (
+        Index('ix_premium_subscriptions_user_active', 'user_id', 'is_active'),
+        # Тот же уникальный индекс создает миграция 4 для старых баз
+        Index('ux_premium_subscriptions_payment_id', 'payment_id', unique=True),
+    )
+
+class BotState(Base):
+    """Состояние диалогов и user_data бота между перезапусками (см. database/persistence.py)"""
+    __tablename__ = 'bot_state'
+    
+    # 'user_data' или 'conversation:<имя диалога>'
+    kind = Column(String(64), primary_key=True)
+    # ID пользователя или ключ диалога в JSON
+    key = Column(String(64), primary_key=True)
+    data = Column(Text)
+    updated_at = Column(DateTime, default=datetime.now)
 
 def create_tables():
     Base.metadata.create_all(engine)
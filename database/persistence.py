@@ -0,0 +1,228 @@
+"""Состояние диалогов и user_data в базе: перезапуск не прерывает начатые записи
+
+DatabasePersistence - BasePersistence для python-telegram-bot. Хранит
+user_data и состояния диалогов (ConversationHandler с persistent=True) в
+таблице bot_state. Запись отложенная: Application раз в
+PERSISTENCE_INTERVAL секунд передает изменившиеся данные, и они пишутся
+одной транзакцией в пуле потоков run_db; неизменившиеся строки не пишутся. При
+остановке бота несохраненное записывается сразу. Обработка сообщений
+базу состояния не ждет.
+
+Данные хранятся компактным JSON: дата и время - строками ISO, списки
+времени (available_times) и дат (available_dates) - первым значением и
+смещениями в минутах или днях, словари с нестроковыми ключами - парами.
+"""
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import bindparam, delete, insert, select
+from telegram.ext import BasePersistence, PersistenceInput
+from config import PERSISTENCE_INTERVAL
+from database.models import engine, BotState
+from database.session import run_db
+
+logger = logging.getLogger(__name__)
+
+USER_DATA = 'user_data'
+CONVERSATION = 'conversation:'
+
+
+def encode_value(value):
+    """Значение user_data -> JSON-совместимое значение"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'$d': value.isoformat()}
+    if isinstance(value, time):
+        return {'$t': value.isoformat()}
+    if isinstance(value, (list, tuple)):
+        return _encode_list(list(value))
+    if isinstance(value, dict):
+        if all(isinstance(key, str) and not key.startswith('$') for key in value):
+            return {key: encode_value(item) for key, item in value.items()}
+        return {'$map': [[encode_value(key), encode_value(item)] for key, item in value.items()]}
+    raise TypeError(f"Тип {type(value).__name__} не сохраняется")
+
+
+def _encode_list(values):
+    if values and all(type(value) is datetime and value.tzinfo is None
+                      and not value.second and not value.microsecond for value in values):
+        base = values[0]
+        return {'$dts': [base.isoformat(timespec='minutes')] +
+                        [int((value - base).total_seconds()) // 60 for value in values[1:]]}
+    if values and all(type(value) is date for value in values):
+        base = values[0]
+        return {'$ds': [base.isoformat()] + [(value - base).days for value in values[1:]]}
+    return [encode_value(value) for value in values]
+
+
+def decode_value(value):
+    """Обратное к encode_value"""
+    if isinstance(value, list):
+        return [decode_value(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '$dt' in value:
+        return datetime.fromisoformat(value['$dt'])
+    if '$d' in value:
+        return date.fromisoformat(value['$d'])
+    if '$t' in value:
+        return time.fromisoformat(value['$t'])
+    if '$dts' in value:
+        base, *offsets = value['$dts']
+        base = datetime.fromisoformat(base)
+        return [base] + [base + timedelta(minutes=offset) for offset in offsets]
+    if '$ds' in value:
+        base, *offsets = value['$ds']
+        base = date.fromisoformat(base)
+        return [base] + [base + timedelta(days=offset) for offset in offsets]
+    if '$map' in value:
+        return {decode_value(key): decode_value(item) for key, item in value['$map']}
+    return {key: decode_value(item) for key, item in value.items()}
+
+
+def dump_user_data(data):
+    """user_data -> строка JSON; значения, которые не сохраняются, пропускаются"""
+    encoded = {}
+    for key, value in data.items():
+        try:
+            encoded[key] = encode_value(value)
+        except TypeError as e:
+            logger.warning("user_data[%r] не сохранен: %s", key, e)
+    return json.dumps(encoded, ensure_ascii=False, separators=(',', ':'))
+
+
+def load_user_data(text):
+    return decode_value(json.loads(text))
+
+
+class DatabasePersistence(BasePersistence):
+    """user_data и состояния диалогов в таблице bot_state с отложенной пакетной записью"""
+
+    def __init__(self, engine=engine, update_interval=PERSISTENCE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.engine = engine
+        # (kind, key) -> данные, как они записаны в базе
+        self._stored = None
+        # (kind, key) -> новые данные или None (удалить)
+        self._pending = {}
+        # Изменения, которые сейчас записываются в пуле потоков
+        self._writing = {}
+
+    def _load(self):
+        if self._stored is None:
+            with self.engine.connect() as conn:
+                rows = conn.execute(select(BotState.kind, BotState.key, BotState.data)).all()
+            self._stored = {(kind, key): data for kind, key, data in rows}
+        return self._stored
+
+    def _rows(self, kind):
+        return [(key, data) for (row_kind, key), data in self._load().items() if row_kind == kind]
+
+    def _set(self, kind, key, data):
+        row = (kind, key)
+        current = self._writing[row] if row in self._writing else self._load().get(row)
+        if current == data:
+            self._pending.pop(row, None)
+        else:
+            self._pending[row] = data
+
+    async def get_user_data(self):
+        user_data = {}
+        for key, data in await run_db(self._rows, USER_DATA):
+            try:
+                user_data[int(key)] = load_user_data(data)
+            except (ValueError, TypeError, KeyError):
+                logger.warning("Не удалось прочитать user_data пользователя %s", key)
+        return user_data
+
+    async def update_user_data(self, user_id, data):
+        self._set(USER_DATA, str(user_id), dump_user_data(data) if data else None)
+
+    async def drop_user_data(self, user_id):
+        self._set(USER_DATA, str(user_id), None)
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def get_conversations(self, name):
+        conversations = {}
+        for key, data in await run_db(self._rows, CONVERSATION + name):
+            conversations[tuple(json.loads(key))] = json.loads(data)
+        return conversations
+
+    async def update_conversation(self, name, key, new_state):
+        data = None if new_state is None else json.dumps(new_state)
+        self._set(CONVERSATION + name, json.dumps(list(key)), data)
+
+    async def write_pending(self):
+        """Записывает накопленные изменения одной транзакцией"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        self._writing = pending
+        try:
+            await run_db(self._write, pending)
+        except Exception:
+            # Запишем в следующий раз; более новые изменения не затираем
+            for row, data in pending.items():
+                self._pending.setdefault(row, data)
+            raise
+        else:
+            stored = self._load()
+            for row, data in pending.items():
+                if data is None:
+                    stored.pop(row, None)
+                else:
+                    stored[row] = data
+        finally:
+            self._writing = {}
+
+    def _write(self, pending):
+        table = BotState.__table__
+        now = datetime.now()
+        with self.engine.begin() as conn:
+            conn.execute(
+                delete(table).where(table.c.kind == bindparam('b_kind'), table.c.key == bindparam('b_key')),
+                [{'b_kind': kind, 'b_key': key} for kind, key in pending]
+            )
+            rows = [{'kind': kind, 'key': key, 'data': data, 'updated_at': now}
+                    for (kind, key), data in pending.items() if data is not None]
+            if rows:
+                conn.execute(insert(table), rows)
+
+    async def flush(self):
+        await self.write_pending()
+
+    # Остальные данные (bot_data, chat_data, callback_data) не хранятся
+    async def get_bot_data(self):
+        return {}
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def get_chat_data(self):
+        return {}
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def get_callback_data(self):
+        return None
+
+    async def update_callback_data(self, data):
+        pass
@@ -0,0 +1,62 @@
+"""Сессии базы данных на время обработки одного обновления Telegram
+
+database.models.session - scoped_session: каждое обновление получает свою
+сессию, которая закрывается (с откатом незавершенной транзакции) после
+обработки. Ошибка в одном обновлении не ломает сессию других пользователей.
+Вне обновлений (скрипты, планировщик) сессия своя у каждого потока.
+Так же устроена read_session - сессия отчетов на движке только для чтения.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from config import DB_THREADS
+
+_update_scope = ContextVar('update_scope', default=None)
+
+# Свой пул потоков, а не общий asyncio.to_thread: число потоков известно, и
+# utils.update_processor оставляет им соединения в пуле движка
+_executor = ThreadPoolExecutor(max_workers=max(DB_THREADS, 1), thread_name_prefix='run_db')
+
+
+def current_scope():
+    """Ключ текущей сессии: обрабатываемое обновление или, вне обновлений, поток"""
+    scope = _update_scope.get()
+    return scope if scope is not None else threading.get_ident()
+
+
+def begin_scope():
+    """Открывает новую область сессии, возвращает токен для end_scope"""
+    return _update_scope.set(object())
+
+
+def end_scope(token):
+    """Закрывает сессии области и возвращает предыдущую область"""
+    from database.models import session, read_session
+
+    try:
+        session.remove()
+        read_session.remove()
+    finally:
+        _update_scope.reset(token)
+
+
+async def run_db(func, *args, **kwargs):
+    """Выполняет блокирующую работу с базой в пуле из DB_THREADS потоков
+
+    Цикл событий бота в это время обрабатывает другие обновления.
+    У вызова своя сессия, поэтому возвращать нужно готовые данные, а не
+    объекты, которые догружаются из базы при обращении.
+    """
+    def call():
+        token = begin_scope()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            end_scope(token)
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, call))
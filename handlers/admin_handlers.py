@@ -1,9 +1,13 @@
 from telegram import Update
 from telegram.ext import CallbackContext
-from database.models import session, User, PremiumSubscription
+from database.models import session, read_session, User, PremiumSubscription
+from database.session import run_db
 from keyboards import get_admin_keyboard, get_main_keyboard
 from datetime import datetime, timedelta
 from telegram import ReplyKeyboardMarkup
+from utils.availability_cache import free_slot_cache
+from database.instrumentation import query_stats
+from config import DB_INSTRUMENTATION
 
 # ID администратора
 ADMIN_IDS = [1653869832]  # ⚠️ ЗАМЕНИТЕ ЭТОТ ID НА ВАШ НАСТОЯЩИЙ TELEGRAM ID
@@ -18,7 +22,7 @@ async def admin_panel(update: Update, context: CallbackContext):
         await update.message.reply_text("❌ Доступ запрещен")
         return
     
-    stats = get_admin_stats()
+    stats = await run_db(get_admin_stats)
     
     admin_text = (
         "👑 **Панель администратора**\n\n"
@@ -249,7 +253,8 @@ async def view_system_stats(update: Update, context: CallbackContext):
         await update.message.reply_text("❌ Доступ запрещен")
         return
     
-    stats = get_admin_stats()
+    stats = await run_db(get_admin_stats)
+    cache_stats = free_slot_cache.stats()
     
     stats_text = (
         "📊 **Системная статистика**\n\n"
@@ -260,6 +265,10 @@ async def view_system_stats(update: Update, context: CallbackContext):
         f"• Конверсия в PRO: {round((stats['premium_users'] / stats['total_users']) * 100, 1) if stats['total_users'] > 0 else 0}%\n\n"
         f"📅 **Активность:**\n"
         f"• Активных записей: {stats['active_appointments']}\n\n"
+        f"⚡ **Кэш свободного времени:**\n"
+        f"• Попаданий: {cache_stats['hits']}, промахов: {cache_stats['misses']} ({cache_stats['hit_rate']}%)\n"
+        f"• Записей в кэше: {cache_stats['size']}/{cache_stats['max_size']}, устарело по сроку: {cache_stats['expirations']}\n\n"
+        f"{format_query_stats()}"
         f"🔄 **Обновлено:** {datetime.now().strftime('%d.%m.%Y %H:%M')}"
     )
     
@@ -269,29 +278,41 @@ async def view_system_stats(update: Update, context: CallbackContext):
         parse_mode='Markdown'
     )
 
+def format_query_stats():
+    """Блок статистики SQL-запросов для админ-панели (если сбор включен)"""
+    if not DB_INSTRUMENTATION:
+        return ""
+    
+    summary = query_stats.summary(top=3)
+    text = f"🗄️ **SQL-запросы:** {summary['total_queries']}\n"
+    for item in summary['handlers']:
+        text += f"• `{item['handler']}`: {item['mean_queries']} запр./вызов (макс. {item['max_queries']})\n"
+    if summary['slowest']:
+        text += f"• Самый медленный запрос: {summary['slowest'][0]['ms']} мс\n"
+    return text + "\n"
+
 async def view_all_users(update: Update, context: CallbackContext):
     """Просмотр всех пользователей"""
     if not is_admin(update.effective_user.id):
         await update.message.reply_text("❌ Доступ запрещен")
         return
     
-    users = session.query(User).all()
+    total_users, users = await run_db(get_users_overview, 20)  # Показываем первых 20 пользователей
     
-    if not users:
+    if not total_users:
         await update.message.reply_text("❌ В системе нет пользователей")
         return
     
     users_text = "👥 **Все пользователи системы:**\n\n"
     
-    for user in users[:20]:  # Показываем первых 20 пользователей
-        premium = session.query(PremiumSubscription).filter_by(user_id=user.id, is_active=True).first()
-        premium_status = "💎" if premium else "🔹"
-        username = f"@{user.username}" if user.username else "нет username"
-        users_text += f"{premium_status} **{user.full_name}** ({username})\n"
-        users_text += f"   📞 {user.phone} | 💼 {user.specialty}\n"
-        users_text += f"   📅 Зарегистрирован: {user.created_at.strftime('%d.%m.%Y')}\n\n"
+    for user in users:
+        premium_status = "💎" if user['premium'] else "🔹"
+        username = f"@{user['username']}" if user['username'] else "нет username"
+        users_text += f"{premium_status} **{user['full_name']}** ({username})\n"
+        users_text += f"   📞 {user['phone']} | 💼 {user['specialty']}\n"
+        users_text += f"   📅 Зарегистрирован: {user['created_at'].strftime('%d.%m.%Y')}\n\n"
     
-    users_text += f"\n📊 Всего: {len(users)} пользователей"
+    users_text += f"\n📊 Всего: {total_users} пользователей"
     
     await update.message.reply_text(
         users_text,
@@ -299,13 +320,38 @@ async def view_all_users(update: Update, context: CallbackContext):
         parse_mode='Markdown'
     )
 
+def get_users_overview(limit):
+    """Число пользователей и первые limit из них с признаком PRO (через базу для чтения)"""
+    total_users = read_session.query(User).count()
+    
+    rows = read_session.query(User, PremiumSubscription.id).outerjoin(
+        PremiumSubscription,
+        (PremiumSubscription.user_id == User.id) & (PremiumSubscription.is_active == True)
+    ).order_by(User.id).limit(limit).all()
+    
+    users = []
+    seen = set()
+    for user, premium_id in rows:
+        if user.id in seen:
+            continue
+        seen.add(user.id)
+        users.append({
+            'full_name': user.full_name,
+            'username': user.username,
+            'phone': user.phone,
+            'specialty': user.specialty,
+            'created_at': user.created_at,
+            'premium': premium_id is not None,
+        })
+    return total_users, users
+
 def get_admin_stats():
-    """Получение статистики для админ-панели"""
+    """Получение статистики для админ-панели (через базу для чтения)"""
     from database.models import Appointment
     
-    total_users = session.query(User).count()
-    premium_users = session.query(PremiumSubscription).filter_by(is_active=True).count()
-    active_appointments = session.query(Appointment).filter(
+    total_users = read_session.query(User).count()
+    premium_users = read_session.query(PremiumSubscription).filter_by(is_active=True).count()
+    active_appointments = read_session.query(Appointment).filter(
         Appointment.datetime >= datetime.now(),
         Appointment.status == 'booked'
     ).count()
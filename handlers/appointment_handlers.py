@@ -1,12 +1,14 @@
 from telegram import Update
 from telegram.ext import CallbackContext
-from database.models import session, User, Appointment, Client, Service
+from database.models import session, Appointment, Client, Service
+from utils.user_cache import get_user
 from keyboards import get_clients_keyboard, get_main_keyboard
+from utils.availability import notify_schedule_changed
 from datetime import datetime
 
 async def delete_appointment_menu(update: Update, context: CallbackContext):
     """Меню удаления записей"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
@@ -74,6 +76,7 @@ async def delete_appointment(update: Update, context: CallbackContext):
             
             session.delete(appointment)
             session.commit()
+            notify_schedule_changed(appointment.user_id, appointment.datetime.date())
             
             await update.message.reply_text(
                 f"✅ Запись удалена!\n\n"
@@ -1,9 +1,12 @@
 from telegram import Update
 from telegram.ext import CallbackContext, ConversationHandler
 from telegram import ReplyKeyboardMarkup
-from database.models import Client, Service, Appointment, session, User, WorkingSlot
+from database.models import Client, Service, Appointment, session, WorkingSlot
+from utils.user_cache import get_user
 from keyboards import get_booking_keyboard, get_clients_choice_keyboard, get_services_choice_keyboard, get_confirm_keyboard, get_back_keyboard, get_clients_keyboard
 from datetime import datetime, timedelta
+from utils.booking_utils import book_appointment
+from database.session import run_db
 import re
 
 # States для процесса записи
@@ -19,7 +22,7 @@ async def booking_menu(update: Update, context: CallbackContext):
 
 async def start_booking(update: Update, context: CallbackContext):
     """Начало процесса записи клиента"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     # Получаем список клиентов
     clients = session.query(Client).filter_by(user_id=user.id).all()
@@ -80,7 +83,7 @@ async def select_service(update: Update, context: CallbackContext):
     """Обработка выбора услуги"""
     if update.message.text == '🔙 Назад':
         # Получаем список клиентов заново
-        user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+        user = get_user(update.effective_user.id)
         clients = session.query(Client).filter_by(user_id=user.id).all()
         await update.message.reply_text(
             "👥 Выберите клиента для записи:",
@@ -97,9 +100,12 @@ async def select_service(update: Update, context: CallbackContext):
     context.user_data['selected_service_text'] = service_text
     
     # Получаем доступные даты
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
+    service = session.query(Service).filter_by(id=context.user_data['selected_service_id']).first()
     from utils.calendar_utils import get_available_dates
-    available_dates = get_available_dates(user.id, days_ahead=30)
+    available_dates = await run_db(
+        get_available_dates, user.id, days_ahead=30, service_duration=service.duration if service else 60
+    )
     
     if not available_dates:
         await update.message.reply_text(
@@ -155,13 +161,13 @@ async def select_date(update: Update, context: CallbackContext):
         context.user_data['selected_date'] = selected_date
         
         # Получаем доступное время для выбранной даты с учетом длительности услуги
-        user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+        user = get_user(update.effective_user.id)
         service_id = context.user_data['selected_service_id']
         service = session.query(Service).filter_by(id=service_id).first()
         service_duration = service.duration if service else 60
         
         from utils.calendar_utils import get_available_times
-        available_times = get_available_times(user.id, selected_date, service_duration)
+        available_times = await run_db(get_available_times, user.id, selected_date, service_duration)
         
         if not available_times:
             await update.message.reply_text(
@@ -224,9 +230,9 @@ async def select_time(update: Update, context: CallbackContext):
             return SELECT_TIME
         
         # Проверяем доступность времени с учетом длительности услуги
-        user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+        user = get_user(update.effective_user.id)
         from utils.calendar_utils import is_time_available
-        if not is_time_available(user.id, appointment_datetime, service_duration):
+        if not await run_db(is_time_available, user.id, appointment_datetime, service_duration):
             await update.message.reply_text(
                 f"❌ Время {time_text} уже занято или не подходит для услуги длительностью {service_duration} мин! "
                 "Выберите другое время:",
@@ -276,12 +282,18 @@ async def confirm_booking(update: Update, context: CallbackContext):
         return CONFIRM_BOOKING
     
     # ПРОВЕРЯЕМ, не занято ли это время (дополнительная проверка)
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     appointment_datetime = context.user_data['appointment_datetime']
-    service_duration = context.user_data.get('service_duration', 60)
     
-    from utils.calendar_utils import is_time_available
-    if not is_time_available(user.id, appointment_datetime, service_duration):
+    # Проверка и сохранение выполняются атомарно под блокировкой расписания мастера
+    appointment_id = await run_db(
+        book_appointment,
+        user.id,
+        context.user_data['selected_service_id'],
+        appointment_datetime,
+        client_id=context.user_data['selected_client_id']
+    )
+    if appointment_id is None:
         client = session.query(Client).get(context.user_data['selected_client_id'])
         service = session.query(Service).get(context.user_data['selected_service_id'])
         
@@ -293,18 +305,6 @@ async def confirm_booking(update: Update, context: CallbackContext):
         context.user_data.clear()
         return ConversationHandler.END
     
-    # Сохраняем запись в базу
-    new_appointment = Appointment(
-        user_id=user.id,
-        client_id=context.user_data['selected_client_id'],
-        service_id=context.user_data['selected_service_id'],
-        datetime=appointment_datetime,
-        status='booked'
-    )
-    
-    session.add(new_appointment)
-    session.commit()
-    
     # Получаем информацию для подтверждения
     client = session.query(Client).get(context.user_data['selected_client_id'])
     service = session.query(Service).get(context.user_data['selected_service_id'])
@@ -325,7 +325,7 @@ async def confirm_booking(update: Update, context: CallbackContext):
 
 async def show_active_appointments(update: Update, context: CallbackContext):
     """Показывает активные записи"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     # Получаем будущие записи
     appointments = session.query(Appointment).filter(
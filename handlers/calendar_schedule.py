@@ -1,8 +1,11 @@
 from telegram import Update
 from telegram.ext import CallbackContext, ConversationHandler
-from database.models import session, User, WorkingSlot
+from database.models import session, WorkingSlot
+from utils.user_cache import get_user
 from keyboards import get_calendar_schedule_keyboard, get_back_keyboard, get_custom_time_keyboard, get_main_keyboard
 from utils.calendar_utils import generate_simple_calendar_dates, get_available_times, get_available_dates
+from utils.availability import notify_schedule_changed
+from database.session import run_db
 from datetime import datetime, date, timedelta
 import re
 from telegram import ReplyKeyboardMarkup
@@ -27,7 +30,7 @@ async def calendar_schedule_menu(update: Update, context: CallbackContext):
 
 async def show_my_schedule(update: Update, context: CallbackContext):
     """Показывает текущее расписание пользователя"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
@@ -41,7 +44,7 @@ async def show_my_schedule(update: Update, context: CallbackContext):
         WorkingSlot.user_id == user.id,
         WorkingSlot.date >= today,
         WorkingSlot.date <= next_week
-    ).order_by(WorkingSlot.date, WorkingSlot.start_time).all()
+    ).order_by(WorkingSlot.date, WorkingSlot.start_minute).all()
     
     if not working_slots:
         await update.message.reply_text(
@@ -112,11 +115,11 @@ async def setup_schedule_select_date(update: Update, context: CallbackContext):
             context.user_data['selected_date_str'] = selected_date.strftime('%d.%m.%Y')
             
             # Показываем существующие слоты на эту дату
-            user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+            user = get_user(update.effective_user.id)
             existing_slots = session.query(WorkingSlot).filter_by(
                 user_id=user.id,
                 date=selected_date
-            ).order_by(WorkingSlot.start_time).all()
+            ).order_by(WorkingSlot.start_minute).all()
             
             if existing_slots:
                 slots_text = "📅 **Существующие слоты на этот день:**\n"
@@ -252,7 +255,7 @@ async def calendar_set_time(update: Update, context: CallbackContext):
                         return CALENDAR_SET_TIME
                     
                     # Сохраняем слот
-                    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+                    user = get_user(update.effective_user.id)
                     selected_date = context.user_data['selected_date']
                     
                     is_blocking = context.user_data.get('blocking_time', False)
@@ -267,6 +270,7 @@ async def calendar_set_time(update: Update, context: CallbackContext):
                     
                     session.add(slot)
                     session.commit()
+                    notify_schedule_changed(user.id, selected_date)
                     
                     if is_blocking:
                         success_message = (
@@ -346,7 +350,7 @@ async def block_set_time(update: Update, context: CallbackContext):
                         return BLOCK_SET_TIME
                     
                     # Сохраняем слот блокировки
-                    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+                    user = get_user(update.effective_user.id)
                     selected_date = context.user_data['selected_date']
                     
                     slot = WorkingSlot(
@@ -359,6 +363,7 @@ async def block_set_time(update: Update, context: CallbackContext):
                     
                     session.add(slot)
                     session.commit()
+                    notify_schedule_changed(user.id, selected_date)
                     
                     success_message = (
                         f"✅ **Время заблокировано!**\n\n"
@@ -413,7 +418,7 @@ async def calendar_add_another(update: Update, context: CallbackContext):
 
 async def show_free_slots_handler(update: Update, context: CallbackContext):
     """Показывает свободные окна - РАБОЧАЯ ВЕРСИЯ"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
@@ -428,7 +433,7 @@ async def show_free_slots_handler(update: Update, context: CallbackContext):
         current_date = today + timedelta(days=i)
         
         # Получаем доступное время
-        available_times = get_available_times(user.id, current_date)
+        available_times = await run_db(get_available_times, user.id, current_date)
         
         if available_times:
             has_slots = True
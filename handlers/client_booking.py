@@ -1,14 +1,20 @@
 from telegram import Update
 from telegram.ext import CallbackContext, ConversationHandler
 from datetime import datetime, timedelta
-from database.models import session, User, Service, Appointment, Client, MasterLink
+from database.models import session, User, Service, MasterLink
 from keyboards import (
     get_client_main_keyboard, get_services_choice_keyboard, 
     get_dates_keyboard, get_times_keyboard, get_confirm_keyboard,
     get_back_keyboard
 )
-from utils.calendar_utils import get_available_dates, get_available_times, is_time_available
-from telegram import ReplyKeyboardMarkup
+from utils.calendar_utils import is_time_available
+from utils.availability import (
+    get_availability_horizon, get_free_minutes_multi, minutes_to_datetime
+)
+from utils.booking_utils import book_appointment
+from database.session import run_db
+from utils.next_free import get_next_free_time
+from config import BOOKING_HORIZON_DAYS
 
 # States для процесса записи
 CHOOSE_SERVICE, CHOOSE_DATE, CHOOSE_TIME, CONFIRM_BOOKING, CLIENT_NAME, CLIENT_PHONE = range(6)
@@ -54,6 +60,7 @@ async def start_client_booking(update: Update, context: CallbackContext):
     )
     
     context.user_data['services'] = {f"📌 {s.name} - {s.price}₽": s.id for s in services}
+    context.user_data['service_durations'] = sorted({s.duration for s in services if s.duration})
     return CHOOSE_SERVICE
 
 async def choose_service(update: Update, context: CallbackContext):
@@ -75,26 +82,72 @@ async def choose_service(update: Update, context: CallbackContext):
     context.user_data['selected_service_price'] = selected_service.price
     context.user_data['selected_service_duration'] = selected_service.duration
     
-    # Получаем доступные даты
-    available_dates = get_available_dates(context.user_data['master_id'])
+    # Получаем доступные даты с количеством свободных окон одним проходом по горизонту
+    horizon = await run_db(
+        get_availability_horizon,
+        context.user_data['master_id'],
+        days_ahead=BOOKING_HORIZON_DAYS,
+        service_duration=selected_service.duration
+    )
+    available_dates = list(horizon)
     
     if not available_dates:
         await update.message.reply_text(
-            "❌ К сожалению, на ближайшие 2 недели нет свободных дат\n"
+            f"❌ К сожалению, в ближайшие {BOOKING_HORIZON_DAYS} дней нет свободных дат\n"
             "Пожалуйста, свяжитесь с мастером для уточнения расписания."
         )
         return ConversationHandler.END
     
-    dates_text = "\n".join([f"• {date.strftime('%d.%m.%Y (%A)')}" for date in available_dates[:5]])
+    dates_text = "\n".join([
+        f"• {date.strftime('%d.%m.%Y (%A)')} - свободных окон: {horizon[date]}" for date in available_dates[:5]
+    ])
+    
+    # Ближайшее свободное время для записи в одно нажатие
+    context.user_data['nearest_datetime'] = await run_db(
+        get_next_free_time, context.user_data['master_id'], selected_service.duration
+    )
     
     await update.message.reply_text(
         f"📅 Выберите дату:\n\n{dates_text}",
-        reply_markup=get_dates_keyboard(available_dates[:5])
+        reply_markup=get_dates_keyboard(available_dates[:5], get_nearest_button(context))
     )
     
     context.user_data['available_dates'] = available_dates
     return CHOOSE_DATE
 
+def get_nearest_button(context: CallbackContext):
+    """Текст кнопки ближайшего свободного времени"""
+    nearest = context.user_data.get('nearest_datetime')
+    if not nearest:
+        return None
+    return f"⚡ Ближайшее: {nearest.strftime('%d.%m.%Y %H:%M')}"
+
+async def choose_nearest_time(update: Update, context: CallbackContext):
+    """Запись на ближайшее свободное время без выбора даты и времени"""
+    nearest = context.user_data['nearest_datetime']
+    service_duration = context.user_data['selected_service_duration']
+    
+    if not await run_db(is_time_available, context.user_data['master_id'], nearest, service_duration):
+        context.user_data['nearest_datetime'] = await run_db(
+            get_next_free_time, context.user_data['master_id'], service_duration
+        )
+        await update.message.reply_text(
+            "❌ Это время уже заняли. Выберите дату или новое ближайшее время:",
+            reply_markup=get_dates_keyboard(context.user_data['available_dates'][:5], get_nearest_button(context))
+        )
+        return CHOOSE_DATE
+    
+    context.user_data['selected_date'] = nearest.date()
+    context.user_data['available_times'] = [nearest]
+    context.user_data['selected_datetime'] = nearest
+    
+    await update.message.reply_text(
+        f"⚡ Время: {nearest.strftime('%d.%m.%Y %H:%M')}\n\n"
+        "👤 Для завершения записи введите ваше имя:",
+        reply_markup=get_back_keyboard()
+    )
+    return CLIENT_NAME
+
 async def choose_date(update: Update, context: CallbackContext):
     """Обработка выбора даты"""
     if update.message.text == '🔙 Назад':
@@ -105,6 +158,9 @@ async def choose_date(update: Update, context: CallbackContext):
         )
         return CHOOSE_SERVICE
     
+    if update.message.text == get_nearest_button(context):
+        return await choose_nearest_time(update, context)
+    
     try:
         date_text = update.message.text
         selected_date = datetime.strptime(date_text.split(' (')[0], "%d.%m.%Y").date()
@@ -119,7 +175,10 @@ async def choose_date(update: Update, context: CallbackContext):
         
         # Получаем доступное время с учетом длительности услуги
         service_duration = context.user_data['selected_service_duration']
-        available_times = get_available_times(context.user_data['master_id'], selected_date, service_duration)
+        # Считаем сразу все длительности услуг мастера: при смене услуги время уже будет в кэше
+        durations = context.user_data.get('service_durations', []) + [service_duration]
+        free_by_duration = await run_db(get_free_minutes_multi, context.user_data['master_id'], selected_date, durations)
+        available_times = [minutes_to_datetime(selected_date, m) for m in free_by_duration[service_duration]]
         
         if not available_times:
             await update.message.reply_text(
@@ -149,7 +208,7 @@ async def choose_time(update: Update, context: CallbackContext):
         dates_text = "\n".join([f"• {date.strftime('%d.%m.%Y (%A)')}" for date in available_dates[:5]])
         await update.message.reply_text(
             f"📅 Выберите дату:\n\n{dates_text}",
-            reply_markup=get_dates_keyboard(available_dates[:5])
+            reply_markup=get_dates_keyboard(available_dates[:5], get_nearest_button(context))
         )
         return CHOOSE_DATE
     
@@ -168,7 +227,7 @@ async def choose_time(update: Update, context: CallbackContext):
             return CHOOSE_TIME
         
         # Дополнительная проверка доступности
-        if not is_time_available(context.user_data['master_id'], selected_datetime, service_duration):
+        if not await run_db(is_time_available, context.user_data['master_id'], selected_datetime, service_duration):
             await update.message.reply_text(
                 f"❌ Время {time_text} недоступно для услуги длительностью {service_duration} мин. "
                 "Выберите другое время:",
@@ -262,9 +321,17 @@ async def confirm_booking(update: Update, context: CallbackContext):
         await update.message.reply_text("❌ Пожалуйста, подтвердите или отмените запись")
         return CONFIRM_BOOKING
     
-    # Финальная проверка доступности времени
+    # Проверка времени и сохранение клиента с записью - одна атомарная операция
     service_duration = context.user_data['selected_service_duration']
-    if not is_time_available(context.user_data['master_id'], context.user_data['selected_datetime'], service_duration):
+    appointment_id = await run_db(
+        book_appointment,
+        context.user_data['master_id'],
+        context.user_data['selected_service_id'],
+        context.user_data['selected_datetime'],
+        client_name=context.user_data['client_name'],
+        client_phone=context.user_data['client_phone']
+    )
+    if appointment_id is None:
         await update.message.reply_text(
             "❌ К сожалению, это время уже занято. Пожалуйста, начните запись заново.",
             reply_markup=get_client_main_keyboard()
@@ -272,26 +339,6 @@ async def confirm_booking(update: Update, context: CallbackContext):
         context.user_data.clear()
         return ConversationHandler.END
     
-    # Сохраняем клиента
-    client = Client(
-        name=context.user_data['client_name'],
-        phone=context.user_data['client_phone'],
-        user_id=context.user_data['master_id']
-    )
-    session.add(client)
-    session.flush()  # Получаем ID клиента
-    
-    # Сохраняем запись
-    appointment = Appointment(
-        user_id=context.user_data['master_id'],
-        client_id=client.id,
-        service_id=context.user_data['selected_service_id'],
-        datetime=context.user_data['selected_datetime'],
-        status='booked'
-    )
-    session.add(appointment)
-    session.commit()
-    
     # Отправляем подтверждение
     service = session.query(Service).filter_by(id=context.user_data['selected_service_id']).first()
     end_time = context.user_data['selected_datetime'] + timedelta(minutes=service_duration)
@@ -1,16 +1,31 @@
 from telegram import Update
 from telegram.ext import CallbackContext, ConversationHandler
+from datetime import datetime, timedelta
 from database.models import session, User, MasterLink
-from keyboards import get_client_mode_keyboard, get_main_keyboard
+from utils.user_cache import get_user
+from keyboards import (get_client_mode_keyboard, get_main_keyboard, get_specialty_keyboard,
+                       get_dates_keyboard, get_search_duration_keyboard, get_search_time_keyboard)
 from handlers.client_booking import start_client_booking
+from handlers.start import SPECIALTY_MAP
+from utils.master_search import search_available_masters
+from utils.availability import DEFAULT_DURATION
+from utils.master_utils import get_master_links
+from database.session import run_db
 from telegram import ReplyKeyboardMarkup
 
 # States для переключения в режим клиента
-CLIENT_SELECT_MASTER = range(1)
+CLIENT_SELECT_MASTER = 0
+CLIENT_SEARCH_SPECIALTY, CLIENT_SEARCH_DATE, CLIENT_SEARCH_TIME = range(1, 4)
+CLIENT_SEARCH_DURATION = 4
+
+# На сколько дней вперед предлагать даты в поиске по специальности
+SEARCH_DAYS_AHEAD = 7
+# Длительности услуги на выбор в поиске (минуты): услуги у каждого мастера свои
+SEARCH_DURATIONS = [30, 60, 90, 120]
 
 async def switch_to_client_mode(update: Update, context: CallbackContext):
     """Переключение в режим клиента"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
@@ -41,6 +56,13 @@ async def client_select_master(update: Update, context: CallbackContext):
         await show_available_masters(update, context)
         return CLIENT_SELECT_MASTER
     
+    if update.message.text == '🔎 Поиск по специальности':
+        await update.message.reply_text(
+            "🔎 Выберите специальность мастера:",
+            reply_markup=get_specialty_keyboard()
+        )
+        return CLIENT_SEARCH_SPECIALTY
+    
     # Предполагаем, что введена ссылка
     link_text = update.message.text
     if link_text.startswith('https://t.me/'):
@@ -69,7 +91,7 @@ async def client_select_master(update: Update, context: CallbackContext):
 
 async def show_available_masters(update: Update, context: CallbackContext):
     """Показывает доступных мастеров"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     # Ищем всех мастеров (кроме себя)
     masters = session.query(User).filter(
@@ -88,15 +110,15 @@ async def show_available_masters(update: Update, context: CallbackContext):
     masters_text = "🔍 Доступные мастера:\n\n"
     keyboard = []
     
+    # Ссылки всех мастеров одним запросом
+    links = get_master_links([master.id for master in masters])
+    
     for master in masters:
         masters_text += f"👤 {master.full_name}\n"
         masters_text += f"   💼 {master.specialty}\n"
         masters_text += f"   📞 {master.phone}\n\n"
         
-        # Создаем временную ссылку для этого мастера
-        from utils.master_utils import get_master_link
-        link_code = get_master_link(master.id)
-        if link_code:
+        if links.get(master.id):
             keyboard.append([f"👤 {master.full_name} - 📅 Записаться"])
     
     keyboard.append(['🔙 Назад'])
@@ -109,6 +131,124 @@ async def show_available_masters(update: Update, context: CallbackContext):
     # Сохраняем mapping мастеров
     context.user_data['available_masters'] = {f"👤 {master.full_name} - 📅 Записаться": master.id for master in masters}
 
+async def search_select_specialty(update: Update, context: CallbackContext):
+    """Поиск по специальности: выбор специальности"""
+    if update.message.text == '🔙 Назад':
+        await update.message.reply_text("Режим клиента", reply_markup=get_client_mode_keyboard())
+        return CLIENT_SELECT_MASTER
+    
+    if update.message.text not in SPECIALTY_MAP:
+        await update.message.reply_text(
+            "❌ Выберите специальность из списка",
+            reply_markup=get_specialty_keyboard()
+        )
+        return CLIENT_SEARCH_SPECIALTY
+    
+    context.user_data['search_specialty'] = SPECIALTY_MAP[update.message.text]
+    context.user_data['search_specialty_name'] = update.message.text
+    
+    today = datetime.now().date()
+    dates = [today + timedelta(days=i) for i in range(SEARCH_DAYS_AHEAD)]
+    await update.message.reply_text(
+        "📅 Выберите дату:",
+        reply_markup=get_dates_keyboard(dates)
+    )
+    return CLIENT_SEARCH_DATE
+
+async def search_select_date(update: Update, context: CallbackContext):
+    """Поиск по специальности: выбор даты"""
+    if update.message.text == '🔙 Назад':
+        await update.message.reply_text(
+            "🔎 Выберите специальность мастера:",
+            reply_markup=get_specialty_keyboard()
+        )
+        return CLIENT_SEARCH_SPECIALTY
+    
+    try:
+        selected_date = datetime.strptime(update.message.text.split(' (')[0], "%d.%m.%Y").date()
+    except ValueError:
+        await update.message.reply_text("❌ Выберите дату из списка")
+        return CLIENT_SEARCH_DATE
+    
+    context.user_data['search_date'] = selected_date
+    await update.message.reply_text(
+        "⏱ Сколько длится услуга?",
+        reply_markup=get_search_duration_keyboard(SEARCH_DURATIONS)
+    )
+    return CLIENT_SEARCH_DURATION
+
+async def search_select_duration(update: Update, context: CallbackContext):
+    """Поиск по специальности: выбор длительности услуги"""
+    if update.message.text == '🔙 Назад':
+        today = datetime.now().date()
+        dates = [today + timedelta(days=i) for i in range(SEARCH_DAYS_AHEAD)]
+        await update.message.reply_text("📅 Выберите дату:", reply_markup=get_dates_keyboard(dates))
+        return CLIENT_SEARCH_DATE
+    
+    durations = {f"⏱ {duration} мин": duration for duration in SEARCH_DURATIONS}
+    if update.message.text not in durations:
+        await update.message.reply_text("❌ Выберите длительность из списка")
+        return CLIENT_SEARCH_DURATION
+    
+    context.user_data['search_duration'] = durations[update.message.text]
+    await update.message.reply_text(
+        "⏰ Выберите желаемое время или любое время:",
+        reply_markup=get_search_time_keyboard()
+    )
+    return CLIENT_SEARCH_TIME
+
+async def search_select_time(update: Update, context: CallbackContext):
+    """Поиск по специальности: выбор времени и вывод свободных мастеров"""
+    if update.message.text == '🔙 Назад':
+        await update.message.reply_text(
+            "⏱ Сколько длится услуга?",
+            reply_markup=get_search_duration_keyboard(SEARCH_DURATIONS)
+        )
+        return CLIENT_SEARCH_DURATION
+    
+    at_time = None
+    if update.message.text != '⏭️ Любое время':
+        try:
+            at_time = datetime.strptime(update.message.text, "%H:%M").time()
+        except ValueError:
+            await update.message.reply_text("❌ Выберите время из списка")
+            return CLIENT_SEARCH_TIME
+    
+    user = get_user(update.effective_user.id)
+    selected_date = context.user_data['search_date']
+    service_duration = context.user_data.get('search_duration', DEFAULT_DURATION)
+    masters = await run_db(
+        search_available_masters, context.user_data['search_specialty'], selected_date, service_duration,
+        at_time=at_time, exclude_user_id=user.id if user else None
+    )
+    
+    when = selected_date.strftime('%d.%m.%Y')
+    if at_time:
+        when += f" {at_time.strftime('%H:%M')}"
+    
+    if not masters:
+        await update.message.reply_text(
+            f"❌ Нет свободных мастеров ({context.user_data['search_specialty_name']}) на {when}\n"
+            "Попробуйте другую дату или время",
+            reply_markup=get_client_mode_keyboard()
+        )
+        return CLIENT_SELECT_MASTER
+    
+    masters_text = f"🔎 Свободные мастера на {when} (услуга {service_duration} мин):\n\n"
+    for master in masters:
+        times_text = ", ".join(time.strftime('%H:%M') for time in master['free_times'][:5])
+        masters_text += f"👤 {master['full_name']}\n"
+        masters_text += f"   📞 {master['phone']}\n"
+        masters_text += f"   ⏰ {times_text}\n"
+        if master['link_code']:
+            masters_text += f"   🔗 https://t.me/{context.bot.username}?start={master['link_code']}\n\n"
+        else:
+            masters_text += "   🔗 Ссылка для записи пока не создана\n\n"
+    
+    masters_text += "Отправьте ссылку мастера, чтобы записаться"
+    await update.message.reply_text(masters_text, reply_markup=get_client_mode_keyboard())
+    return CLIENT_SELECT_MASTER
+
 async def switch_back_to_master_mode(update: Update, context: CallbackContext):
     """Переключение обратно в режим мастера"""
     await update.message.reply_text(
@@ -0,0 +1,138 @@
+import os
+import tempfile
+from telegram import Update
+from telegram.ext import CallbackContext, ConversationHandler
+from database.models import session, Client
+from utils.user_cache import get_user, is_premium
+from database.session import run_db
+from keyboards import get_clients_keyboard, get_cancel_keyboard
+from handlers.clients import FREE_CLIENTS_LIMIT
+from utils.client_transfer import import_clients, export_clients_csv, export_appointments_csv, ImportFileError
+
+# State для импорта клиентов
+IMPORT_FILE = 0
+
+# Больше 20 МБ бот не может скачать через Bot API
+IMPORT_MAX_FILE_SIZE = 20 * 1024 * 1024
+
+IMPORT_FORMATS = {'.csv': 'csv', '.xlsx': 'xlsx'}
+
+async def import_clients_start(update: Update, context: CallbackContext):
+    """Начало импорта клиентов из файла"""
+    user = get_user(update.effective_user.id)
+
+    if not user:
+        await update.message.reply_text("Сначала завершите регистрацию через /start")
+        return ConversationHandler.END
+
+    await update.message.reply_text(
+        "📥 Импорт клиентов\n\n"
+        "Отправьте файл CSV или XLSX (до 20 МБ).\n"
+        "Колонки: Имя, Телефон и необязательно Заметки - "
+        "с заголовком или в этом порядке без него.\n\n"
+        "Клиенты с уже сохраненным телефоном пропускаются.",
+        reply_markup=get_cancel_keyboard()
+    )
+    return IMPORT_FILE
+
+async def import_clients_file(update: Update, context: CallbackContext):
+    """Получаем файл и импортируем клиентов"""
+    document = update.message.document
+    file_format = IMPORT_FORMATS.get(os.path.splitext(document.file_name or '')[1].lower())
+
+    if not file_format:
+        await update.message.reply_text(
+            "❌ Поддерживаются только файлы .csv и .xlsx\n\n"
+            "Отправьте другой файл или нажмите '❌ Отмена'"
+        )
+        return IMPORT_FILE
+
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        await update.message.reply_text("❌ Файл больше 20 МБ. Разделите его на части и отправьте по очереди")
+        return IMPORT_FILE
+
+    user = get_user(update.effective_user.id)
+
+    limit = None
+    if not is_premium(update.effective_user.id):
+        clients_count = session.query(Client).filter_by(user_id=user.id).count()
+        limit = max(FREE_CLIENTS_LIMIT - clients_count, 0)
+
+    await update.message.reply_text("⏳ Загружаю клиентов...")
+
+    handle, path = tempfile.mkstemp(suffix='.' + file_format)
+    os.close(handle)
+    try:
+        telegram_file = await document.get_file()
+        await telegram_file.download_to_drive(path)
+        result = await run_db(import_clients, user.id, path, file_format, limit)
+        error = None
+    except ImportFileError as e:
+        result, error = e.result, e
+    except ValueError as e:
+        await update.message.reply_text(f"❌ Не удалось прочитать файл: {e}", reply_markup=get_clients_keyboard())
+        return ConversationHandler.END
+    finally:
+        os.remove(path)
+
+    if error is not None and not any(result.values()):
+        await update.message.reply_text(f"❌ Не удалось прочитать файл: {error}", reply_markup=get_clients_keyboard())
+        return ConversationHandler.END
+
+    if error is not None:
+        result_text = (
+            f"⚠️ Файл прочитан не до конца: {error}\n"
+            "Клиенты до этого места сохранены, остальное можно загрузить отдельным файлом.\n\n"
+        )
+    else:
+        result_text = "✅ Импорт завершен!\n\n"
+    result_text += (
+        f"➕ Добавлено: {result['added']}\n"
+        f"🔁 Уже были в базе: {result['duplicates']}\n"
+        f"⚠️ Без имени или с неверным телефоном: {result['invalid']}\n"
+    )
+    if result['over_limit']:
+        result_text += (
+            f"\n❌ Не добавлено из-за лимита: {result['over_limit']}\n"
+            f"В бесплатной версии можно добавить не более {FREE_CLIENTS_LIMIT} клиентов.\n"
+            "💎 В PRO версии количество клиентов не ограничено"
+        )
+
+    await update.message.reply_text(result_text, reply_markup=get_clients_keyboard())
+    return ConversationHandler.END
+
+async def import_clients_wrong_input(update: Update, context: CallbackContext):
+    """Вместо файла пришел текст"""
+    await update.message.reply_text("📎 Отправьте файл CSV или XLSX или нажмите '❌ Отмена'")
+    return IMPORT_FILE
+
+async def cancel_import_clients(update: Update, context: CallbackContext):
+    """Отмена импорта"""
+    await update.message.reply_text("❌ Импорт отменен", reply_markup=get_clients_keyboard())
+    return ConversationHandler.END
+
+async def export_clients(update: Update, context: CallbackContext):
+    """Выгрузка клиентов и истории записей в CSV"""
+    user = get_user(update.effective_user.id)
+
+    if not user:
+        await update.message.reply_text("Сначала завершите регистрацию через /start")
+        return
+
+    await update.message.reply_text("⏳ Готовлю выгрузку...")
+
+    files = []
+    try:
+        files.append((await run_db(export_clients_csv, user.id), 'clients.csv', "👥 Клиенты"))
+        files.append((await run_db(export_appointments_csv, user.id), 'appointments.csv', "📅 История записей"))
+        for path, filename, caption in files:
+            with open(path, 'rb') as f:
+                await update.message.reply_document(document=f, filename=filename, caption=caption)
+    finally:
+        for path, _, _ in files:
+            os.remove(path)
+
+    await update.message.reply_text(
+        "✅ Выгрузка готова. Файлы открываются в Excel и Google Таблицах",
+        reply_markup=get_clients_keyboard()
+    )
@@ -1,13 +1,18 @@
 from telegram import Update
 from telegram.ext import CallbackContext, ConversationHandler
-from database.models import Client, Appointment, Service, session, User, PremiumSubscription
+from database.models import Client, session
+from utils.user_cache import get_user, is_premium
 from keyboards import get_clients_keyboard, get_back_keyboard, get_cancel_keyboard, get_main_keyboard
+from utils.appointment_history import iter_appointments
 from datetime import datetime, timedelta
 import re
 
 # States для добавления клиента
 CLIENT_NAME, CLIENT_PHONE = range(2)
 
+# Лимит клиентов для бесплатной версии
+FREE_CLIENTS_LIMIT = 10
+
 async def clients_menu(update: Update, context: CallbackContext):
     """Меню управления клиентами"""
     await update.message.reply_text(
@@ -18,7 +23,7 @@ async def clients_menu(update: Update, context: CallbackContext):
 
 async def show_my_clients(update: Update, context: CallbackContext):
     """Показывает список клиентов пользователя"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
@@ -46,13 +51,12 @@ async def show_my_clients(update: Update, context: CallbackContext):
 
 async def add_client_start(update: Update, context: CallbackContext):
     """Начало процесса добавления клиента"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     # Проверяем лимит клиентов для бесплатных пользователей
-    premium = session.query(PremiumSubscription).filter_by(user_id=user.id, is_active=True).first()
-    if not premium:
+    if not is_premium(update.effective_user.id):
         clients_count = session.query(Client).filter_by(user_id=user.id).count()
-        if clients_count >= 10:  # Лимит 10 клиентов для бесплатной версии
+        if clients_count >= FREE_CLIENTS_LIMIT:
             await update.message.reply_text(
                 "❌ **Достигнут лимит клиентов!**\n\n"
                 "В бесплатной версии можно добавить не более 10 клиентов.\n\n"
@@ -95,7 +99,7 @@ async def add_client_phone(update: Update, context: CallbackContext):
     context.user_data['client_phone'] = update.message.text
     
     # Сохраняем клиента в базу
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     new_client = Client(
         user_id=user.id,
@@ -119,13 +123,14 @@ async def add_client_phone(update: Update, context: CallbackContext):
 
 async def show_all_appointments(update: Update, context: CallbackContext):
     """Показывает все записи пользователя"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
         return
     
-    appointments = session.query(Appointment).filter_by(user_id=user.id).order_by(Appointment.datetime).all()
+    # Вместе с архивом: перенос старых записей не убирает их из истории
+    appointments = list(iter_appointments(user.id))
     
     if not appointments:
         await update.message.reply_text(
@@ -137,11 +142,8 @@ async def show_all_appointments(update: Update, context: CallbackContext):
     
     appointments_text = "📅 Все записи:\n\n"
     for i, appointment in enumerate(appointments, 1):
-        client = session.query(Client).filter_by(id=appointment.client_id).first()
-        service = session.query(Service).filter_by(id=appointment.service_id).first()
-        
-        appointments_text += f"{i}. {client.name if client else 'Неизвестный клиент'}\n"
-        appointments_text += f"   📌 {service.name if service else 'Неизвестная услуга'}\n"
+        appointments_text += f"{i}. {appointment.client_name or 'Неизвестный клиент'}\n"
+        appointments_text += f"   📌 {appointment.service_name or 'Неизвестная услуга'}\n"
         appointments_text += f"   🕐 {appointment.datetime.strftime('%d.%m.%Y %H:%M')}\n"
         appointments_text += f"   📊 Статус: {appointment.status}\n\n"
     
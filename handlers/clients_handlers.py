@@ -1,7 +1,11 @@
 from telegram import Update
 from telegram.ext import CallbackContext
-from database.models import session, User, Client, Appointment, Service
-from keyboards import get_clients_keyboard, get_main_keyboard
+from database.models import session, Client, Appointment, Service
+from utils.user_cache import get_user
+from database.session import run_db
+from keyboards import get_clients_keyboard, get_clients_page_keyboard, get_main_keyboard
+from utils.client_summary import get_client_summaries, CLIENTS_PAGE_SIZE
+from utils.appointment_history import get_recent_appointments
 from datetime import datetime
 
 async def clients_menu(update: Update, context: CallbackContext):
@@ -13,16 +17,31 @@ async def clients_menu(update: Update, context: CallbackContext):
     )
 
 async def show_my_clients(update: Update, context: CallbackContext):
-    """Показывает список клиентов мастера"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    """Показывает список клиентов мастера (первая страница)"""
+    context.user_data['clients_page'] = 0
+    await send_clients_page(update, context)
+
+async def show_next_clients(update: Update, context: CallbackContext):
+    """Следующая страница списка клиентов"""
+    context.user_data['clients_page'] = context.user_data.get('clients_page', 0) + 1
+    await send_clients_page(update, context)
+
+async def show_prev_clients(update: Update, context: CallbackContext):
+    """Предыдущая страница списка клиентов"""
+    context.user_data['clients_page'] = max(context.user_data.get('clients_page', 0) - 1, 0)
+    await send_clients_page(update, context)
+
+async def send_clients_page(update: Update, context: CallbackContext):
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
         return
     
-    clients = session.query(Client).filter_by(user_id=user.id).all()
+    page = context.user_data.get('clients_page', 0)
+    total, clients = await run_db(get_client_summaries, user.id, page)
     
-    if not clients:
+    if not total:
         await update.message.reply_text(
             "👥 У вас пока нет клиентов\n\n"
             "Клиенты появятся здесь после их первой записи",
@@ -30,38 +49,34 @@ async def show_my_clients(update: Update, context: CallbackContext):
         )
         return
     
-    clients_text = "👥 Ваши клиенты:\n\n"
+    pages = (total + CLIENTS_PAGE_SIZE - 1) // CLIENTS_PAGE_SIZE
+    if page >= pages:
+        # Клиентов стало меньше - показываем последнюю страницу
+        page = context.user_data['clients_page'] = pages - 1
+        total, clients = await run_db(get_client_summaries, user.id, page)
     
-    for i, client in enumerate(clients, 1):
-        # Считаем количество записей клиента
-        appointments_count = session.query(Appointment).filter_by(
-            user_id=user.id, 
-            client_id=client.id
-        ).count()
-        
-        # Последняя запись
-        last_appointment = session.query(Appointment).filter_by(
-            user_id=user.id, 
-            client_id=client.id
-        ).order_by(Appointment.datetime.desc()).first()
-        
-        clients_text += f"{i}. {client.name}\n"
-        clients_text += f"   📞 {client.phone}\n"
-        clients_text += f"   📅 Записей: {appointments_count}\n"
+    clients_text = f"👥 Ваши клиенты ({total}):\n\n"
+    if pages > 1:
+        clients_text = f"👥 Ваши клиенты ({total}), стр. {page + 1} из {pages}:\n\n"
+    
+    for i, client in enumerate(clients, page * CLIENTS_PAGE_SIZE + 1):
+        clients_text += f"{i}. {client['name']}\n"
+        clients_text += f"   📞 {client['phone']}\n"
+        clients_text += f"   📅 Записей: {client['appointments_count']}\n"
         
-        if last_appointment:
-            clients_text += f"   🗓️ Последняя: {last_appointment.datetime.strftime('%d.%m.%Y')}\n"
+        if client['last_visit']:
+            clients_text += f"   🗓️ Последняя: {client['last_visit'].strftime('%d.%m.%Y')}\n"
         
         clients_text += "\n"
     
     await update.message.reply_text(
         clients_text,
-        reply_markup=get_clients_keyboard()
+        reply_markup=get_clients_page_keyboard(page > 0, page < pages - 1)
     )
 
 async def show_client_appointments(update: Update, context: CallbackContext):
     """Показывает все записи клиентов"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
@@ -98,16 +113,14 @@ async def show_client_appointments(update: Update, context: CallbackContext):
 
 async def show_all_appointments(update: Update, context: CallbackContext):
     """Показывает все записи (историю)"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
         return
     
-    # Все записи
-    all_appointments = session.query(Appointment).filter_by(
-        user_id=user.id
-    ).order_by(Appointment.datetime.desc()).limit(10).all()
+    # Последние записи вместе с архивом: перенос старых записей не убирает их из истории
+    all_appointments = await run_db(get_recent_appointments, user.id, 10)
     
     if not all_appointments:
         await update.message.reply_text(
@@ -119,10 +132,9 @@ async def show_all_appointments(update: Update, context: CallbackContext):
     appointments_text = "📋 История записей:\n\n"
     
     for appt in all_appointments:
-        client = session.query(Client).filter_by(id=appt.client_id).first()
         status_emoji = "✅" if appt.status == 'completed' else "📅" if appt.status == 'booked' else "❌"
         
-        appointments_text += f"{status_emoji} {client.name}\n"
+        appointments_text += f"{status_emoji} {appt.client_name or 'Неизвестный клиент'}\n"
         appointments_text += f"   📅 {appt.datetime.strftime('%d.%m.%Y %H:%M')}\n"
         appointments_text += f"   🏷️ {appt.status}\n"
         appointments_text += f"──────────────\n"
@@ -134,7 +146,7 @@ async def show_all_appointments(update: Update, context: CallbackContext):
 
 async def show_my_appointments_handler(update: Update, context: CallbackContext):
     """Обработчик для кнопки 'Мои записи' в главном меню"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
@@ -1,13 +1,14 @@
 from telegram import Update
 from telegram.ext import CallbackContext
-from database.models import session, User, Appointment, Client, Service
+from database.models import session, Appointment, Client, Service
+from utils.user_cache import get_user
 from utils.master_utils import generate_master_link, get_master_link
 from keyboards import get_main_keyboard
 from datetime import datetime
 
 async def get_booking_link(update: Update, context: CallbackContext):
     """Показывает ссылку для записи клиентов"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
@@ -32,7 +33,7 @@ async def get_booking_link(update: Update, context: CallbackContext):
 
 async def show_client_appointments(update: Update, context: CallbackContext):
     """Показывает записи клиентов к мастеру"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
@@ -1,6 +1,5 @@
 from telegram import Update, KeyboardButton, ReplyKeyboardMarkup
 from telegram.ext import CallbackContext, MessageHandler, filters, ConversationHandler
-from utils.payment_utils import create_premium_payment, activate_premium_subscription, get_payment_info
 from database.models import session, User
 import asyncio
 from datetime import datetime, timedelta
@@ -67,6 +66,8 @@ async def start_payment_process(update: Update, context: CallbackContext):
 
 async def confirm_payment(update: Update, context: CallbackContext):
     """Подтверждение оплаты и создание платежа"""
+    # SDK ЮKassa загружается при первом платеже, а не при старте бота
+    from utils.payment_utils import create_premium_payment
     user_message = update.message.text
     
     if user_message == "❌ Отменить":
@@ -120,6 +121,7 @@ async def confirm_payment(update: Update, context: CallbackContext):
 
 async def check_payment_status(update: Update, context: CallbackContext):
     """Проверка статуса платежа"""
+    from utils.payment_utils import activate_premium_subscription, get_payment_info
     payment_id = context.user_data.get('payment_id')
     user_id = update.effective_user.id
     
@@ -214,7 +216,9 @@ def setup_payment_handlers(application):
                 MessageHandler(filters.Text(["✅ Я оплатил", "❌ Отменить"]), check_payment_status)
             ]
         },
-        fallbacks=[MessageHandler(filters.Text(["❌ Отменить"]), cancel_payment)]
+        fallbacks=[MessageHandler(filters.Text(["❌ Отменить"]), cancel_payment)],
+        name='payment',
+        persistent=application.persistence is not None
     )
     
     application.add_handler(payment_conv)
\ No newline at end of file
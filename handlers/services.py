@@ -1,8 +1,10 @@
 from telegram import Update
 from telegram.ext import CallbackContext, ConversationHandler
-from database.models import Service, session, User, PremiumSubscription
+from database.models import Service, session
+from utils.user_cache import get_user, is_premium
 from keyboards import get_services_keyboard, get_back_keyboard, get_main_keyboard
 from telegram import ReplyKeyboardMarkup
+from utils.availability import notify_schedule_changed
 
 # States для создания услуги
 SERVICE_NAME, SERVICE_DURATION, SERVICE_PRICE = range(3)
@@ -21,7 +23,7 @@ async def services_menu(update: Update, context: CallbackContext):
 
 async def show_my_services(update: Update, context: CallbackContext):
     """Показывает список услуг пользователя"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
@@ -47,11 +49,10 @@ async def show_my_services(update: Update, context: CallbackContext):
 
 async def add_service_start(update: Update, context: CallbackContext):
     """Начало процесса добавления услуги"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     # Проверяем лимит услуг для бесплатных пользователей
-    premium = session.query(PremiumSubscription).filter_by(user_id=user.id, is_active=True).first()
-    if not premium:
+    if not is_premium(update.effective_user.id):
         services_count = session.query(Service).filter_by(user_id=user.id).count()
         if services_count >= 5:  # Лимит 5 услуг для бесплатной версии
             await update.message.reply_text(
@@ -128,7 +129,7 @@ async def add_service_price(update: Update, context: CallbackContext):
         return SERVICE_PRICE
     
     # Сохраняем услугу в базу
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     new_service = Service(
         user_id=user.id,
@@ -154,7 +155,7 @@ async def add_service_price(update: Update, context: CallbackContext):
 
 async def edit_service_start(update: Update, context: CallbackContext):
     """Начало процесса редактирования услуги"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     services = session.query(Service).filter_by(user_id=user.id).all()
     
@@ -266,6 +267,10 @@ async def edit_service_price(update: Update, context: CallbackContext):
     
     session.commit()
     
+    # Длительность услуги меняет занятость по уже существующим записям
+    if 'new_duration' in context.user_data:
+        notify_schedule_changed(service.user_id)
+    
     await update.message.reply_text(
         f"✅ Услуга обновлена!\n\n"
         f"📌 {service.name}\n"
@@ -279,7 +284,7 @@ async def edit_service_price(update: Update, context: CallbackContext):
 
 async def delete_service_start(update: Update, context: CallbackContext):
     """Начало процесса удаления услуги"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     services = session.query(Service).filter_by(user_id=user.id).all()
     
@@ -321,6 +326,7 @@ async def delete_select_service(update: Update, context: CallbackContext):
     if service:
         session.delete(service)
         session.commit()
+        notify_schedule_changed(service.user_id)
         
         await update.message.reply_text(
             f"✅ Услуга удалена!\n\n"
@@ -1,6 +1,9 @@
 from telegram import Update
 from telegram.ext import CallbackContext
-from database.models import session, User, PremiumSubscription, Client, Service, Appointment
+from database.models import session, read_session, User, PremiumSubscription, Client, Service, Appointment
+from utils.user_cache import get_user, is_premium
+from database.session import run_db
+from database.archive import appointment_history
 from keyboards import (
     get_main_keyboard, get_settings_keyboard,
     get_premium_keyboard, get_premium_plans_keyboard
@@ -8,19 +11,17 @@ from keyboards import (
 from datetime import datetime, timedelta
 from sqlalchemy import func
 from telegram import KeyboardButton, ReplyKeyboardMarkup
-from utils.payment_utils import create_premium_payment, activate_premium_subscription
 
 async def settings_menu(update: Update, context: CallbackContext):
     """Меню настроек"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
         return
     
     # Проверяем премиум статус
-    premium = session.query(PremiumSubscription).filter_by(user_id=user.id, is_active=True).first()
-    premium_status = "✅ АКТИВЕН" if premium else "❌ НЕ АКТИВЕН"
+    premium_status = "✅ АКТИВЕН" if is_premium(update.effective_user.id) else "❌ НЕ АКТИВЕН"
     
     settings_text = (
         "⚙️ **Настройки**\n\n"
@@ -36,7 +37,7 @@ async def settings_menu(update: Update, context: CallbackContext):
 
 async def premium_features(update: Update, context: CallbackContext):
     """Премиум функции с ОБЫЧНЫМИ кнопками"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     premium = session.query(PremiumSubscription).filter_by(user_id=user.id, is_active=True).first()
     
     if premium:
@@ -151,15 +152,14 @@ async def process_premium_purchase(update: Update, context: CallbackContext):
 
 async def show_statistics(update: Update, context: CallbackContext):
     """Показывает статистику мастера - ТОЛЬКО ДЛЯ PRO"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
         return
     
     # ПРОВЕРКА ПРЕМИУМА
-    premium = session.query(PremiumSubscription).filter_by(user_id=user.id, is_active=True).first()
-    if not premium:
+    if not is_premium(update.effective_user.id):
         await update.message.reply_text(
             "❌ **Статистика доступна только в PRO версии!**\n\n"
             "💎 **PRO версия включает:**\n"
@@ -172,23 +172,15 @@ async def show_statistics(update: Update, context: CallbackContext):
         )
         return
     
-    # СТАТИСТИКА ДЛЯ PRO ПОЛЬЗОВАТЕЛЕЙ
-    clients_count = session.query(Client).filter_by(user_id=user.id).count()
-    services_count = session.query(Service).filter_by(user_id=user.id).count()
-    appointments_count = session.query(Appointment).filter_by(user_id=user.id).count()
-    
-    active_appointments = session.query(Appointment).filter(
-        Appointment.user_id == user.id,
-        Appointment.datetime >= datetime.now(),
-        Appointment.status == 'booked'
-    ).count()
+    # СТАТИСТИКА ДЛЯ PRO ПОЛЬЗОВАТЕЛЕЙ (считается через базу для чтения, вне цикла событий)
+    stats = await run_db(get_master_stats, user.id)
     
     stats_text = (
         "📊 **Ваша статистика PRO**\n\n"
-        f"👥 **Клиенты:** {clients_count}\n"
-        f"💼 **Услуги:** {services_count}\n"
-        f"📅 **Всего записей:** {appointments_count}\n"
-        f"🟢 **Активные записи:** {active_appointments}\n"
+        f"👥 **Клиенты:** {stats['clients']}\n"
+        f"💼 **Услуги:** {stats['services']}\n"
+        f"📅 **Всего записей:** {stats['appointments']}\n"
+        f"🟢 **Активные записи:** {stats['active_appointments']}\n"
     )
     
     await update.message.reply_text(
@@ -197,9 +189,25 @@ async def show_statistics(update: Update, context: CallbackContext):
         parse_mode='Markdown'
     )
 
+def get_master_stats(user_id):
+    """Счетчики для статистики мастера"""
+    active_appointments = read_session.query(Appointment).filter(
+        Appointment.user_id == user_id,
+        Appointment.datetime >= datetime.now(),
+        Appointment.status == 'booked'
+    ).count()
+    
+    return {
+        'clients': read_session.query(Client).filter_by(user_id=user_id).count(),
+        'services': read_session.query(Service).filter_by(user_id=user_id).count(),
+        # Вместе с перенесенными в архив
+        'appointments': read_session.query(func.count()).select_from(appointment_history(user_id)).scalar(),
+        'active_appointments': active_appointments,
+    }
+
 async def user_profile(update: Update, context: CallbackContext):
     """Профиль пользователя"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     premium = session.query(PremiumSubscription).filter_by(user_id=user.id, is_active=True).first()
     
     profile_text = (
@@ -227,7 +235,7 @@ async def user_profile(update: Update, context: CallbackContext):
 
 async def try_free_trial(update: Update, context: CallbackContext):
     """Активация бесплатного пробного периода"""
-    user = session.query(User).filter_by(telegram_id=update.effective_user.id).first()
+    user = get_user(update.effective_user.id)
     
     if not user:
         await update.message.reply_text("Сначала завершите регистрацию через /start")
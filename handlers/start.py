@@ -5,6 +5,9 @@ from keyboards import get_main_keyboard, get_specialty_keyboard
 
 SPECIALTY, PHONE = range(2)
 
+# Кнопки выбора специальности -> код специальности в базе
+SPECIALTY_MAP = {'💄 Косметолог/Мастер': 'beauty', '👨‍🏫 Репетитор': 'tutor', '❓ Другое': 'other'}
+
 async def start(update: Update, context: CallbackContext) -> int:
     # ЕСЛИ ЕСТЬ АРГУМЕНТЫ - это клиент по ссылке
     if context.args:
@@ -50,8 +53,7 @@ async def set_specialty(update: Update, context: CallbackContext) -> int:
         return ConversationHandler.END
     
     specialty_text = update.message.text
-    specialty_map = {'💄 Косметолог/Мастер': 'beauty', '👨‍🏫 Репетитор': 'tutor', '❓ Другое': 'other'}
-    context.user_data['specialty'] = specialty_map.get(specialty_text, 'other')
+    context.user_data['specialty'] = SPECIALTY_MAP.get(specialty_text, 'other')
     context.user_data['full_name'] = update.effective_user.full_name
     context.user_data['username'] = update.effective_user.username
     
@@ -54,9 +54,25 @@ def get_clients_keyboard():
     return ReplyKeyboardMarkup([
         ['👥 Мои клиенты', '➕ Добавить клиента'],
         ['📅 Записать клиента', '📋 Активные записи'],
+        ['📥 Импорт клиентов', '📤 Экспорт клиентов'],
         ['🗑️ Удалить запись', '🔙 Главное меню']
     ], resize_keyboard=True)
 
+def get_clients_page_keyboard(has_prev, has_next):
+    navigation = []
+    if has_prev:
+        navigation.append('⬅️ Предыдущие клиенты')
+    if has_next:
+        navigation.append('➡️ Следующие клиенты')
+    keyboard = [navigation] if navigation else []
+    keyboard += [
+        ['👥 Мои клиенты', '➕ Добавить клиента'],
+        ['📅 Записать клиента', '📋 Активные записи'],
+        ['📥 Импорт клиентов', '📤 Экспорт клиентов'],
+        ['🗑️ Удалить запись', '🔙 Главное меню']
+    ]
+    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+
 def get_cancel_keyboard():
     return ReplyKeyboardMarkup([
         ['❌ Отмена']
@@ -93,8 +109,10 @@ def get_client_main_keyboard():
         ['📋 Мои записи', '📞 Связаться с мастером']
     ], resize_keyboard=True)
 
-def get_dates_keyboard(available_dates):
+def get_dates_keyboard(available_dates, nearest_button=None):
     keyboard = []
+    if nearest_button:
+        keyboard.append([nearest_button])
     for date in available_dates:
         keyboard.append([date.strftime("%d.%m.%Y (%A)")])
     keyboard.append(['🔙 Назад'])
@@ -157,7 +175,7 @@ def get_admin_keyboard():
 # Добавленные функции
 def get_client_mode_keyboard():
     return ReplyKeyboardMarkup([
-        ['🔍 Найти мастеров'],
+        ['🔍 Найти мастеров', '🔎 Поиск по специальности'],
         ['🔙 Назад к мастеру']
     ], resize_keyboard=True)
 
@@ -178,6 +196,24 @@ def get_custom_time_keyboard():
         ['🔙 Назад']
     ], resize_keyboard=True)
 
+def get_search_duration_keyboard(durations):
+    """Длительность услуги для поиска мастеров, по две кнопки в ряд"""
+    buttons = [f"⏱ {duration} мин" for duration in durations]
+    keyboard = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    keyboard.append(['🔙 Назад'])
+    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+
+def get_search_time_keyboard():
+    return ReplyKeyboardMarkup([
+        ['⏭️ Любое время'],
+        ['08:00', '09:00', '10:00'],
+        ['11:00', '12:00', '13:00'],
+        ['14:00', '15:00', '16:00'],
+        ['17:00', '18:00', '19:00'],
+        ['20:00', '21:00', '22:00'],
+        ['🔙 Назад']
+    ], resize_keyboard=True)
+
 def get_edit_services_keyboard():
     return ReplyKeyboardMarkup([
         ['📋 Мои услуги', '➕ Добавить услугу'],
@@ -1,18 +1,31 @@
+import sys
 from database.models import Base, engine
+from database.migrations import run_migrations
 
 def update_database():
-    """Обновляет базу данных - удаляет старые таблицы и создает новые"""
+    """Обновляет базу данных без потери данных - создает новые таблицы и применяет миграции"""
     print("🔄 Обновление базы данных...")
     
-    # Удаляем все таблицы
+    # Создаем недостающие таблицы, существующие не трогаем
+    Base.metadata.create_all(engine)
+    print("✅ Недостающие таблицы созданы")
+    
+    versions = run_migrations(engine)
+    print(f"✅ Применены миграции: {versions}" if versions else "✅ Новых миграций нет")
+    
+    print("🎉 База данных успешно обновлена!")
+
+def recreate_database():
+    """Удаляет все таблицы и создает их заново (все данные будут потеряны)"""
     Base.metadata.drop_all(engine)
     print("✅ Старые таблицы удалены")
     
-    # Создаем новые таблицы
     Base.metadata.create_all(engine)
+    run_migrations(engine)
     print("✅ Новые таблицы созданы")
-    
-    print("🎉 База данных успешно обновлена!")
 
 if __name__ == '__main__':
-    update_database()
\ No newline at end of file
+    if '--recreate' in sys.argv:
+        recreate_database()
+    else:
+        update_database()
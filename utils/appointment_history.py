@@ -0,0 +1,50 @@
+"""История записей мастера для просмотра в боте
+
+Записи читаются через appointment_history() (database/archive.py): текущие
+и перенесенные в архив вместе, поэтому архивирование не убирает старые
+визиты из истории. Клиент и услуга присоединяются в том же запросе, а не
+отдельным запросом на каждую запись. Все записи выбираются пачками по
+(datetime, id) без OFFSET, как сводка в utils/client_summary.py.
+"""
+from sqlalchemy import and_, or_
+from database.models import session, Client, Service
+from database.archive import appointment_history
+
+HISTORY_CHUNK_SIZE = 200
+
+
+def _history_query(user_id, db_session):
+    history = appointment_history(user_id)
+    query = db_session.query(
+        history.c.id, history.c.datetime, history.c.status,
+        Client.name.label('client_name'), Service.name.label('service_name')
+    ).outerjoin(
+        Client, Client.id == history.c.client_id
+    ).outerjoin(
+        Service, Service.id == history.c.service_id
+    ).filter(history.c.datetime.isnot(None))
+    return history, query
+
+
+def get_recent_appointments(user_id, limit=10, db_session=None):
+    """Последние limit записей мастера, новые первыми"""
+    history, query = _history_query(user_id, db_session or session)
+    return query.order_by(history.c.datetime.desc(), history.c.id.desc()).limit(limit).all()
+
+
+def iter_appointments(user_id, chunk_size=HISTORY_CHUNK_SIZE, db_session=None):
+    """Все записи мастера по возрастанию даты пачками по chunk_size"""
+    db_session = db_session or session
+    last = None
+    while True:
+        history, query = _history_query(user_id, db_session)
+        if last is not None:
+            query = query.filter(or_(
+                history.c.datetime > last.datetime,
+                and_(history.c.datetime == last.datetime, history.c.id > last.id)
+            ))
+        rows = query.order_by(history.c.datetime, history.c.id).limit(chunk_size).all()
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]
@@ -0,0 +1,465 @@
+"""Расчет свободного времени мастеров
+
+Единый алгоритм: рабочие слоты дня объединяются в интервалы, заблокированное
+время и записи (каждая со своей длительностью услуги) - в занятые интервалы.
+Начала записи идут с шагом SLOT_STEP от начала каждого рабочего интервала,
+запись должна целиком помещаться в рабочее время и не пересекать занятое.
+
+Бэкенды дают одинаковый результат и отличаются только способом расчета,
+выбираются через AVAILABILITY_BACKEND в config.py.
+"""
+from datetime import datetime, timedelta, time, date
+from sqlalchemy import and_, or_
+from database.models import session, WorkingSlot, Appointment, Service
+from utils.availability_cache import free_slot_cache
+from utils.occupancy import OccupancyGrid
+from config import AVAILABILITY_BACKEND
+
+# Шаг сетки для начала записи (минуты)
+SLOT_STEP = 30
+# Длительность записи, если услуга не найдена (минуты)
+DEFAULT_DURATION = 60
+
+
+def time_to_minutes(value):
+    """Переводит строку 'ЧЧ:ММ' в минуты от начала суток"""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def minutes_to_datetime(day, minutes):
+    """Собирает datetime из даты и минут от начала суток"""
+    return datetime.combine(day, time()) + timedelta(minutes=minutes)
+
+
+def merge_intervals(intervals):
+    """Объединяет пересекающиеся и смежные интервалы [начало, конец)"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def slot_start_minute(slot):
+    """Начало слота в минутах (строка разбирается только для не мигрированных строк)"""
+    if slot.start_minute is not None:
+        return slot.start_minute
+    return time_to_minutes(slot.start_time)
+
+
+def slot_end_minute(slot):
+    """Конец слота в минутах"""
+    if slot.end_minute is not None:
+        return slot.end_minute
+    return time_to_minutes(slot.end_time)
+
+
+# Колонки слота, нужные для расчета свободного времени
+SLOT_COLUMNS = (
+    WorkingSlot.date, WorkingSlot.start_minute, WorkingSlot.end_minute,
+    WorkingSlot.start_time, WorkingSlot.end_time, WorkingSlot.is_blocked
+)
+
+
+class DaySchedule:
+    """Интервалы мастера на один день в минутах от начала суток
+
+    working - рабочее время, busy - заблокированное время и записи.
+    Оба списка отсортированы и не пересекаются внутри себя.
+    """
+
+    def __init__(self, day, working=(), blocked=(), booked=()):
+        self.day = day
+        self.working = merge_intervals(working)
+        self.busy = merge_intervals(list(blocked) + list(booked))
+
+
+def build_day_schedule(day, slots, appointments):
+    """Строит DaySchedule из рабочих слотов и пар (datetime записи, длительность)"""
+    working = []
+    blocked = []
+    for slot in slots:
+        interval = (slot_start_minute(slot), slot_end_minute(slot))
+        if slot.is_blocked:
+            blocked.append(interval)
+        else:
+            working.append(interval)
+
+    booked = []
+    for start_dt, duration in appointments:
+        start = start_dt.hour * 60 + start_dt.minute
+        booked.append((start, start + (duration or DEFAULT_DURATION)))
+
+    return DaySchedule(day, working, blocked, booked)
+
+
+def load_day_schedule(user_id, day, db_session=None):
+    """Загружает слоты и записи мастера на дату двумя запросами"""
+    db_session = db_session or session
+    slots = db_session.query(*SLOT_COLUMNS).filter(
+        WorkingSlot.user_id == user_id,
+        WorkingSlot.date == day
+    ).all()
+
+    day_start = datetime.combine(day, time())
+    appointments = db_session.query(Appointment.datetime, Service.duration).outerjoin(
+        Service, Service.id == Appointment.service_id
+    ).filter(
+        Appointment.user_id == user_id,
+        Appointment.datetime >= day_start,
+        Appointment.datetime < day_start + timedelta(days=1),
+        Appointment.status == 'booked'
+    ).all()
+
+    return build_day_schedule(day, slots, appointments)
+
+
+def load_range_schedules(user_id, start_day, end_day):
+    """Загружает расписание мастера на [start_day, end_day) двумя запросами по диапазону"""
+    slots = session.query(*SLOT_COLUMNS).filter(
+        WorkingSlot.user_id == user_id,
+        WorkingSlot.date >= start_day,
+        WorkingSlot.date < end_day
+    ).all()
+
+    appointments = session.query(Appointment.datetime, Service.duration).outerjoin(
+        Service, Service.id == Appointment.service_id
+    ).filter(
+        Appointment.user_id == user_id,
+        Appointment.datetime >= datetime.combine(start_day, time()),
+        Appointment.datetime < datetime.combine(end_day, time()),
+        Appointment.status == 'booked'
+    ).all()
+
+    slots_by_day = {}
+    for slot in slots:
+        slots_by_day.setdefault(slot.date, []).append(slot)
+
+    appointments_by_day = {}
+    for start_dt, duration in appointments:
+        appointments_by_day.setdefault(start_dt.date(), []).append((start_dt, duration))
+
+    # Дни без рабочих слотов пропускаем: свободного времени там нет
+    return {
+        day: build_day_schedule(day, day_slots, appointments_by_day.get(day, []))
+        for day, day_slots in sorted(slots_by_day.items())
+    }
+
+
+def free_start_minutes(schedule, service_duration, step=SLOT_STEP):
+    """Все свободные начала записи за один проход по отсортированным интервалам
+
+    Кандидаты идут с шагом step от начала каждого рабочего интервала,
+    запись должна целиком помещаться в рабочее время и не задевать занятое.
+    """
+    result = []
+    busy = schedule.busy
+    j = 0
+
+    for start, end in schedule.working:
+        candidate = start
+        while candidate + service_duration <= end:
+            # Занятые интервалы, закончившиеся до кандидата, больше не нужны
+            while j < len(busy) and busy[j][1] <= candidate:
+                j += 1
+
+            if j < len(busy) and busy[j][0] < candidate + service_duration:
+                # Перескакиваем на первый шаг сетки после занятого интервала
+                steps = -(-(busy[j][1] - start) // step)
+                candidate = start + steps * step
+                continue
+
+            result.append(candidate)
+            candidate += step
+
+    return result
+
+
+def is_free(schedule, start, service_duration):
+    """Проверяет, что запись [start, start + duration) помещается в свободное время"""
+    finish = start + service_duration
+
+    if not any(ws <= start and finish <= we for ws, we in schedule.working):
+        return False
+
+    for bs, be in schedule.busy:
+        if bs >= finish:
+            break
+        if be > start:
+            return False
+
+    return True
+
+
+def horizon_days(start_day, days_ahead):
+    return [start_day + timedelta(days=i) for i in range(days_ahead)]
+
+
+class NaiveBackend:
+    """Прямой путь через ORM: запросы на каждого кандидата
+
+    Самый медленный, нужен как эталон для сверки остальных бэкендов, поэтому
+    считает независимо от них: рабочее время - множеством минут, без
+    merge_intervals и slot_start_minute/slot_end_minute.
+    """
+
+    name = 'naive'
+
+    @staticmethod
+    def _minute(value, text):
+        """Колонка минут или, если она пустая (строка не мигрирована), строка 'ЧЧ:ММ'"""
+        if value is not None:
+            return value
+        hours, minutes = text.split(':')
+        return int(hours) * 60 + int(minutes)
+
+    def free_minutes(self, user_id, day, service_duration):
+        slots = session.query(
+            WorkingSlot.start_minute, WorkingSlot.end_minute, WorkingSlot.start_time, WorkingSlot.end_time
+        ).filter(
+            WorkingSlot.user_id == user_id,
+            WorkingSlot.date == day,
+            WorkingSlot.is_blocked == False
+        ).all()
+
+        # Пересекающиеся и смежные слоты сливаются в множестве сами
+        working = set()
+        for slot in slots:
+            working.update(range(self._minute(slot.start_minute, slot.start_time),
+                                 self._minute(slot.end_minute, slot.end_time)))
+
+        result = []
+        for minute in sorted(working):
+            if minute - 1 in working:
+                # Не начало рабочего интервала
+                continue
+            candidate = minute
+            while all(m in working for m in range(candidate, candidate + service_duration)):
+                if self._candidate_free(user_id, day, candidate, service_duration):
+                    result.append(candidate)
+                candidate += SLOT_STEP
+        return result
+
+    def _candidate_free(self, user_id, day, start, service_duration):
+        finish = start + service_duration
+
+        # Мигрированные строки фильтруются в SQL, строки без минут - по времени строкой
+        blocked = session.query(
+            WorkingSlot.start_minute, WorkingSlot.end_minute, WorkingSlot.start_time, WorkingSlot.end_time
+        ).filter(
+            WorkingSlot.user_id == user_id,
+            WorkingSlot.date == day,
+            WorkingSlot.is_blocked == True,
+            or_(
+                and_(WorkingSlot.start_minute < finish, WorkingSlot.end_minute > start),
+                WorkingSlot.start_minute.is_(None),
+                WorkingSlot.end_minute.is_(None)
+            )
+        ).all()
+        for slot in blocked:
+            if (self._minute(slot.start_minute, slot.start_time) < finish
+                    and self._minute(slot.end_minute, slot.end_time) > start):
+                return False
+
+        day_start = datetime.combine(day, time())
+        appointments = session.query(Appointment.datetime, Service.duration).outerjoin(
+            Service, Service.id == Appointment.service_id
+        ).filter(
+            Appointment.user_id == user_id,
+            Appointment.datetime >= day_start,
+            Appointment.datetime < day_start + timedelta(minutes=finish),
+            Appointment.status == 'booked'
+        ).all()
+        for start_dt, duration in appointments:
+            booked_start = start_dt.hour * 60 + start_dt.minute
+            if booked_start + (duration or DEFAULT_DURATION) > start:
+                return False
+
+        return True
+
+    def free_minutes_multi(self, user_id, day, durations):
+        return {duration: self.free_minutes(user_id, day, duration) for duration in set(durations)}
+
+    def horizon(self, user_id, start_day, days_ahead, service_duration, days=None):
+        result = {}
+        for day in days or horizon_days(start_day, days_ahead):
+            minutes = self.free_minutes(user_id, day, service_duration)
+            if minutes:
+                result[day] = minutes
+        return result
+
+
+class BatchedBackend:
+    """Пакетная загрузка расписания и расчет в памяти
+
+    День - два запроса, горизонт - два запроса по диапазону дат.
+    """
+
+    name = 'batched'
+
+    def compute(self, schedule, service_duration):
+        return free_start_minutes(schedule, service_duration)
+
+    def compute_multi(self, schedule, durations):
+        return {duration: self.compute(schedule, duration) for duration in set(durations)}
+
+    def free_minutes(self, user_id, day, service_duration):
+        return self.compute(load_day_schedule(user_id, day), service_duration)
+
+    def free_minutes_multi(self, user_id, day, durations):
+        """Несколько длительностей по одному расписанию дня (два запроса)"""
+        return self.compute_multi(load_day_schedule(user_id, day), durations)
+
+    def horizon(self, user_id, start_day, days_ahead, service_duration, days=None):
+        days = days or horizon_days(start_day, days_ahead)
+        if not days:
+            return {}
+        schedules = load_range_schedules(user_id, days[0], days[-1] + timedelta(days=1))
+
+        result = {}
+        for day in days:
+            schedule = schedules.get(day)
+            minutes = self.compute(schedule, service_duration) if schedule else []
+            if minutes:
+                result[day] = minutes
+        return result
+
+
+class GridBackend(BatchedBackend):
+    """Пакетная загрузка и расчет по поминутной сетке занятости"""
+
+    name = 'grid'
+
+    def compute(self, schedule, service_duration):
+        return OccupancyGrid(schedule).free_starts(service_duration, SLOT_STEP)
+
+    def compute_multi(self, schedule, durations):
+        # Одна сетка и один проход на все длительности
+        return OccupancyGrid(schedule).free_starts_for_durations(durations, SLOT_STEP)
+
+
+class CachedBackend:
+    """Кэширующая обертка над другим бэкендом (LRU по мастеру, дате и длительности)"""
+
+    name = 'cached'
+
+    def __init__(self, inner, cache=free_slot_cache):
+        self.inner = inner
+        self.cache = cache
+
+    def free_minutes(self, user_id, day, service_duration):
+        minutes = self.cache.get(user_id, day, service_duration)
+        if minutes is None:
+            version = self.cache.version(user_id)
+            minutes = self.inner.free_minutes(user_id, day, service_duration)
+            self.cache.put(user_id, day, service_duration, minutes, version)
+        return minutes
+
+    def free_minutes_multi(self, user_id, day, durations):
+        result = {}
+        missing = []
+        for duration in set(durations):
+            minutes = self.cache.get(user_id, day, duration)
+            if minutes is None:
+                missing.append(duration)
+            else:
+                result[duration] = minutes
+
+        # Недостающие длительности считаем по одному расписанию дня
+        if missing:
+            version = self.cache.version(user_id)
+            for duration, minutes in self.inner.free_minutes_multi(user_id, day, missing).items():
+                self.cache.put(user_id, day, duration, minutes, version)
+                result[duration] = minutes
+        return result
+
+    def horizon(self, user_id, start_day, days_ahead, service_duration):
+        days = horizon_days(start_day, days_ahead)
+
+        free = {}
+        missing = []
+        for day in days:
+            minutes = self.cache.get(user_id, day, service_duration)
+            if minutes is None:
+                missing.append(day)
+            else:
+                free[day] = minutes
+
+        # Недостающие даты досчитываем одним запросом по диапазону
+        if missing:
+            version = self.cache.version(user_id)
+            computed = self.inner.horizon(user_id, missing[0], 0, service_duration, days=missing)
+            for day in missing:
+                minutes = computed.get(day, ())
+                self.cache.put(user_id, day, service_duration, minutes, version)
+                free[day] = minutes
+
+        return {day: free[day] for day in days if free[day]}
+
+
+BACKENDS = {
+    'naive': NaiveBackend,
+    'batched': BatchedBackend,
+    'grid': GridBackend,
+}
+
+
+def get_backend(name=AVAILABILITY_BACKEND):
+    """Создает бэкенд по имени из конфига"""
+    if name == 'cached':
+        return CachedBackend(BatchedBackend())
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд расчета свободного времени: {name}")
+    return BACKENDS[name]()
+
+
+backend = get_backend()
+
+
+def get_free_minutes(user_id, day, service_duration=DEFAULT_DURATION):
+    """Свободные начала записи на дату в минутах"""
+    return backend.free_minutes(user_id, day, service_duration)
+
+
+def get_free_minutes_multi(user_id, day, durations):
+    """Свободные начала записи на дату сразу для нескольких длительностей услуг
+
+    {длительность: минуты}. Расписание дня загружается один раз (кроме
+    эталонного naive).
+    """
+    return backend.free_minutes_multi(user_id, day, durations)
+
+
+def get_free_times(user_id, day, service_duration=DEFAULT_DURATION):
+    """Свободное время мастера на дату (список datetime)"""
+    return [minutes_to_datetime(day, m) for m in get_free_minutes(user_id, day, service_duration)]
+
+
+def check_time_free(user_id, appointment_time, service_duration=DEFAULT_DURATION):
+    """Проверяет доступность конкретного времени (всегда по свежим данным из базы)"""
+    schedule = load_day_schedule(user_id, appointment_time.date())
+    start = appointment_time.hour * 60 + appointment_time.minute
+    return is_free(schedule, start, service_duration)
+
+
+def get_availability_horizon(user_id, days_ahead=14, service_duration=DEFAULT_DURATION, start_day=None):
+    """Свободные даты на горизонте [start_day, start_day + days_ahead)
+
+    Возвращает {дата: количество свободных начал записи} в порядке дат,
+    только для дат, где есть свободное время.
+    """
+    start_day = start_day or date.today()
+    horizon = backend.horizon(user_id, start_day, days_ahead, service_duration)
+    return {day: len(minutes) for day, minutes in horizon.items()}
+
+
+def notify_schedule_changed(master_id, day=None):
+    """Вызывается после изменения записей или рабочих слотов мастера"""
+    from utils.next_free import next_free_index
+
+    free_slot_cache.invalidate(master_id, day)
+    next_free_index.on_change(master_id, day)
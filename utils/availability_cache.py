@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from config import AVAILABILITY_CACHE_SIZE, AVAILABILITY_CACHE_TTL
+
+
+class FreeSlotCache:
+    """LRU-кэш свободных начал записи по ключу (мастер, дата, длительность услуги)
+
+    Значение - кортеж минут от начала суток. Кэш сбрасывается точечно
+    при изменении записей или рабочих слотов мастера - но только в этом
+    процессе, поэтому записи живут не дольше ttl секунд: изменения с других
+    экземпляров бота видны с этой задержкой (ttl=0 - без срока).
+    Потокобезопасен: расчеты выполняются в пуле потоков (database.session.run_db).
+    """
+
+    def __init__(self, max_size=AVAILABILITY_CACHE_SIZE, ttl=AVAILABILITY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_master = {}
+        # Версия расписания мастера растет при каждом сбросе
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    def get(self, master_id, day, service_duration):
+        """Возвращает закэшированные минуты или None"""
+        key = (master_id, day, service_duration)
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[1] is not None and entry[1] < time.monotonic():
+                # Срок вышел: расписание могли изменить на другом экземпляре бота
+                del self._entries[key]
+                self._forget_key(key)
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def version(self, master_id):
+        """Версия расписания мастера; запоминается до расчета и передается в put"""
+        with self._lock:
+            return self._versions.get(master_id, 0)
+
+    def put(self, master_id, day, service_duration, minutes, version=None):
+        """Сохраняет свободные минуты, вытесняя самые старые записи
+
+        Если передана version, а расписание с тех пор менялось, результат
+        расчета устарел и не сохраняется.
+        """
+        if self.max_size <= 0:
+            return
+
+        key = (master_id, day, service_duration)
+        with self._lock:
+            if version is not None and version != self._versions.get(master_id, 0):
+                return
+
+            expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+            self._entries[key] = (tuple(minutes), expires_at)
+            self._entries.move_to_end(key)
+            self._keys_by_master.setdefault(master_id, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget_key(old_key)
+                self.evictions += 1
+
+    def invalidate(self, master_id, day=None):
+        """Сбрасывает кэш мастера целиком или только на одну дату"""
+        with self._lock:
+            self._versions[master_id] = self._versions.get(master_id, 0) + 1
+            keys = self._keys_by_master.get(master_id)
+            if not keys:
+                return
+
+            for key in [k for k in keys if day is None or k[1] == day]:
+                self._entries.pop(key, None)
+                self._forget_key(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_master.clear()
+
+    def stats(self):
+        """Счетчики эффективности кэша"""
+        requests = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / requests * 100, 1) if requests else 0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'expirations': self.expirations,
+        }
+
+    def _forget_key(self, key):
+        keys = self._keys_by_master.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_master[key[0]]
+
+
+free_slot_cache = FreeSlotCache()
@@ -0,0 +1,76 @@
+import threading
+from sqlalchemy import text
+from database.models import Session, Appointment, Client, Service
+from utils.availability import DEFAULT_DURATION, load_day_schedule, is_free, notify_schedule_changed
+
+# Блокировки по мастерам внутри процесса: записи к разным мастерам идут параллельно
+_master_locks = {}
+_master_locks_guard = threading.Lock()
+
+
+def get_master_lock(master_id):
+    """Блокировка записи к мастеру (общий замок держится только на время поиска в словаре)"""
+    with _master_locks_guard:
+        lock = _master_locks.get(master_id)
+        if lock is None:
+            lock = _master_locks[master_id] = threading.Lock()
+        return lock
+
+
+def lock_master_schedule(db_session, master_id):
+    """Блокирует расписание мастера в базе до конца транзакции
+
+    PostgreSQL: транзакционная advisory-блокировка по id мастера.
+    Остальные базы: пустой UPDATE строки мастера - в PostgreSQL/MySQL это
+    блокировка одной строки, в SQLite захват блокировки записи в начале
+    транзакции, чтобы проверка ниже видела последние данные.
+    """
+    if db_session.bind.dialect.name == 'postgresql':
+        db_session.execute(text("SELECT pg_advisory_xact_lock(:master_id)"), {'master_id': master_id})
+    else:
+        db_session.execute(text("UPDATE users SET id = id WHERE id = :master_id"), {'master_id': master_id})
+
+
+def book_appointment(master_id, service_id, appointment_datetime, client_id=None,
+                     client_name=None, client_phone=None):
+    """Атомарно создает запись к мастеру, если время свободно
+
+    Проверка занятости и вставка выполняются в одной транзакции под
+    блокировкой расписания этого мастера, поэтому две одновременные записи
+    на пересекающееся время не пройдут обе. Если client_id не передан,
+    клиент создается в той же транзакции.
+    Возвращает id записи или None, если время уже занято.
+    """
+    with get_master_lock(master_id):
+        with Session() as db_session:
+            lock_master_schedule(db_session, master_id)
+
+            service = db_session.query(Service.duration).filter_by(id=service_id).first()
+            service_duration = service.duration if service and service.duration else DEFAULT_DURATION
+
+            schedule = load_day_schedule(master_id, appointment_datetime.date(), db_session)
+            start = appointment_datetime.hour * 60 + appointment_datetime.minute
+            if not is_free(schedule, start, service_duration):
+                db_session.rollback()
+                return None
+
+            if client_id is None:
+                client = Client(name=client_name, phone=client_phone, user_id=master_id)
+                db_session.add(client)
+                db_session.flush()
+                client_id = client.id
+
+            appointment = Appointment(
+                user_id=master_id,
+                client_id=client_id,
+                service_id=service_id,
+                datetime=appointment_datetime,
+                status='booked'
+            )
+            db_session.add(appointment)
+            db_session.flush()
+            appointment_id = appointment.id
+            db_session.commit()
+
+    notify_schedule_changed(master_id, appointment_datetime.date())
+    return appointment_id
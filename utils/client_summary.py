@@ -0,0 +1,81 @@
+"""Сводка по клиентам мастера: имя, телефон, число записей и последний визит
+
+Вместо двух запросов на каждого клиента (count и последняя запись)
+записи агрегируются одним GROUP BY по client_id и присоединяются
+к клиентам. Учитываются и перенесенные в архив записи
+(database/archive.py). Постраничный вывод - для списка в боте,
+итерация пачками - для выгрузки всех клиентов.
+"""
+from sqlalchemy import func
+from database.models import session, Client
+from database.archive import appointment_history
+
+CLIENTS_PAGE_SIZE = 20
+
+
+def _summary_query(user_id, db_session):
+    history = appointment_history(user_id)
+    stats = db_session.query(
+        history.c.client_id.label('client_id'),
+        func.count().label('appointments_count'),
+        func.max(history.c.datetime).label('last_visit')
+    ).group_by(history.c.client_id).subquery()
+
+    return db_session.query(
+        Client.id, Client.name, Client.phone,
+        func.coalesce(stats.c.appointments_count, 0), stats.c.last_visit
+    ).outerjoin(
+        stats, stats.c.client_id == Client.id
+    ).filter(Client.user_id == user_id)
+
+
+def _as_dict(row):
+    client_id, name, phone, appointments_count, last_visit = row
+    return {
+        'id': client_id,
+        'name': name,
+        'phone': phone,
+        'appointments_count': appointments_count,
+        'last_visit': last_visit,
+    }
+
+
+def count_clients(user_id, db_session=None):
+    db_session = db_session or session
+    return db_session.query(func.count(Client.id)).filter(Client.user_id == user_id).scalar()
+
+
+def get_client_summaries(user_id, page=0, page_size=CLIENTS_PAGE_SIZE, db_session=None):
+    """Страница сводки по клиентам (с нуля) и общее число клиентов
+
+    Возвращает (total, rows), rows - список словарей с ключами
+    id, name, phone, appointments_count, last_visit (datetime или None).
+    """
+    db_session = db_session or session
+    total = count_clients(user_id, db_session)
+    if not total:
+        return 0, []
+
+    rows = _summary_query(user_id, db_session).order_by(
+        Client.name, Client.id
+    ).limit(page_size).offset(page * page_size).all()
+    return total, [_as_dict(row) for row in rows]
+
+
+def iter_client_summaries(user_id, chunk_size=500, db_session=None):
+    """Сводка по всем клиентам мастера пачками по chunk_size (для выгрузки)
+
+    Пачки выбираются по возрастанию id клиента (keyset), без OFFSET,
+    поэтому время выборки не растет к концу списка.
+    """
+    db_session = db_session or session
+    last_id = 0
+    while True:
+        rows = _summary_query(user_id, db_session).filter(
+            Client.id > last_id
+        ).order_by(Client.id).limit(chunk_size).all()
+        for row in rows:
+            yield _as_dict(row)
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
@@ -0,0 +1,278 @@
+"""Импорт клиентов из CSV/XLSX и выгрузка клиентов и истории записей в CSV
+
+Файлы читаются и пишутся построчно: в памяти одновременно только одна
+пачка строк, поэтому расход памяти не зависит от размера файла.
+Каждая пачка импорта проверяется на дубли по телефону (в базе и внутри
+пачки) и вставляется одним executemany в своей транзакции. Если файл
+оказывается испорчен на середине, уже добавленные пачки остаются, а
+ImportFileError сообщает, сколько успели добавить.
+XLSX читается через openpyxl в режиме read_only (pip install openpyxl).
+"""
+import codecs
+import csv
+import os
+import re
+import tempfile
+import zipfile
+from itertools import islice
+from sqlalchemy import insert, select
+from database.models import engine, read_session, Client, Service
+from database.archive import appointment_history
+from utils.client_summary import iter_client_summaries
+
+IMPORT_CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 500
+
+# Названия колонок в заголовке файла (без учета регистра)
+HEADER_ALIASES = {
+    'name': {'name', 'имя', 'фио', 'клиент'},
+    'phone': {'phone', 'телефон', 'тел', 'номер', 'номер телефона'},
+    'notes': {'notes', 'заметки', 'комментарий', 'примечание'},
+}
+# Колонки файла без заголовка
+DEFAULT_COLUMNS = {'name': 0, 'phone': 1, 'notes': 2}
+
+# Выгрузка открывается в Excel без настройки: разделитель ';' и BOM
+EXPORT_DIALECT = {'delimiter': ';'}
+EXPORT_ENCODING = 'utf-8-sig'
+
+
+def normalize_phone(raw):
+    """Телефон в виде +79991234567 или None, если это не номер"""
+    digits = re.sub(r'\D', '', raw or '')
+    if len(digits) == 11 and digits.startswith('8'):
+        digits = '7' + digits[1:]
+    elif len(digits) == 10:
+        digits = '7' + digits
+    if not 11 <= len(digits) <= 15:
+        return None
+    return '+' + digits
+
+
+class ImportFileError(ValueError):
+    """Файл не удалось дочитать; result - счетчики уже импортированных строк"""
+
+    def __init__(self, message, result):
+        super().__init__(message)
+        self.result = result
+
+
+def _detect_encoding(path):
+    """UTF-8, если так декодируется весь файл (читается по 64 КБ), иначе cp1251
+
+    Проверяется весь файл, а не начало: иначе русская буква в cp1251 в
+    конце файла сломала бы импорт после того, как часть клиентов уже добавлена.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(path, 'rb') as f:
+            while chunk := f.read(64 * 1024):
+                decoder.decode(chunk)
+        decoder.decode(b'', final=True)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        # CSV из русского Excel
+        return 'cp1251'
+
+
+def iter_csv_rows(path):
+    """Строки CSV по одной; разделитель (',', ';' или табуляция) определяется по началу файла"""
+    with open(path, newline='', encoding=_detect_encoding(path)) as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        try:
+            yield from reader
+        except csv.Error as e:
+            # Например, нулевой байт в строке
+            raise ValueError(f"ошибка в строке {reader.line_num}: {e}")
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Телефон, сохраненный в Excel числом
+        value = int(value)
+    return str(value)
+
+
+def iter_xlsx_rows(path):
+    """Строки первого листа XLSX по одной"""
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ValueError("Импорт XLSX недоступен: установите openpyxl или загрузите CSV")
+
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, OSError) as e:
+        raise ValueError(f"файл поврежден или не является XLSX ({e})")
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield [_cell(value) for value in row]
+    except (zipfile.BadZipFile, KeyError, OSError) as e:
+        # Архив поврежден дальше начала: лист читается по мере импорта
+        raise ValueError(f"файл поврежден ({e})")
+    finally:
+        workbook.close()
+
+
+def iter_file_rows(path, file_format):
+    if file_format == 'csv':
+        return iter_csv_rows(path)
+    if file_format == 'xlsx':
+        return iter_xlsx_rows(path)
+    raise ValueError("Поддерживаются файлы CSV и XLSX")
+
+
+def header_columns(row):
+    """Номера колонок по заголовку или None, если первая строка - данные"""
+    columns = {}
+    for index, title in enumerate(row):
+        title = title.strip().lower()
+        for field, aliases in HEADER_ALIASES.items():
+            if title in aliases and field not in columns:
+                columns[field] = index
+    if 'name' in columns and 'phone' in columns:
+        return columns
+    return None
+
+
+def iter_client_rows(rows):
+    """(имя, телефон из файла, заметки) для каждой непустой строки"""
+    first = next(rows, None)
+    if first is None:
+        return
+    columns = header_columns(first)
+    if columns is None:
+        columns = DEFAULT_COLUMNS
+        rows = _prepend(first, rows)
+
+    for row in rows:
+        if not any(cell.strip() for cell in row):
+            continue
+        values = {field: row[index].strip() if index < len(row) else '' for field, index in columns.items()}
+        yield values['name'], values['phone'], values.get('notes', '')
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def import_clients(user_id, path, file_format, limit=None, chunk_size=IMPORT_CHUNK_SIZE, engine=engine):
+    """Импортирует клиентов мастера из файла
+
+    limit - сколько клиентов еще можно добавить (None - без ограничения).
+    Возвращает счетчики: added, duplicates, invalid, over_limit. Если файл
+    не дочитывается, ImportFileError со счетчиками уже добавленных пачек.
+    """
+    result = {'added': 0, 'duplicates': 0, 'invalid': 0, 'over_limit': 0}
+    rows = iter_client_rows(iter_file_rows(path, file_format))
+
+    error = None
+    while True:
+        if error is not None:
+            raise ImportFileError(str(error), result)
+        chunk = []
+        try:
+            chunk.extend(islice(rows, chunk_size))
+        except ValueError as e:
+            # В том числе UnicodeDecodeError; прочитанные до ошибки строки сохраняем
+            error = e
+        if not chunk:
+            if error is not None:
+                raise ImportFileError(str(error), result)
+            return result
+
+        candidates = []
+        for name, raw_phone, notes in chunk:
+            phone = normalize_phone(raw_phone)
+            if not name or not phone:
+                result['invalid'] += 1
+                continue
+            candidates.append((name[:100], phone, raw_phone, notes or None))
+
+        if not candidates:
+            continue
+
+        with engine.begin() as conn:
+            # Телефоны, добавленные вручную, могут храниться в исходном виде
+            phones = {phone for _, phone, _, _ in candidates} | {raw for _, _, raw, _ in candidates}
+            existing = set(conn.execute(
+                select(Client.phone).where(Client.user_id == user_id, Client.phone.in_(phones))
+            ).scalars())
+
+            new_clients = []
+            for name, phone, raw_phone, notes in candidates:
+                if phone in existing or raw_phone in existing:
+                    result['duplicates'] += 1
+                    continue
+                existing.add(phone)
+                if limit is not None and result['added'] + len(new_clients) >= limit:
+                    result['over_limit'] += 1
+                    continue
+                new_clients.append({'user_id': user_id, 'name': name, 'phone': phone, 'notes': notes})
+
+            if new_clients:
+                conn.execute(insert(Client), new_clients)
+        result['added'] += len(new_clients)
+
+
+def iter_appointment_rows(user_id, chunk_size=EXPORT_CHUNK_SIZE, db_session=None):
+    """История записей мастера (вместе с архивом) пачками по id"""
+    db_session = db_session or read_session
+    history = appointment_history(user_id)
+    last_id = 0
+    while True:
+        rows = db_session.query(
+            history.c.id, history.c.datetime, history.c.status, Client.name, Client.phone, Service.name
+        ).outerjoin(
+            Client, Client.id == history.c.client_id
+        ).outerjoin(
+            Service, Service.id == history.c.service_id
+        ).filter(
+            history.c.id > last_id
+        ).order_by(history.c.id).limit(chunk_size).all()
+
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def _export_file(prefix):
+    handle, path = tempfile.mkstemp(prefix=prefix, suffix='.csv')
+    return os.fdopen(handle, 'w', newline='', encoding=EXPORT_ENCODING), path
+
+
+def export_clients_csv(user_id, db_session=None):
+    """Выгружает клиентов мастера во временный CSV; возвращает путь к файлу"""
+    f, path = _export_file('clients_')
+    with f:
+        writer = csv.writer(f, **EXPORT_DIALECT)
+        writer.writerow(['Имя', 'Телефон', 'Записей', 'Последний визит'])
+        for client in iter_client_summaries(user_id, EXPORT_CHUNK_SIZE, db_session or read_session):
+            last_visit = client['last_visit'].strftime('%d.%m.%Y %H:%M') if client['last_visit'] else ''
+            writer.writerow([client['name'], client['phone'], client['appointments_count'], last_visit])
+    return path
+
+
+def export_appointments_csv(user_id, db_session=None):
+    """Выгружает историю записей мастера во временный CSV; возвращает путь к файлу"""
+    f, path = _export_file('appointments_')
+    with f:
+        writer = csv.writer(f, **EXPORT_DIALECT)
+        writer.writerow(['Дата', 'Время', 'Клиент', 'Телефон', 'Услуга', 'Статус'])
+        for _, when, status, client_name, client_phone, service_name in iter_appointment_rows(user_id, db_session=db_session):
+            writer.writerow([
+                when.strftime('%d.%m.%Y') if when else '', when.strftime('%H:%M') if when else '',
+                client_name or '', client_phone or '', service_name or '', status or ''
+            ])
+    return path
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, time
+from database.models import session, User, WorkingSlot, Appointment, Service, MasterLink
+from utils.availability import (
+    SLOT_COLUMNS, DEFAULT_DURATION, build_day_schedule, free_start_minutes, is_free, minutes_to_datetime
+)
+
+
+def search_available_masters(specialty, day, service_duration=DEFAULT_DURATION, at_time=None,
+                             exclude_user_id=None, limit=10, now=None):
+    """Мастера специальности со свободным временем на дату
+
+    Если передано at_time, остаются только мастера, свободные именно в это время.
+    На сегодня начала записи раньше текущего времени (now) не предлагаются.
+    Независимо от числа мастеров выполняется три запроса: слоты всех мастеров
+    специальности на дату, их записи на дату и данные найденных мастеров со ссылками.
+    Результат отсортирован по ближайшему свободному времени.
+    """
+    now = now or datetime.now()
+    not_before = now.hour * 60 + now.minute if day == now.date() else 0
+    if day < now.date():
+        return []
+
+    at_minute = at_time.hour * 60 + at_time.minute if at_time else None
+    if at_minute is not None and at_minute < not_before:
+        return []
+
+    masters_filter = [User.specialty == specialty, User.is_master == True]
+    if exclude_user_id is not None:
+        masters_filter.append(User.id != exclude_user_id)
+
+    slot_rows = session.query(WorkingSlot.user_id, *SLOT_COLUMNS).join(
+        User, User.id == WorkingSlot.user_id
+    ).filter(WorkingSlot.date == day, *masters_filter).all()
+
+    if not slot_rows:
+        return []
+
+    day_start = datetime.combine(day, time())
+    appointment_rows = session.query(Appointment.user_id, Appointment.datetime, Service.duration).join(
+        User, User.id == Appointment.user_id
+    ).outerjoin(
+        Service, Service.id == Appointment.service_id
+    ).filter(
+        Appointment.datetime >= day_start,
+        Appointment.datetime < day_start + timedelta(days=1),
+        Appointment.status == 'booked',
+        *masters_filter
+    ).all()
+
+    slots_by_master = {}
+    for row in slot_rows:
+        slots_by_master.setdefault(row.user_id, []).append(row)
+
+    appointments_by_master = {}
+    for master_id, start_dt, duration in appointment_rows:
+        appointments_by_master.setdefault(master_id, []).append((start_dt, duration))
+
+    free_by_master = {}
+    for master_id, slots in slots_by_master.items():
+        schedule = build_day_schedule(day, slots, appointments_by_master.get(master_id, []))
+        if at_minute is not None:
+            if is_free(schedule, at_minute, service_duration):
+                free_by_master[master_id] = [at_minute]
+        else:
+            free_minutes = [m for m in free_start_minutes(schedule, service_duration) if m >= not_before]
+            if free_minutes:
+                free_by_master[master_id] = free_minutes
+
+    best = sorted(free_by_master, key=lambda master_id: (free_by_master[master_id][0], master_id))[:limit]
+    if not best:
+        return []
+
+    masters = session.query(User, MasterLink.link_code).outerjoin(
+        MasterLink, (MasterLink.user_id == User.id) & (MasterLink.is_active == True)
+    ).filter(User.id.in_(best)).all()
+
+    info = {}
+    for master, link_code in masters:
+        info.setdefault(master.id, (master, link_code))
+
+    return [
+        {
+            'master_id': master_id,
+            'full_name': info[master_id][0].full_name,
+            'phone': info[master_id][0].phone,
+            'link_code': info[master_id][1],
+            'free_times': [minutes_to_datetime(day, m) for m in free_by_master[master_id]],
+        }
+        for master_id in best if master_id in info
+    ]
+
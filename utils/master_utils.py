@@ -34,4 +34,19 @@ def get_master_link(user_id):
         is_active=True
     ).first()
     
-    return link.link_code if link else None
\ No newline at end of file
+    return link.link_code if link else None
+
+def get_master_links(master_ids):
+    """Активные ссылки сразу для нескольких мастеров одним запросом"""
+    if not master_ids:
+        return {}
+    
+    links = session.query(MasterLink.user_id, MasterLink.link_code).filter(
+        MasterLink.user_id.in_(master_ids),
+        MasterLink.is_active == True
+    ).all()
+    
+    result = {}
+    for user_id, link_code in links:
+        result.setdefault(user_id, link_code)
+    return result
\ No newline at end of file
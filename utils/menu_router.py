@@ -0,0 +1,87 @@
+"""Маршрутизатор кнопок меню: точный текст кнопки -> обработчик
+
+Вместо цепочки MessageHandler(filters.Regex('^...$')), где каждое
+сообщение по очереди сверяется с десятками регулярных выражений,
+один обработчик ищет текст кнопки в словаре. Кнопки с переменной частью
+('💎 Выдать PRO: Имя', '🗑️ ...') проверяются по короткому списку
+регулярных выражений в порядке регистрации - только если точного
+совпадения нет. Сообщения, как и у MessageHandler, - обычные и
+отредактированные; диалоги (ConversationHandler), добавленные раньше,
+по-прежнему получают сообщения первыми.
+
+Редко используемые разделы (админка) регистрируются через lazy_callback:
+их модуль импортируется при первом нажатии кнопки, а не при старте бота.
+"""
+import importlib
+import re
+from telegram import Update
+from telegram.ext import BaseHandler, filters
+
+
+def lazy_callback(module_name, name):
+    """Обработчик name из модуля module_name, который импортируется при первом вызове"""
+    loaded = []
+
+    async def callback(update, context):
+        if not loaded:
+            loaded.append(getattr(importlib.import_module(module_name), name))
+        return await loaded[0](update, context)
+
+    # Имя и модуль настоящего обработчика - для статистики инструментирования
+    callback.__name__ = callback.__qualname__ = name
+    callback.__module__ = module_name
+    return callback
+
+
+class MenuRouter(BaseHandler):
+    """Один обработчик для всех кнопок меню"""
+
+    def __init__(self, block=True):
+        super().__init__(self.dispatch, block=block)
+        self.routes = {}
+        self.patterns = []
+
+    def add(self, texts, callback):
+        """Кнопка (или список кнопок) с точным текстом"""
+        if isinstance(texts, str):
+            texts = [texts]
+        for text in texts:
+            if text in self.routes:
+                raise ValueError(f"Кнопка уже зарегистрирована: {text}")
+            self.routes[text] = callback
+
+    def add_pattern(self, pattern, callback):
+        """Кнопка с переменной частью: регулярное выражение от начала текста"""
+        self.patterns.append((re.compile(pattern), callback))
+
+    def resolve(self, text):
+        """Обработчик для текста сообщения или None"""
+        callback = self.routes.get(text)
+        if callback is not None:
+            return callback
+        for pattern, callback in self.patterns:
+            if pattern.match(text):
+                return callback
+        return None
+
+    def wrap_callbacks(self, wrap):
+        """Заменяет каждый обработчик на wrap(обработчик) - для инструментирования"""
+        wrapped = {}
+        for callback in set(self.routes.values()) | {callback for _, callback in self.patterns}:
+            wrapped[callback] = wrap(callback)
+        self.routes = {text: wrapped[callback] for text, callback in self.routes.items()}
+        self.patterns = [(pattern, wrapped[callback]) for pattern, callback in self.patterns]
+
+    def check_update(self, update):
+        if not isinstance(update, Update) or not filters.TEXT.check_update(update):
+            return None
+        return self.resolve(update.effective_message.text) or False
+
+    async def handle_update(self, update, application, check_result, context):
+        # check_result - уже найденный обработчик, повторный поиск не нужен
+        return await check_result(update, context)
+
+    async def dispatch(self, update, context):
+        callback = self.resolve(update.effective_message.text)
+        if callback is not None:
+            return await callback(update, context)
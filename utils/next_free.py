@@ -0,0 +1,96 @@
+import threading
+import time
+from datetime import datetime, date, timedelta
+from utils import availability
+from utils.availability import minutes_to_datetime
+from config import BOOKING_HORIZON_DAYS, AVAILABILITY_CACHE_TTL
+
+
+class NextFreeIndex:
+    """Указатель на ближайшее свободное время по ключу (мастер, длительность услуги)
+
+    Чтение указателя - O(1). После изменения расписания указатель
+    пересчитывается не с сегодняшнего дня, а с даты изменения: все дни до
+    текущего указателя заведомо были без свободного времени.
+    on_change вызывается только в этом процессе, поэтому указатель живет
+    не дольше ttl секунд (как кэш свободного времени), затем ищется заново.
+    """
+
+    def __init__(self, horizon_days=BOOKING_HORIZON_DAYS, ttl=AVAILABILITY_CACHE_TTL):
+        self.horizon_days = horizon_days
+        self.ttl = ttl
+        # (мастер, длительность) -> {'pointer': datetime|None, 'computed_on': date, 'scan_from': date|None,
+        #                            'expires_at': monotonic|None}
+        self._entries = {}
+        self._keys_by_master = {}
+        # Версия расписания мастера: пересчет, обогнанный изменением, не сохраняется
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, master_id, service_duration, now=None):
+        """Ближайшее свободное начало записи или None, если на горизонте все занято"""
+        now = now or datetime.now()
+        key = (master_id, service_duration)
+        with self._lock:
+            entry = self._entries.get(key)
+            version = self._versions.get(master_id, 0)
+            if entry and entry['expires_at'] is not None and entry['expires_at'] < time.monotonic():
+                # Расписание могли изменить на другом экземпляре бота: ищем с сегодняшнего дня
+                entry = None
+
+            if entry and entry['computed_on'] == now.date() and entry['scan_from'] is None:
+                pointer = entry['pointer']
+                if pointer is None or pointer >= now:
+                    return pointer
+                # Указатель ушел в прошлое: продолжаем поиск с его даты
+                scan_from = pointer.date()
+            elif entry and entry['computed_on'] == now.date():
+                scan_from = entry['scan_from']
+            else:
+                scan_from = now.date()
+
+        pointer = self._scan(master_id, service_duration, max(scan_from, now.date()), now)
+
+        with self._lock:
+            if version == self._versions.get(master_id, 0):
+                expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+                self._entries[key] = {'pointer': pointer, 'computed_on': now.date(), 'scan_from': None,
+                                      'expires_at': expires_at}
+                self._keys_by_master.setdefault(master_id, set()).add(key)
+        return pointer
+
+    def on_change(self, master_id, day=None):
+        """Помечает указатели мастера для пересчета после изменения на дату day"""
+        with self._lock:
+            self._versions[master_id] = self._versions.get(master_id, 0) + 1
+            for key in self._keys_by_master.get(master_id, ()):
+                entry = self._entries[key]
+                pointer = entry['pointer']
+
+                if day is None:
+                    entry['scan_from'] = date.min
+                elif pointer is None or day <= pointer.date():
+                    # Изменение до указателя (или указателя нет) может сдвинуть ближайшее время
+                    entry['scan_from'] = min(entry['scan_from'] or day, day)
+
+    def _scan(self, master_id, service_duration, start_day, now):
+        days_ahead = (now.date() + timedelta(days=self.horizon_days) - start_day).days
+        if days_ahead <= 0:
+            return None
+
+        # Горизонт считается одним запросом по диапазону (или берется из кэша)
+        horizon = availability.backend.horizon(master_id, start_day, days_ahead, service_duration)
+        for day, free_minutes in horizon.items():
+            for minutes in free_minutes:
+                candidate = minutes_to_datetime(day, minutes)
+                if candidate >= now:
+                    return candidate
+        return None
+
+
+next_free_index = NextFreeIndex()
+
+
+def get_next_free_time(master_id, service_duration):
+    """Ближайшее свободное время мастера для услуги заданной длительности"""
+    return next_free_index.get(master_id, service_duration)
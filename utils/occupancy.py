@@ -0,0 +1,99 @@
+from array import array
+
+MINUTES_PER_DAY = 24 * 60
+
+# numpy загружается при первой сетке (бэкенд grid), а не при запуске бота:
+# бэкенд по умолчанию сетку не строит. False - еще не загружали
+_np = False
+
+
+def _numpy():
+    """Модуль numpy или None, если он не установлен (тогда считаем через array)"""
+    global _np
+    if _np is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _np = numpy
+    return _np
+
+
+class OccupancyGrid:
+    """Поминутная сетка занятости мастера на один день
+
+    Ячейка на каждую минуту суток: 1 - рабочее свободное время, 0 - нет.
+    По префиксным суммам сетки проверка окна любой длины стоит O(1),
+    поэтому все длительности услуг считаются за один проход.
+    """
+
+    def __init__(self, schedule):
+        self.working = schedule.working
+
+        free = bytearray(MINUTES_PER_DAY)
+        for start, end in schedule.working:
+            start, end = _clamp(start, end)
+            free[start:end] = b'\x01' * (end - start)
+        for start, end in schedule.busy:
+            start, end = _clamp(start, end)
+            free[start:end] = bytes(end - start)
+
+        np = _numpy()
+        if np is not None:
+            self.prefix = np.zeros(MINUTES_PER_DAY + 1, dtype=np.int32)
+            np.cumsum(np.frombuffer(bytes(free), dtype=np.uint8), out=self.prefix[1:])
+        else:
+            self.prefix = array('i', [0]) * (MINUTES_PER_DAY + 1)
+            total = 0
+            for minute, cell in enumerate(free):
+                total += cell
+                self.prefix[minute + 1] = total
+
+    def free_starts(self, service_duration, step):
+        """Свободные начала записи для одной длительности"""
+        return self.free_starts_for_durations([service_duration], step)[service_duration]
+
+    def free_starts_for_durations(self, durations, step):
+        """Свободные начала записи сразу для нескольких длительностей
+
+        Кандидаты берутся с шагом step от начала каждого рабочего интервала,
+        окно [t, t + d) подходит, если все его минуты свободны.
+        """
+        durations = sorted(set(durations))
+        if _numpy() is not None:
+            return self._free_starts_numpy(durations, step)
+
+        result = {duration: [] for duration in durations}
+        prefix = self.prefix
+        for start, end in self.working:
+            for candidate in range(start, end, step):
+                for duration in durations:
+                    finish = candidate + duration
+                    if finish > end:
+                        break
+                    if prefix[finish] - prefix[candidate] == duration:
+                        result[duration].append(candidate)
+        return result
+
+    def _free_starts_numpy(self, durations, step):
+        np = _numpy()
+        if not self.working:
+            return {duration: [] for duration in durations}
+
+        candidates = np.concatenate([np.arange(start, end, step) for start, end in self.working])
+        interval_ends = np.concatenate([
+            np.full(len(range(start, end, step)), end) for start, end in self.working
+        ])
+        lengths = np.array(durations)[:, None]
+
+        # Матрица длительности x кандидаты: окно должно влезть в рабочий интервал
+        finishes = candidates[None, :] + lengths
+        fits = finishes <= interval_ends[None, :]
+        window = self.prefix[np.minimum(finishes, MINUTES_PER_DAY)] - self.prefix[candidates][None, :]
+        ok = fits & (window == lengths)
+
+        return {duration: candidates[ok[i]].tolist() for i, duration in enumerate(durations)}
+
+
+def _clamp(start, end):
+    return max(0, min(start, MINUTES_PER_DAY)), max(0, min(end, MINUTES_PER_DAY))
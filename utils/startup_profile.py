@@ -0,0 +1,135 @@
+"""Профиль запуска бота: время импорта модулей и этапов инициализации
+
+Запуск: python -m utils.startup_profile [--top 15] [--output startup.json]
+Бот поднимается так же, как в bot.main, но без подключения к Telegram:
+импорт bot, подготовка базы (prepare_database - применяет миграции, как
+при обычном старте) и сборка Application со всеми обработчиками.
+Время импорта каждого модуля берется из python -X importtime в
+отдельном процессе: модули проекта - по отдельности, остальные
+библиотеки - по пакетам верхнего уровня.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_PACKAGES = {'bot', 'config', 'database', 'handlers', 'keyboards', 'utils'}
+
+# Токен-заглушка для сборки Application, если BOT_TOKEN не задан
+PLACEHOLDER_TOKEN = '0:startup-profile'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--top', type=int, default=15, help='сколько модулей и пакетов показать')
+    parser.add_argument('--output', help='куда записать JSON (по умолчанию только вывод в консоль)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_stages():
+    """Этапы запуска в текущем процессе; время каждого в миллисекундах"""
+    stages = []
+
+    def timed(name, func):
+        started = time.perf_counter()
+        result = func()
+        stages.append({'stage': name, 'ms': round((time.perf_counter() - started) * 1000, 1)})
+        return result
+
+    bot = timed('import bot', lambda: __import__('bot'))
+    timed('prepare_database', lambda: bot.prepare_database(bot.engine))
+    timed('build_application', lambda: bot.build_application(bot.BOT_TOKEN or PLACEHOLDER_TOKEN))
+    return stages
+
+
+def parse_importtime(lines):
+    """Строки -X importtime: (модуль, собственное время мкс, вместе с вложенными мкс)"""
+    modules = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            # Заголовок таблицы
+            continue
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def summarize_imports(modules, top):
+    project = []
+    packages = {}
+    for name, self_us, cumulative_us in modules:
+        package = name.split('.')[0]
+        if package in PROJECT_PACKAGES:
+            project.append({'module': name, 'self_ms': round(self_us / 1000, 1),
+                            'cumulative_ms': round(cumulative_us / 1000, 1)})
+        else:
+            packages[package] = packages.get(package, 0) + self_us
+
+    project.sort(key=lambda item: item['self_ms'], reverse=True)
+    libraries = [{'package': package, 'self_ms': round(us / 1000, 1)}
+                 for package, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)]
+    return {
+        'total_ms': round(sum(self_us for _, self_us, _ in modules) / 1000, 1),
+        'modules': len(modules),
+        'project_ms': round(sum(item['self_ms'] for item in project), 1),
+        'project': project[:top],
+        'libraries': libraries[:top],
+    }
+
+
+def profile(top):
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'utils.startup_profile', '--child'],
+        capture_output=True, text=True, env={**os.environ, 'PYTHONUNBUFFERED': '1'}
+    )
+    wall_ms = round((time.perf_counter() - started) * 1000, 1)
+    if process.returncode != 0:
+        sys.stderr.write(process.stderr)
+        raise SystemExit(f"❌ Запуск бота завершился с ошибкой (код {process.returncode})")
+
+    return {
+        'wall_ms': wall_ms,
+        'stages': json.loads(process.stdout.strip().splitlines()[-1]),
+        'imports': summarize_imports(parse_importtime(process.stderr.splitlines()), top),
+    }
+
+
+def print_report(report):
+    print(f"⏱ Запуск процесса целиком: {report['wall_ms']} мс\n")
+    print("Этапы:")
+    for stage in report['stages']:
+        print(f"  {stage['stage']:<22}{stage['ms']:>10} мс")
+
+    imports = report['imports']
+    print(f"\nИмпорт: {imports['modules']} модулей, {imports['total_ms']} мс "
+          f"(модули проекта - {imports['project_ms']} мс)")
+    print("\nМодули проекта (собственное время / вместе с вложенными):")
+    for item in imports['project']:
+        print(f"  {item['module']:<40}{item['self_ms']:>8} мс{item['cumulative_ms']:>10} мс")
+    print("\nБиблиотеки:")
+    for item in imports['libraries']:
+        print(f"  {item['package']:<40}{item['self_ms']:>8} мс")
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        print(json.dumps(run_stages()))
+        return
+
+    report = profile(args.top)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📄 Результаты записаны в {args.output}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
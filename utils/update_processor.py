@@ -0,0 +1,88 @@
+"""Параллельная обработка обновлений с сохранением порядка внутри чата
+
+Пока одно обновление ждет Telegram или пул потоков (run_db), бот
+обрабатывает обновления других пользователей. Обновления одного чата
+выполняются строго по очереди: шаги диалога (ConversationHandler) и
+нажатия кнопок не обгоняют друг друга.
+
+Сессии базы уже свои у каждого обновления (database/session.py), но
+сессия держит соединение из пула, пока обновление ждет ответа Telegram
+или run_db. Потоки run_db (их DB_THREADS) берут соединения из того же
+пула. Поэтому одновременно обрабатывается не больше обновлений, чем
+соединений в пуле за вычетом потоков run_db: иначе обновления заняли бы
+все соединения, потоки run_db ждали бы их до DB_POOL_TIMEOUT, а цикл
+событий встал бы в ожидании соединения, которое может вернуть только он сам.
+"""
+import logging
+from collections import deque
+from telegram.ext import BaseUpdateProcessor
+from config import UPDATE_CONCURRENCY, DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_THREADS
+from database.engine import is_memory_sqlite
+
+logger = logging.getLogger(__name__)
+
+
+def max_concurrent_updates(requested=UPDATE_CONCURRENCY, url=DATABASE_URL):
+    """Допустимое число одновременно обрабатываемых обновлений"""
+    if is_memory_sqlite(url):
+        # База в памяти - одно соединение на поток, общее для всех сессий
+        return 1
+    # Соединения, которые остаются обновлениям, когда заняты все потоки run_db
+    limit = max(DB_POOL_SIZE + DB_MAX_OVERFLOW - DB_THREADS, 1)
+    if requested > limit:
+        logger.warning("UPDATE_CONCURRENCY=%s больше свободных соединений пула (без потоков run_db), "
+                       "используется %s", requested, limit)
+        return limit
+    return max(requested, 1)
+
+
+def chat_key(update):
+    """Ключ очереди: чат, для обновлений без чата - пользователь, иначе None (без очереди)"""
+    chat = getattr(update, 'effective_chat', None)
+    if chat is not None:
+        return chat.id
+    user = getattr(update, 'effective_user', None)
+    return user.id if user is not None else None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Разные чаты - параллельно (до max_concurrent_updates), один чат - по порядку
+
+    Обновление чата, который уже обрабатывается, не занимает место в лимите:
+    оно встает в очередь чата и выполняется задачей, которая чат обрабатывает.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._queues = {}  # ключ чата -> очередь еще не выполненных обновлений
+
+    async def do_process_update(self, update, coroutine):
+        key = chat_key(update)
+        if key is None:
+            await coroutine
+            return
+
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(coroutine)
+            return
+
+        self._queues[key] = queue = deque([coroutine])
+        try:
+            while queue:
+                try:
+                    await queue.popleft()
+                except Exception:
+                    # Ошибка одного обновления не должна останавливать очередь чата
+                    logger.exception("Ошибка обработки обновления чата %s", key)
+        finally:
+            del self._queues[key]
+            # Остаются только при отмене задачи (остановка бота)
+            for coroutine in queue:
+                coroutine.close()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
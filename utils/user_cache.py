@@ -0,0 +1,218 @@
+"""Кэш пользователя по telegram_id вместе с премиум-статусом
+
+Почти каждый обработчик начинает с поиска пользователя по telegram_id,
+многие затем проверяют активную подписку. Два уровня кэша:
+- в пределах обновления: данные хранятся в session.info текущей сессии
+  (она своя у каждого обновления, см. database/session.py) до конца
+  транзакции;
+- между обновлениями: LRU-кэш с TTL (USER_CACHE_SIZE, USER_CACHE_TTL).
+
+Кэшируется снимок UserInfo, а не ORM-объект: get_user возвращает User,
+привязанный к текущей сессии, - его можно менять и сохранять как обычно.
+Кэш сбрасывается после commit, в котором менялись User или
+PremiumSubscription (события ORM), в том числе при регистрации
+(start.set_phone). Изменения из другого процесса (webhook_handler.py)
+видны не позже чем через USER_CACHE_TTL секунд.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from sqlalchemy import and_, event
+from sqlalchemy.orm import Session as OrmSession, object_session
+from config import USER_CACHE_SIZE, USER_CACHE_TTL
+from database.models import session, User, PremiumSubscription
+
+UserInfo = namedtuple('UserInfo', 'id telegram_id username full_name phone specialty is_master is_premium')
+
+# Ключи session.info
+_MEMO_KEY = 'user_info'
+# Загруженные User: identity map сессии держит объекты по слабым ссылкам
+_USERS_KEY = 'user_objects'
+_DIRTY_KEY = 'user_cache_dirty'
+
+
+class UserCache:
+    """LRU-кэш UserInfo по telegram_id с ограниченным временем жизни записей
+
+    Потокобезопасен: обработчики работают и в пуле потоков (run_db).
+    """
+
+    def __init__(self, max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # telegram_id -> (UserInfo, срок годности)
+        self._telegram_by_user = {}
+        # Растет при каждом сбросе: данные, прочитанные до сброса, не сохраняются
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, telegram_id):
+        with self._lock:
+            entry = self._entries.get(telegram_id)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._forget(telegram_id)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(telegram_id)
+            self.hits += 1
+            return entry[0]
+
+    def generation(self):
+        """Запоминается до чтения из базы и передается в put"""
+        with self._lock:
+            return self._generation
+
+    def put(self, info, generation=None):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            self._entries[info.telegram_id] = (info, time.monotonic() + self.ttl)
+            self._entries.move_to_end(info.telegram_id)
+            self._telegram_by_user[info.id] = info.telegram_id
+
+            while len(self._entries) > self.max_size:
+                old_telegram_id, (old_info, _) = self._entries.popitem(last=False)
+                self._telegram_by_user.pop(old_info.id, None)
+
+    def invalidate(self, telegram_id=None, user_id=None):
+        """Сбрасывает пользователя по telegram_id или по id в базе"""
+        with self._lock:
+            self._generation += 1
+            if telegram_id is None and user_id is not None:
+                telegram_id = self._telegram_by_user.get(user_id)
+            if telegram_id is not None:
+                self._forget(telegram_id)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._telegram_by_user.clear()
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / requests * 100, 1) if requests else 0,
+        }
+
+    def _forget(self, telegram_id):
+        entry = self._entries.pop(telegram_id, None)
+        if entry is not None:
+            self._telegram_by_user.pop(entry[0].id, None)
+
+
+user_cache = UserCache()
+
+
+def load_user(telegram_id, db_session=None):
+    """User и его UserInfo (с наличием активной подписки) одним запросом"""
+    db_session = db_session or session
+    row = db_session.query(User, PremiumSubscription.id).outerjoin(
+        PremiumSubscription,
+        and_(PremiumSubscription.user_id == User.id, PremiumSubscription.is_active == True)
+    ).filter(User.telegram_id == telegram_id).first()
+
+    if row is None:
+        return None, None
+    user, premium_id = row
+    info = UserInfo(user.id, user.telegram_id, user.username, user.full_name, user.phone,
+                    user.specialty, user.is_master, premium_id is not None)
+    return user, info
+
+
+def get_user_info(telegram_id, db_session=None):
+    """Снимок пользователя с премиум-статусом или None, если он не зарегистрирован"""
+    db_session = db_session or session
+    memo = db_session.info.setdefault(_MEMO_KEY, {})
+    info = memo.get(telegram_id)
+    if info is not None:
+        return info
+
+    info = user_cache.get(telegram_id)
+    if info is None:
+        generation = user_cache.generation()
+        user, info = load_user(telegram_id, db_session)
+        if info is None:
+            # Незарегистрированных не кэшируем: регистрация может пройти в этом же обновлении
+            return None
+        user_cache.put(info, generation)
+        # get_user возьмет этот объект из identity map без запроса
+        db_session.info.setdefault(_USERS_KEY, []).append(user)
+
+    memo[telegram_id] = info
+    return info
+
+
+def get_user(telegram_id, db_session=None):
+    """User текущей сессии по telegram_id (повторные вызовы в обновлении - без запросов)"""
+    db_session = db_session or session
+    info = get_user_info(telegram_id, db_session)
+    if info is None:
+        return None
+    return db_session.get(User, info.id)
+
+
+def is_premium(telegram_id, db_session=None):
+    """Есть ли у пользователя активная подписка"""
+    info = get_user_info(telegram_id, db_session)
+    return info is not None and info.is_premium
+
+
+def invalidate_user(telegram_id=None, user_id=None):
+    """Сброс вручную - для изменений в обход ORM (UPDATE/DELETE запросом)"""
+    user_cache.invalidate(telegram_id, user_id)
+
+
+def _mark_dirty(target, key):
+    target_session = object_session(target)
+    if target_session is not None:
+        target_session.info.setdefault(_DIRTY_KEY, set()).add(key)
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    _mark_dirty(target, ('telegram_id', target.telegram_id))
+
+
+@event.listens_for(PremiumSubscription, 'after_insert')
+@event.listens_for(PremiumSubscription, 'after_update')
+@event.listens_for(PremiumSubscription, 'after_delete')
+def _premium_changed(mapper, connection, target):
+    _mark_dirty(target, ('user_id', target.user_id))
+
+
+@event.listens_for(OrmSession, 'after_commit')
+def _invalidate_committed(db_session):
+    """Сброс после commit: до него другие соединения видят старые данные"""
+    db_session.info.pop(_MEMO_KEY, None)
+    db_session.info.pop(_USERS_KEY, None)
+    dirty = db_session.info.pop(_DIRTY_KEY, None)
+    if not dirty:
+        return
+
+    for kind, value in dirty:
+        if kind == 'telegram_id':
+            user_cache.invalidate(telegram_id=value)
+        else:
+            user_cache.invalidate(user_id=value)
+
+
+@event.listens_for(OrmSession, 'after_rollback')
+def _discard_dirty(db_session):
+    db_session.info.pop(_MEMO_KEY, None)
+    db_session.info.pop(_USERS_KEY, None)
+    db_session.info.pop(_DIRTY_KEY, None)
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 from flask import Flask, request, jsonify
-import sqlite3
 import json
 import logging
 import requests
 from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
 from config import BOT_TOKEN
+from database.models import Session, User, PremiumSubscription
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -26,57 +27,60 @@ def yookassa_webhook():
             telegram_id = metadata.get('user_id')  # это telegram_id
             
             if product_type == 'premium' and telegram_id:
-                conn = sqlite3.connect('bot.db')
-                cursor = conn.cursor()
-                
-                # 🔽 ИСПРАВЛЕНИЕ: Находим user_id из таблицы users
-                cursor.execute('SELECT id FROM users WHERE telegram_id = ?', (telegram_id,))
-                user = cursor.fetchone()
-                if not user:
-                    logger.error(f"User with telegram_id {telegram_id} not found")
-                    conn.close()
-                    return jsonify({'status': 'user_not_found'}), 200
-                
-                user_id = user[0]  # правильный user_id из таблицы users
-                # 🔼 КОНЕЦ ИСПРАВЛЕНИЯ
-                
-                # 🛡️ ЗАЩИТА ОТ ДУБЛЕЙ: Проверяем есть ли активная подписка
-                cursor.execute('''
-                    SELECT id FROM premium_subscriptions 
-                    WHERE user_id = ? AND expires_at > datetime('now')
-                ''', (user_id,))
-                
-                if cursor.fetchone():
-                    logger.warning(f"У user_id {user_id} уже есть активная подписка. Пропускаем платеж {payment_id}")
-                    conn.close()
-                    return jsonify({'status': 'already_active'}), 200
-                
-                # Дополнительная проверка на дубли payment_id (на всякий случай)
-                cursor.execute('SELECT id FROM premium_subscriptions WHERE payment_id = ?', (payment_id,))
-                if cursor.fetchone():
-                    logger.info(f"Дубль платежа {payment_id}")
-                    conn.close()
-                    return jsonify({'status': 'duplicate'}), 200
-                
                 duration_days = int(metadata.get('duration_days', 30))
                 plan_type = 'pro_year' if duration_days == 365 else 'pro'
-                expires_at = (datetime.now() + timedelta(days=duration_days)).strftime('%Y-%m-%d %H:%M:%S')
-                
-                # Активируем подписку с правильным user_id
-                cursor.execute('''
-                    INSERT OR REPLACE INTO premium_subscriptions 
-                    (user_id, plan_type, is_active, expires_at, created_at, payment_id) 
-                    VALUES (?, ?, ?, ?, datetime('now'), ?)
-                ''', (user_id, plan_type, 1, expires_at, payment_id))
                 
-                conn.commit()
-                conn.close()
+                # Работает с любой базой из DATABASE_URL (SQLite или PostgreSQL)
+                with Session() as db_session:
+                    # 🔽 ИСПРАВЛЕНИЕ: Находим user_id из таблицы users
+                    user = db_session.query(User.id).filter_by(telegram_id=int(telegram_id)).first()
+                    if not user:
+                        logger.error(f"User with telegram_id {telegram_id} not found")
+                        return jsonify({'status': 'user_not_found'}), 200
+                    
+                    user_id = user.id  # правильный user_id из таблицы users
+                    # 🔼 КОНЕЦ ИСПРАВЛЕНИЯ
+                    
+                    # 🛡️ ЗАЩИТА ОТ ДУБЛЕЙ: Проверяем есть ли активная подписка
+                    active = db_session.query(PremiumSubscription.id).filter(
+                        PremiumSubscription.user_id == user_id,
+                        PremiumSubscription.expires_at > datetime.now()
+                    ).first()
+                    if active:
+                        logger.warning(f"У user_id {user_id} уже есть активная подписка. Пропускаем платеж {payment_id}")
+                        return jsonify({'status': 'already_active'}), 200
+                    
+                    # Дополнительная проверка на дубли payment_id (на всякий случай)
+                    if db_session.query(PremiumSubscription.id).filter_by(payment_id=payment_id).first():
+                        logger.info(f"Дубль платежа {payment_id}")
+                        return jsonify({'status': 'duplicate'}), 200
+                    
+                    expires_at = datetime.now() + timedelta(days=duration_days)
+                    
+                    # Активируем подписку: у пользователя одна запись подписки, обновляем ее или создаем
+                    subscription = db_session.query(PremiumSubscription).filter_by(user_id=user_id).first()
+                    if not subscription:
+                        subscription = PremiumSubscription(user_id=user_id)
+                        db_session.add(subscription)
+                    subscription.plan_type = plan_type
+                    subscription.is_active = True
+                    subscription.expires_at = expires_at
+                    subscription.created_at = datetime.now()
+                    subscription.payment_id = payment_id
+                    
+                    try:
+                        db_session.commit()
+                    except IntegrityError:
+                        # Тот же платеж параллельно обработал другой запрос вебхука
+                        db_session.rollback()
+                        logger.info(f"Дубль платежа {payment_id}")
+                        return jsonify({'status': 'duplicate'}), 200
                 
                 logger.info(f"Подписка активирована для user_id {user_id} (telegram: {telegram_id})")
                 
                 # Отправляем уведомление
                 try:
-                    message_text = f"🎉 **Ваша PRO подписка активирована!**\n\n✅ Подписка действительна до: {expires_at.split()[0]}"
+                    message_text = f"🎉 **Ваша PRO подписка активирована!**\n\n✅ Подписка действительна до: {expires_at.strftime('%Y-%m-%d')}"
                     requests.post(f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage", json={
                         "chat_id": telegram_id,  # отправляем на telegram_id
                         "text": message_text,